@@ -12,9 +12,11 @@ from flask_limiter.util import get_remote_address
 
 from .api import register_blueprints
 from .config import config as app_config
-from .database import init_app as init_db
-from .ml import TransactionPredictor
+from .database import get_pool_metrics, init_app as init_db
+from .ml.lazy_predictor import LazyTransactionPredictor
 from .services import AuthService
+from .services.password_hasher import PasswordHasher
+from .utils.rate_limit_storage import SCHEME_PREFIX as DB_RATELIMIT_PREFIX
 
 
 def create_app(config_name: str | None = None) -> Flask:
@@ -31,17 +33,29 @@ def create_app(config_name: str | None = None) -> Flask:
         supports_credentials=app.config.get("CORS_SUPPORTS_CREDENTIALS", True),
     )
     JWTManager(app)
-    Limiter(
+    storage_uri = app.config.get("RATELIMIT_STORAGE_URL", "memory://")
+    storage_options = {}
+    if storage_uri.startswith(DB_RATELIMIT_PREFIX):
+        storage_options["flush_interval"] = app.config.get("RATELIMIT_FLUSH_INTERVAL", 0.5)
+    app.extensions["limiter"] = Limiter(
         get_remote_address,
         app=app,
         default_limits=[app.config.get("RATELIMIT_DEFAULT", "100 per hour")],
+        storage_uri=storage_uri,
+        storage_options=storage_options,
+        strategy=app.config.get("RATELIMIT_STRATEGY", "fixed-window"),
     )
 
     # Banco de dados e recursos compartilhados
     init_db(app)
     model_path = app.config["ML_MODEL_PATH"]
     if os.path.exists(model_path):
-        app.extensions["predictor"] = TransactionPredictor(model_path)
+        # o modelo é carregado na primeira predição (ou já aqui, com ML_PREDICTOR_WARMUP)
+        predictor = LazyTransactionPredictor(model_path)
+        warm_up = app.config.get("ML_PREDICTOR_WARMUP")
+        if warm_up:
+            predictor.warm_up(background=warm_up == "background")
+        app.extensions["predictor"] = predictor
     else:
         app.logger.warning("ML model not found at %s. Predictor disabled.", model_path)
         app.extensions["predictor"] = None
@@ -50,7 +64,13 @@ def create_app(config_name: str | None = None) -> Flask:
     auth_service = AuthService(
         jwt_secret=app.config['JWT_SECRET_KEY'],
         access_token_expires=int(app.config['JWT_ACCESS_TOKEN_EXPIRES'].total_seconds()),
-        refresh_token_expires=int(app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds())
+        refresh_token_expires=int(app.config['JWT_REFRESH_TOKEN_EXPIRES'].total_seconds()),
+        user_cache_ttl=app.config.get('AUTH_USER_CACHE_TTL', 60),
+        password_hasher=PasswordHasher(
+            rounds=app.config['BCRYPT_LOG_ROUNDS'],
+            workers=app.config.get('PASSWORD_HASH_THREADS'),
+            queue_size=app.config.get('PASSWORD_HASH_QUEUE'),
+        )
     )
     app.extensions['auth_service'] = auth_service
 
@@ -61,6 +81,10 @@ def create_app(config_name: str | None = None) -> Flask:
     def healthcheck():
         return jsonify({"status": "ok"})
 
+    @app.get("/health/db")
+    def db_pool_metrics():
+        return jsonify(get_pool_metrics())
+
     return app
 
 
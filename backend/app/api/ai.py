@@ -3,22 +3,29 @@ Endpoints para consultor financeiro com IA (ChatGPT).
 """
 from __future__ import annotations
 
-import asyncio
-from typing import Dict, Optional
+import json
+import threading
+from typing import TYPE_CHECKING, Iterator, Optional
 
-from flask import Blueprint, current_app, jsonify, request
-from openai import OpenAIError
+from flask import Blueprint, Response, current_app, jsonify, request
 
 from ..database import get_session
-from ..models import PendingTransaction, ReviewStatus
-from ..services.openai_service import OpenAIService
+from ..services.ai_response_cache import AIResponseCache
+from ..services.insight_context import InsightContextBuilder
+from ..utils.async_runner import get_async_runner
+
+if TYPE_CHECKING:  # o SDK da OpenAI só é carregado no primeiro uso
+    from ..services.openai_service import OpenAIService
 
 ai_bp = Blueprint("ai", __name__, url_prefix="/api/ai")
 
+_service_lock = threading.Lock()
+
 
 def get_ai_service() -> Optional[OpenAIService]:
     """
-    Factory para criar OpenAIService.
+    OpenAIService compartilhado pela aplicação (um cliente e um pool de
+    conexões por processo, criado na primeira chamada).
 
     Returns:
         OpenAIService ou None se não configurado
@@ -28,24 +35,98 @@ def get_ai_service() -> Optional[OpenAIService]:
     if not api_key:
         return None
 
-    model = current_app.config.get("OPENAI_MODEL", "gpt-3.5-turbo")
-    max_tokens = current_app.config.get("OPENAI_MAX_TOKENS", 1000)
-
-    return OpenAIService(
-        api_key=api_key,
-        model=model,
-        max_tokens=max_tokens
-    )
+    service = current_app.extensions.get("ai_service")
+    if service is not None:
+        return service
+
+    with _service_lock:
+        service = current_app.extensions.get("ai_service")
+        if service is not None:
+            return service
+        from ..services.openai_service import OpenAIService
+
+        # a tabela do cache no banco da aplicação é criada pela migração
+        cache_url = current_app.config.get("AI_CACHE_URL")
+        separate_cache_db = cache_url != current_app.config.get("SQLALCHEMY_DATABASE_URI")
+        service = OpenAIService(
+            api_key=api_key,
+            model=current_app.config.get("OPENAI_MODEL", "gpt-3.5-turbo"),
+            max_tokens=current_app.config.get("OPENAI_MAX_TOKENS", 1000),
+            base_url=current_app.config.get("OPENAI_BASE_URL"),
+            timeout=current_app.config.get("AI_REQUEST_TIMEOUT", 60),
+            max_retries=current_app.config.get("AI_MAX_RETRIES", 2),
+            max_concurrency=current_app.config.get("AI_MAX_OUTBOUND", 4),
+            retry_backoff=current_app.config.get("AI_RETRY_BACKOFF", 0.5),
+            cache=AIResponseCache(
+                url=cache_url,
+                ttl=current_app.config.get("AI_CACHE_TTL", 86400),
+                max_entries=current_app.config.get("AI_CACHE_MAX_ENTRIES", 5000),
+                create_table=bool(cache_url) and separate_cache_db,
+            ),
+        )
+        current_app.extensions["ai_service"] = service
+    return service
 
 
 def _run_async(coro):
-    """Helper para rodar funções async em rotas Flask."""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+    """
+    Roda a corrotina no event loop persistente do processo, respeitando o
+    limite de chamadas simultâneas à IA.
+    """
+    runner = get_async_runner(current_app.config.get("AI_MAX_CONCURRENCY", 8))
+    # todas as tentativas, mais uma de margem para fila e espera entre elas
+    attempts = current_app.config.get("AI_MAX_RETRIES", 2) + 1
+    timeout = current_app.config.get("AI_REQUEST_TIMEOUT", 60) * (attempts + 1)
+    return runner.run(coro, timeout=timeout)
+
+
+def _wants_stream() -> bool:
+    if request.args.get("stream", "").lower() in ("1", "true", "yes"):
+        return True
+    return request.accept_mimetypes.best == "text/event-stream"
+
+
+def _sse(data: dict, event: Optional[str] = None) -> str:
+    payload = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return f"event: {event}\n{payload}" if event else payload
+
+
+def _stream_chat(service: OpenAIService, message: str, context: dict) -> Response:
+    """
+    Resposta SSE do chat: um evento ``data`` por trecho gerado, seguido de
+    ``event: done`` (ou ``event: error``).
+
+    O gerador não usa o contexto da requisição, de modo que a sessão/conexão
+    de banco da requisição é liberada antes de a geração começar.
+    """
+    from openai import OpenAIError
+
+    runner = get_async_runner(current_app.config.get("AI_MAX_CONCURRENCY", 8))
+    idle_timeout = current_app.config.get("AI_REQUEST_TIMEOUT", 60)
+    logger = current_app.logger
+
+    def generate() -> Iterator[str]:
+        try:
+            for delta in runner.iterate(
+                service.stream_chat_with_context(message, context),
+                timeout=idle_timeout,
+            ):
+                yield _sse({"delta": delta})
+        except OpenAIError as e:
+            logger.exception("Erro no streaming da API OpenAI")
+            yield _sse({"error": "Erro ao comunicar com API OpenAI", "details": str(e)}, event="error")
+            return
+        except Exception as e:
+            logger.exception("Erro no chat IA (streaming)")
+            yield _sse({"error": str(e)}, event="error")
+            return
+        yield _sse({"message": message}, event="done")
+
+    return Response(
+        generate(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @ai_bp.get("/health")
@@ -82,6 +163,40 @@ def health_check():
         }), 200
 
 
+@ai_bp.get("/cache")
+def cache_stats():
+    """
+    Métricas do cache de respostas da IA (acertos, taxa de acerto, entradas).
+
+    Returns:
+        JSON com estatísticas do cache
+    """
+    service = get_ai_service()
+    if not service:
+        return jsonify({"error": "API OpenAI não configurada"}), 503
+
+    return jsonify(service.cache.stats()), 200
+
+
+@ai_bp.get("/metrics")
+def metrics():
+    """
+    Métricas das chamadas à IA no processo: requisições enviadas,
+    coalescidas e repetidas; streaming do chat (TTFT).
+
+    Returns:
+        JSON com métricas
+    """
+    service = get_ai_service()
+    if not service:
+        return jsonify({"error": "API OpenAI não configurada"}), 503
+
+    return jsonify({
+        "calls": service.call_metrics(),
+        "chat_stream": service.stream_metrics(),
+    }), 200
+
+
 @ai_bp.post("/analyze")
 def analyze_spending():
     """
@@ -98,12 +213,18 @@ def analyze_spending():
                     {"name": "Transporte", "total": 800.00}
                 ]
             },
-            "timeframe": "last_month"  # opcional
+            "timeframe": "last_month",  # opcional
+            "user_id": 1  # opcional, usado quando summary não é enviado
         }
 
+    Sem ``summary``, o resumo é montado a partir do contexto agregado do
+    usuário (transações revisadas).
+
     Returns:
         JSON com análise e sugestões
     """
+    from openai import OpenAIError
+
     service = get_ai_service()
     if not service:
         return jsonify({"error": "API OpenAI não configurada"}), 503
@@ -113,10 +234,15 @@ def analyze_spending():
     summary = data.get("summary")
     timeframe = data.get("timeframe", "last_month")
 
-    if not summary:
-        return jsonify({"error": "summary é obrigatório"}), 400
-
     try:
+        if not summary:
+            user_id = int(data.get("user_id", 1))
+            builder = InsightContextBuilder(get_session)
+            if not builder.build(user_id)["transactions"]:
+                return jsonify({"error": "summary é obrigatório (nenhuma transação revisada)"}), 400
+            summary = builder.analysis_summary(user_id)
+            timeframe = data.get("timeframe", "all_time")
+
         analysis = _run_async(
             service.analyze_spending(summary, timeframe)
         )
@@ -142,19 +268,27 @@ def chat():
     """
     Chat interativo sobre finanças com contexto do usuário.
 
+    Com ``?stream=1`` (ou ``Accept: text/event-stream``) a resposta é
+    enviada em Server-Sent Events, trecho a trecho.
+
     Payload:
         {
             "message": "Como posso economizar mais?",
-            "context": {
+            "context": {  # opcional
                 "current_balance": 1500.00,
                 "monthly_income": 5000.00,
                 "monthly_expense": 3500.00
-            }
+            },
+            "user_id": 1  # opcional, usado quando context não é enviado
         }
 
+    Sem ``context``, usa o contexto agregado do usuário.
+
     Returns:
         JSON com resposta contextualizada
     """
+    from openai import OpenAIError
+
     service = get_ai_service()
     if not service:
         return jsonify({"error": "API OpenAI não configurada"}), 503
@@ -162,11 +296,17 @@ def chat():
     data = request.get_json(force=True, silent=True) or {}
 
     message = data.get("message")
-    context = data.get("context", {})
+    context = data.get("context")
 
     if not message:
         return jsonify({"error": "message é obrigatório"}), 400
 
+    if context is None:
+        context = InsightContextBuilder(get_session).chat_context(int(data.get("user_id", 1)))
+
+    if _wants_stream():
+        return _stream_chat(service, message, context)
+
     try:
         response = _run_async(
             service.chat_with_context(message, context)
@@ -193,75 +333,46 @@ def get_insights():
     """
     Gera insights sobre padrões de categorização.
 
+    O contexto (totais por categoria, principais estabelecimentos, variação
+    mês a mês e transações recentes) vem do agregado por usuário, recalculado
+    após importações e revisões.
+
     Query params:
         user_id: ID do usuário (opcional, padrão: 1)
-        limit: Quantidade de transações a analisar (opcional, padrão: 50)
 
     Returns:
         JSON com insights sobre gastos
     """
+    from openai import OpenAIError
+
     service = get_ai_service()
     if not service:
         return jsonify({"error": "API OpenAI não configurada"}), 503
 
     user_id = request.args.get("user_id", 1, type=int)
-    limit = request.args.get("limit", 50, type=int)
-
-    session = get_session()
 
     try:
-        # Buscar transações aprovadas recentes
-        query = session.query(PendingTransaction).filter(
-            PendingTransaction.review_status.in_([
-                ReviewStatus.APPROVED,
-                ReviewStatus.MODIFIED
-            ])
-        ).order_by(PendingTransaction.date.desc()).limit(limit)
-
-        transactions = query.all()
+        context = InsightContextBuilder(get_session).build(user_id)
 
-        if not transactions:
+        if not context["transactions"]:
             return jsonify({
                 "message": "Nenhuma transação aprovada encontrada",
                 "insights": None
             }), 200
 
-        # Converter para formato para IA
-        tx_list = []
-        categories_dict = {}
-
-        for tx in transactions:
-            category = tx.final_category or "Sem categoria"
-
-            tx_list.append({
-                "date": tx.date.isoformat() if tx.date else None,
-                "description": tx.description,
-                "amount": float(tx.amount) if tx.amount else 0.0,
-                "category": category
-            })
-
-            # Agregar por categoria
-            if category not in categories_dict:
-                categories_dict[category] = {"count": 0, "total": 0.0}
-
-            categories_dict[category]["count"] += 1
-            categories_dict[category]["total"] += float(tx.amount) if tx.amount else 0.0
-
-        # Converter dict para lista
-        categories_list = [
-            {"name": name, **stats}
-            for name, stats in categories_dict.items()
-        ]
-
-        # Gerar insights
         insights = _run_async(
-            service.generate_insights(categories_list, tx_list[:10])
+            service.generate_insights(
+                context["categories"],
+                context["recent_transactions"],
+                merchants=context["top_merchants"],
+                month_over_month=context["month_over_month"],
+            )
         )
 
         return jsonify({
             "insights": insights,
-            "analyzed_transactions": len(tx_list),
-            "categories_count": len(categories_list)
+            "analyzed_transactions": context["transactions"],
+            "categories_count": len(context["categories"])
         }), 200
 
     except OpenAIError as e:
@@ -273,8 +384,6 @@ def get_insights():
     except Exception as e:
         current_app.logger.exception("Erro ao gerar insights")
         return jsonify({"error": str(e)}), 500
-    finally:
-        session.close()
 
 
 @ai_bp.post("/projections")
@@ -299,6 +408,8 @@ def create_projections():
     Returns:
         JSON com projeções e plano de ação
     """
+    from openai import OpenAIError
+
     service = get_ai_service()
     if not service:
         return jsonify({"error": "API OpenAI não configurada"}), 503
@@ -5,6 +5,7 @@ from flask import Blueprint, request, jsonify, current_app
 from functools import wraps
 
 from app.services import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
@@ -15,6 +16,14 @@ def get_auth_service() -> AuthService:
     return current_app.extensions['auth_service']
 
 
+@auth_bp.errorhandler(PasswordHasherBusy)
+def hasher_busy(error):
+    """Pool de hash de senhas saturado: pedir ao cliente que tente de novo."""
+    response = jsonify({'error': 'Muitas tentativas simultâneas. Tente novamente em instantes.'})
+    response.headers['Retry-After'] = '1'
+    return response, 429
+
+
 def token_required(f):
     """
     Decorator para proteger rotas que requerem autenticação.
@@ -258,4 +267,49 @@ def change_password(current_user):
     if not success:
         return jsonify({'error': error}), 400
 
-    return jsonify({'message': 'Senha alterada com sucesso'}), 200
+    # Tokens anteriores foram revogados; devolver um novo par
+    return jsonify({
+        'message': 'Senha alterada com sucesso',
+        'access_token': auth_service.generate_access_token(current_user),
+        'refresh_token': auth_service.generate_refresh_token(current_user),
+        'token_type': 'Bearer',
+        'expires_in': auth_service.access_token_expires
+    }), 200
+
+
+@auth_bp.route('/users/<int:user_id>/deactivate', methods=['POST'])
+@admin_required
+def deactivate_user(current_user, user_id):
+    """
+    Desativa um usuário e revoga seus tokens (somente admin).
+
+    Response JSON:
+        {
+            "message": "Usuário desativado com sucesso"
+        }
+    """
+    auth_service = get_auth_service()
+    success, error = auth_service.deactivate_user(user_id)
+
+    if not success:
+        return jsonify({'error': error}), 404
+
+    return jsonify({'message': 'Usuário desativado com sucesso'}), 200
+
+
+@auth_bp.route('/metrics', methods=['GET'])
+@admin_required
+def auth_metrics(current_user):
+    """
+    Custo médio da autenticação por requisição e estatísticas do cache
+    de usuários (somente admin).
+
+    Response JSON:
+        {
+            "requests": 120,
+            "avg_ms": 0.41,
+            "outcomes": {"cache_hit": {...}, "db_lookup": {...}},
+            "user_cache": {"hits": 110, "misses": 10, ...}
+        }
+    """
+    return jsonify(get_auth_service().auth_metrics()), 200
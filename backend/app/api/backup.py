@@ -2,48 +2,62 @@
 API endpoints for backup and export operations.
 """
 import json
+import os
+import zipfile
 from datetime import datetime
-from flask import Blueprint, request, jsonify, current_app, send_file
-from io import BytesIO
+from flask import Blueprint, Response, request, jsonify, current_app, send_file, stream_with_context
 
-from ..services.backup_service import BackupService
-from ..database import get_session
+from ..services.backup_service import SNAPSHOT_EXTENSION, BackupService
+from ..database import get_read_session, get_session, read_only
 from .auth import token_required
 
 
 backup_bp = Blueprint('backup', __name__, url_prefix='/api/backup')
 
+# Average serialized size of one exported row, used by /summary
+ESTIMATED_ROW_BYTES = 300
 
-def get_backup_service() -> BackupService:
-    """Factory for BackupService"""
-    return BackupService(session_factory=get_session)
+
+def get_backup_service(read: bool = False) -> BackupService:
+    """Factory for BackupService; exports read from the replica when configured"""
+    return BackupService(session_factory=get_read_session if read else get_session)
 
 
 @backup_bp.route('/export/json', methods=['GET'])
 @token_required
+@read_only
 def export_json(user):
     """
     Export complete user data as JSON backup.
 
-    Response: JSON file download with all user data
+    Query params:
+    - format: json (default) or ndjson (one row per line)
+    - since: watermark of a previous backup (ISO datetime); exports only
+      rows changed after it, plus tombstones for deleted transactions
+
+    Response: JSON file download with all user data, streamed table by table
     """
+    ndjson = request.args.get('format', 'json').lower() == 'ndjson'
+    since = None
+    if request.args.get('since'):
+        try:
+            since = datetime.fromisoformat(request.args['since'])
+        except ValueError:
+            return jsonify({'error': 'Invalid since format'}), 400
     try:
-        service = get_backup_service()
-        backup_data = service.export_full_backup(user['id'])
-
-        # Create JSON string with pretty formatting
-        json_str = json.dumps(backup_data, indent=2, ensure_ascii=False)
+        service = get_backup_service(read=True)
+        chunks = service.stream_json_backup(user['id'], ndjson=ndjson, since=since)
 
         # Create filename with timestamp
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-        filename = f'flow_forecaster_backup_{user["id"]}_{timestamp}.json'
-
-        # Return as downloadable file
-        return send_file(
-            BytesIO(json_str.encode('utf-8')),
-            mimetype='application/json',
-            as_attachment=True,
-            download_name=filename
+        extension = 'ndjson' if ndjson else 'json'
+        kind = 'backup' if since is None else 'incremental'
+        filename = f'flow_forecaster_{kind}_{user["id"]}_{timestamp}.{extension}'
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype='application/x-ndjson' if ndjson else 'application/json',
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
 
     except Exception as e:
@@ -53,6 +67,7 @@ def export_json(user):
 
 @backup_bp.route('/export/excel', methods=['GET'])
 @token_required
+@read_only
 def export_excel(user):
     """
     Export user data as Excel file (XLSX).
@@ -60,18 +75,16 @@ def export_excel(user):
     Response: Excel file download with data in multiple sheets
     """
     try:
-        service = get_backup_service()
-        excel_bytes = service.export_to_excel(user['id'])
+        service = get_backup_service(read=True)
+        path = service.export_to_excel_file(user['id'])
 
         # Create filename with timestamp
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         filename = f'flow_forecaster_data_{user["id"]}_{timestamp}.xlsx'
 
-        # Return as downloadable file
-        return send_file(
-            BytesIO(excel_bytes),
+        return _send_temp_file(
+            path,
             mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
             download_name=filename
         )
 
@@ -82,14 +95,87 @@ def export_excel(user):
         return jsonify({'error': 'Failed to export Excel file'}), 500
 
 
+@backup_bp.route('/export/csv', methods=['GET'])
+@token_required
+@read_only
+def export_csv(current_user):
+    """
+    Export user data as a ZIP with one CSV file per entity.
+
+    Response: ZIP file download
+    """
+    try:
+        service = get_backup_service(read=True)
+        path = service.export_to_csv_zip_file(current_user.id)
+
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        filename = f'flow_forecaster_data_{current_user.id}_{timestamp}.zip'
+
+        return _send_temp_file(path, mimetype='application/zip', download_name=filename)
+
+    except Exception as e:
+        current_app.logger.error(f"Error exporting CSV: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to export CSV files'}), 500
+
+
+@backup_bp.route('/export/snapshot', methods=['GET'])
+@token_required
+@read_only
+def export_snapshot(current_user):
+    """
+    Export user data as a compact snapshot (ZIP with per-entity NDJSON).
+
+    Smaller and faster to restore than the JSON backup; accepted by
+    /import and /validate.
+    """
+    try:
+        service = get_backup_service(read=True)
+        path = service.export_snapshot_file(current_user.id)
+
+        timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        filename = f'flow_forecaster_backup_{current_user.id}_{timestamp}{SNAPSHOT_EXTENSION}'
+
+        return _send_temp_file(path, mimetype='application/zip', download_name=filename)
+
+    except Exception as e:
+        current_app.logger.error(f"Error exporting snapshot: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to export snapshot'}), 500
+
+
+def _is_snapshot(file) -> bool:
+    """Whether an uploaded file is a snapshot (ZIP) rather than JSON"""
+    is_zip = zipfile.is_zipfile(file.stream)
+    file.stream.seek(0)
+    return is_zip
+
+
+def _send_temp_file(path: str, mimetype: str, download_name: str):
+    """Send a temp export file and remove it once the response is closed"""
+    try:
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=download_name
+        )
+    except Exception:
+        os.remove(path)
+        raise
+    # a passthrough response is handed to the server's file wrapper and
+    # never closed, so the cleanup below would not run
+    response.direct_passthrough = False
+    response.call_on_close(lambda: os.path.exists(path) and os.remove(path))
+    return response
+
+
 @backup_bp.route('/import', methods=['POST'])
 @token_required
-def import_backup(user):
+def import_backup(current_user):
     """
     Restore data from JSON backup.
 
     Request:
-    - JSON file upload or JSON body
+    - JSON file upload, snapshot file upload or JSON body
     - Query param: overwrite=true (optional, DANGEROUS - deletes existing data)
 
     Response:
@@ -112,12 +198,18 @@ def import_backup(user):
             backup_data = request.get_json()
         elif 'file' in request.files:
             file = request.files['file']
-            if not file.filename.endswith('.json'):
-                return jsonify({'error': 'Only JSON files are supported'}), 400
-            try:
-                backup_data = json.load(file)
-            except json.JSONDecodeError:
-                return jsonify({'error': 'Invalid JSON file'}), 400
+            if _is_snapshot(file):
+                try:
+                    backup_data = get_backup_service().read_snapshot(file.stream)
+                except (zipfile.BadZipFile, KeyError, ValueError) as e:
+                    return jsonify({'error': f'Invalid snapshot file: {e}'}), 400
+            elif not file.filename.endswith('.json'):
+                return jsonify({'error': 'Only JSON and snapshot files are supported'}), 400
+            else:
+                try:
+                    backup_data = json.load(file)
+                except json.JSONDecodeError:
+                    return jsonify({'error': 'Invalid JSON file'}), 400
         else:
             return jsonify({'error': 'No backup data provided. Send JSON body or file upload.'}), 400
 
@@ -127,11 +219,11 @@ def import_backup(user):
 
         # Warning for overwrite
         if overwrite:
-            current_app.logger.warning(f"User {user['id']} is performing OVERWRITE restore")
+            current_app.logger.warning(f"User {current_user.id} is performing OVERWRITE restore")
 
         service = get_backup_service()
         stats = service.import_full_backup(
-            user['id'],
+            current_user.id,
             backup_data,
             overwrite=overwrite
         )
@@ -149,8 +241,54 @@ def import_backup(user):
         return jsonify({'error': 'Failed to import backup'}), 500
 
 
+@backup_bp.route('/import/chain', methods=['POST'])
+@token_required
+def import_backup_chain(current_user):
+    """
+    Restore a base backup followed by incremental backups.
+
+    Request (multipart):
+    - base: full backup file (JSON or snapshot)
+    - deltas: incremental JSON backups, oldest first (repeatable field)
+    - Query param: overwrite=true (optional, DANGEROUS - deletes existing data)
+    """
+    try:
+        overwrite = request.args.get('overwrite', 'false').lower() == 'true'
+        if 'base' not in request.files:
+            return jsonify({'error': 'No base backup provided'}), 400
+
+        service = get_backup_service()
+        base_file = request.files['base']
+        try:
+            if _is_snapshot(base_file):
+                base = service.read_snapshot(base_file.stream)
+            else:
+                base = json.load(base_file)
+            deltas = [json.load(f) for f in request.files.getlist('deltas')]
+        except (zipfile.BadZipFile, KeyError, ValueError):
+            return jsonify({'error': 'Invalid backup file'}), 400
+
+        if overwrite:
+            current_app.logger.warning(f"User {current_user.id} is performing OVERWRITE restore")
+
+        stats = service.restore_backup_chain(current_user.id, base, deltas, overwrite=overwrite)
+
+        return jsonify({
+            'success': True,
+            'statistics': stats,
+            'message': 'Backup chain restored successfully'
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error importing backup chain: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to import backup chain'}), 500
+
+
 @backup_bp.route('/summary', methods=['GET'])
 @token_required
+@read_only
 def get_backup_summary(user):
     """
     Get summary of what would be exported (without actually exporting).
@@ -170,18 +308,17 @@ def get_backup_summary(user):
     }
     """
     try:
-        service = get_backup_service()
-        backup_data = service.export_full_backup(user['id'])
+        service = get_backup_service(read=True)
+        statistics = service.count_backup_rows(user['id'])
 
-        # Calculate estimated size
-        json_str = json.dumps(backup_data)
-        size_kb = len(json_str.encode('utf-8')) / 1024
+        # Rough estimate: exporting just to measure would defeat the purpose
+        size_kb = sum(statistics.values()) * ESTIMATED_ROW_BYTES / 1024
 
         return jsonify({
             'user_id': user['id'],
-            'statistics': backup_data['metadata']['statistics'],
+            'statistics': statistics,
             'estimated_size_kb': round(size_kb, 2),
-            'export_date': backup_data['metadata']['export_date']
+            'export_date': datetime.utcnow().isoformat()
         }), 200
 
     except Exception as e:
@@ -191,11 +328,12 @@ def get_backup_summary(user):
 
 @backup_bp.route('/validate', methods=['POST'])
 @token_required
-def validate_backup(user):
+def validate_backup(current_user):
     """
     Validate a backup file before importing.
 
-    Request: JSON file upload or JSON body
+    Request: JSON file upload, snapshot file upload or JSON body.
+    Snapshots are validated member by member without loading all rows.
 
     Response:
     {
@@ -213,6 +351,8 @@ def validate_backup(user):
             backup_data = request.get_json()
         elif 'file' in request.files:
             file = request.files['file']
+            if _is_snapshot(file):
+                return jsonify(get_backup_service().validate_snapshot(file.stream)), 200
             try:
                 backup_data = json.load(file)
             except json.JSONDecodeError:
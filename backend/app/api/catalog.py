@@ -7,14 +7,14 @@ from typing import Optional
 
 from flask import Blueprint, jsonify, request
 
-from ..database import get_session
+from ..database import get_read_session, get_session, read_only
 from ..services.catalog_service import CatalogService
 
 catalog_bp = Blueprint("catalog", __name__, url_prefix="/api/catalog")
 
 
-def get_catalog_service() -> CatalogService:
-    return CatalogService(get_session)
+def get_catalog_service(read: bool = False) -> CatalogService:
+    return CatalogService(get_read_session if read else get_session)
 
 
 def _bool_arg(name: str) -> bool:
@@ -48,12 +48,18 @@ def _optional_float(value: Optional[object]) -> Optional[float]:
 
 # --- Categorias / Subcategorias ---
 @catalog_bp.get("/categories")
+@read_only
 def list_categories():
-    service = get_catalog_service()
+    service = get_catalog_service(read=True)
+    user_id = request.args.get("user_id", 1, type=int)
+    if _bool_arg("tree"):
+        items = service.category_tree(include_inactive=_bool_arg("include_inactive"), user_id=user_id)
+        return jsonify({"items": items})
     items = service.list_categories(
         category_type=request.args.get("type"),
         parent_id=request.args.get("parent_id", type=int),
         include_inactive=_bool_arg("include_inactive"),
+        user_id=user_id,
     )
     return jsonify({"items": items})
 
@@ -142,8 +148,9 @@ def delete_category(category_id: int):
 
 # --- Instituições ---
 @catalog_bp.get("/institutions")
+@read_only
 def list_institutions():
-    service = get_catalog_service()
+    service = get_catalog_service(read=True)
     items = service.list_institutions(include_inactive=_bool_arg("include_inactive"))
     return jsonify({"items": items})
 
@@ -217,8 +224,9 @@ def delete_institution(institution_id: int):
 
 # --- Cartões ---
 @catalog_bp.get("/credit-cards")
+@read_only
 def list_credit_cards():
-    service = get_catalog_service()
+    service = get_catalog_service(read=True)
     items = service.list_credit_cards(
         include_inactive=_bool_arg("include_inactive"),
         institution_id=request.args.get("institution_id", type=int),
@@ -15,9 +15,13 @@ def _service() -> InvestmentService:
     return InvestmentService(get_session)
 
 
+def _include_inactive() -> bool:
+    return str(request.args.get("include_inactive", "")).lower() in {"1", "true", "yes", "on"}
+
+
 @investments_bp.get("")
 def list_investments():
-    items = _service().list_investments(include_inactive=str(request.args.get("include_inactive", "")).lower() in {"1", "true", "yes", "on"})
+    items = _service().list_investments(include_inactive=_include_inactive())
     return jsonify({"items": items})
 
 
@@ -111,7 +115,10 @@ def delete_dividend(dividend_id: int):
 
 @investments_bp.get("/summary")
 def portfolio_summary():
-    data = _service().portfolio_summary()
+    data = _service().portfolio_summary(
+        user_id=request.args.get("user_id", 1, type=int),
+        include_inactive=_include_inactive(),
+    )
     return jsonify(data)
 
 
@@ -131,7 +138,49 @@ def redeem(item_id: int):
     return jsonify(updated)
 
 
+@investments_bp.get("/<int:item_id>/events")
+def list_events(item_id: int):
+    items = _service().list_events(item_id)
+    if items is None:
+        return jsonify({"error": "Investimento não encontrado"}), 404
+    return jsonify({"items": items})
+
+
+@investments_bp.post("/<int:item_id>/valuations")
+def record_valuation(item_id: int):
+    data = request.get_json(silent=True) or {}
+    try:
+        updated = _service().record_valuation(
+            investment_id=item_id,
+            value=float(data["value"]),
+            valued_at=data.get("date"),
+        )
+    except (KeyError, ValueError, TypeError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    if not updated:
+        return jsonify({"error": "Investimento não encontrado"}), 404
+    return jsonify(updated), 201
+
+
+@investments_bp.get("/history")
+def value_history():
+    try:
+        data = _service().value_history(
+            user_id=request.args.get("user_id", 1, type=int),
+            granularity=request.args.get("granularity", "month"),
+            start=request.args.get("start"),
+            end=request.args.get("end"),
+            include_inactive=request.args.get("include_inactive", "true").lower() in {"1", "true", "yes", "on"},
+        )
+    except (ValueError, TypeError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(data)
+
+
 @investments_bp.get("/performance")
 def performance():
-    data = _service().performance()
+    data = _service().performance(
+        user_id=request.args.get("user_id", 1, type=int),
+        include_inactive=_include_inactive(),
+    )
     return jsonify({"items": data})
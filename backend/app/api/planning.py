@@ -5,7 +5,9 @@ from __future__ import annotations
 
 from flask import Blueprint, jsonify, request
 
-from ..database import get_session
+from ..database import get_read_session, get_session, read_only
+from ..services.cashflow_service import CashFlowForecaster
+from ..services.goal_simulator import DEFAULT_PATHS, GoalSimulator
 from ..services.planning_service import PlanningService
 
 planning_bp = Blueprint("planning", __name__, url_prefix="/api")
@@ -18,8 +20,8 @@ def _bool_arg(name: str, default: bool = False) -> bool:
     return str(value).lower() in {"1", "true", "yes", "on"}
 
 
-def _planning_service() -> PlanningService:
-    return PlanningService(get_session)
+def _planning_service(read: bool = False) -> PlanningService:
+    return PlanningService(get_read_session if read else get_session)
 
 def _int_arg(name: str, default: Optional[int] = None) -> Optional[int]:
     value = request.args.get(name, default=None if default is None else str(default))
@@ -33,8 +35,9 @@ def _int_arg(name: str, default: Optional[int] = None) -> Optional[int]:
 
 # --- Plans ---
 @planning_bp.get("/plans")
+@read_only
 def list_plans():
-    service = _planning_service()
+    service = _planning_service(read=True)
     items = service.list_plans(include_inactive=_bool_arg("include_inactive"))
     return jsonify({"items": items})
 
@@ -90,6 +93,35 @@ def delete_plan(plan_id: int):
     return ("", 204)
 
 
+@planning_bp.get("/plans/simulations")
+def simulate_plans():
+    try:
+        items = GoalSimulator(get_session).simulate(
+            user_id=_int_arg("user_id", 1),
+            paths=_int_arg("paths", DEFAULT_PATHS),
+            seed=_int_arg("seed"),
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"items": items})
+
+
+@planning_bp.get("/plans/<int:plan_id>/simulation")
+def simulate_plan(plan_id: int):
+    try:
+        items = GoalSimulator(get_session).simulate(
+            user_id=_int_arg("user_id", 1),
+            plan_id=plan_id,
+            paths=_int_arg("paths", DEFAULT_PATHS),
+            seed=_int_arg("seed"),
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if not items:
+        return jsonify({"error": "Plano não encontrado"}), 404
+    return jsonify(items[0])
+
+
 # --- Income projections ---
 @planning_bp.get("/income-projections")
 def list_income_projections():
@@ -153,6 +185,21 @@ def planned_surplus():
     return jsonify(data)
 
 
+# --- Cash-flow forecast ---
+@planning_bp.get("/plans/cashflow-forecast")
+@read_only
+def cashflow_forecast():
+    try:
+        data = CashFlowForecaster(get_read_session).forecast(
+            user_id=_int_arg("user_id", 1),
+            months=_int_arg("months", 12),
+            granularity=request.args.get("granularity", "month"),
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(data)
+
+
 # --- Planning notes ---
 @planning_bp.get("/plans/notes")
 def list_notes():
@@ -211,8 +258,9 @@ def delete_recurring_plan(item_id: int):
 
 # --- Category budgets (planejamento mensal) ---
 @planning_bp.get("/plans/budgets")
+@read_only
 def list_budgets():
-    service = _planning_service()
+    service = _planning_service(read=True)
     items = service.list_category_budgets(
         month=_int_arg("month"),
         year=_int_arg("year"),
@@ -263,8 +311,9 @@ def delete_budget(budget_id: int):
 
 
 @planning_bp.get("/plans/budget-compliance")
+@read_only
 def budget_compliance():
-    service = _planning_service()
+    service = _planning_service(read=True)
     items = service.budget_compliance(
         start_date=request.args.get("start"),
         end_date=request.args.get("end"),
@@ -5,14 +5,14 @@ from __future__ import annotations
 
 from flask import Blueprint, jsonify, request
 
-from ..database import get_session
+from ..database import get_read_session, read_only
 from ..services.analytics_service import AnalyticsService
 
 reports_bp = Blueprint("reports", __name__, url_prefix="/api/reports")
 
 
 def get_service() -> AnalyticsService:
-    return AnalyticsService(get_session)
+    return AnalyticsService(get_read_session)
 
 
 def _bool_arg(name: str, default: bool = False) -> bool:
@@ -23,6 +23,7 @@ def _bool_arg(name: str, default: bool = False) -> bool:
 
 
 @reports_bp.get("/summary")
+@read_only
 def summary():
     service = get_service()
     data = service.summary(
@@ -34,6 +35,7 @@ def summary():
 
 
 @reports_bp.get("/monthly")
+@read_only
 def monthly():
     service = get_service()
     months_back = request.args.get("months", default=6, type=int)
@@ -46,6 +48,7 @@ def monthly():
     return jsonify(data)
 
 @reports_bp.get("/monthly-categories")
+@read_only
 def monthly_categories():
     service = get_service()
     months_back = request.args.get("months", default=6, type=int)
@@ -59,6 +62,7 @@ def monthly_categories():
 
 
 @reports_bp.get("/compare")
+@read_only
 def compare():
     service = get_service()
     data = service.compare_periods(
@@ -5,19 +5,23 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from flask import Blueprint, current_app, jsonify, request
 from werkzeug.utils import secure_filename
 
 from ..database import get_session
-from ..services.training_service import TrainingService
+
+if TYPE_CHECKING:  # pandas/scikit-learn só são carregados no primeiro uso
+    from ..services.training_service import TrainingService
 
 training_bp = Blueprint("training", __name__, url_prefix="/api/training")
 
 
 def get_training_service() -> TrainingService:
     """Factory para criar TrainingService."""
+    from ..services.training_service import TrainingService
+
     models_folder = current_app.config.get("ML_MODELS_FOLDER", "app/ml/models")
     upload_folder = current_app.config.get("UPLOAD_FOLDER", "uploads")
 
@@ -4,6 +4,7 @@ API endpoints for manual transaction management (cash flow).
 from flask import Blueprint, request, jsonify, current_app
 from functools import wraps
 
+from ..services.recurrence_service import RecurrenceService
 from ..services.transaction_service import TransactionService
 from ..database import get_session
 from .auth import token_required
@@ -17,6 +18,11 @@ def get_transaction_service() -> TransactionService:
     return TransactionService(session_factory=get_session)
 
 
+def get_recurrence_service() -> RecurrenceService:
+    """Factory for RecurrenceService"""
+    return RecurrenceService(session_factory=get_session)
+
+
 @transactions_bp.route('/', methods=['POST'])
 @token_required
 def create_transaction(user):
@@ -340,6 +346,94 @@ def duplicate_transaction(user, transaction_id):
         return jsonify({'error': 'Failed to duplicate transaction'}), 500
 
 
+@transactions_bp.route('/<int:transaction_id>/recurrence', methods=['PUT'])
+@token_required
+def set_recurrence(current_user, transaction_id):
+    """
+    Store a recurrence schedule on the transaction and materialize its
+    future occurrences in one go.
+
+    Request body:
+    {
+        "rule": "FREQ=MONTHLY;INTERVAL=1;COUNT=12",
+        "horizon": "2026-12-31T00:00:00"  // optional, default one year ahead
+    }
+
+    Response:
+    {
+        "transaction": {...},
+        "created": 11
+    }
+    """
+    try:
+        data = request.get_json()
+
+        if not data or not data.get('rule'):
+            return jsonify({'error': 'rule is required'}), 400
+
+        service = get_recurrence_service()
+        result = service.set_rule(transaction_id, current_user.id, data['rule'], data.get('horizon'))
+
+        return jsonify(result), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error setting recurrence: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to set recurrence'}), 500
+
+
+@transactions_bp.route('/<int:transaction_id>/recurrence', methods=['DELETE'])
+@token_required
+def clear_recurrence(current_user, transaction_id):
+    """
+    Remove the recurrence schedule from the transaction.
+
+    Query parameters:
+    - remove_future: boolean (default false) - soft delete pending future occurrences
+    """
+    try:
+        remove_future = request.args.get('remove_future', 'false').lower() == 'true'
+
+        service = get_recurrence_service()
+        result = service.clear_rule(transaction_id, current_user.id, remove_future=remove_future)
+
+        return jsonify(result), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        current_app.logger.error(f"Error clearing recurrence: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to clear recurrence'}), 500
+
+
+@transactions_bp.route('/<int:transaction_id>/recurrence/materialize', methods=['POST'])
+@token_required
+def materialize_recurrence(current_user, transaction_id):
+    """
+    Materialize occurrences of the schedule up to a horizon.
+    Already materialized dates are never re-created.
+
+    Request body:
+    {
+        "horizon": "2027-12-31T00:00:00"  // optional, default one year ahead
+    }
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+
+        service = get_recurrence_service()
+        created = service.materialize(transaction_id, current_user.id, data.get('horizon'))
+
+        return jsonify({'created': created}), 200
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Error materializing recurrence: {e}", exc_info=True)
+        return jsonify({'error': 'Failed to materialize recurrence'}), 500
+
+
 @transactions_bp.route('/summary', methods=['GET'])
 @token_required
 def get_summary(user):
@@ -3,24 +3,112 @@ Infraestrutura de conexão com banco via SQLAlchemy.
 """
 from __future__ import annotations
 
+import threading
+import time
 from contextlib import contextmanager
-from typing import Dict, Generator, Optional
+from typing import Any, Callable, Dict, Generator, Optional
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.engine import Engine
 from sqlalchemy.orm import scoped_session, sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 
 from .config import Config
 from .models.base import Base
 
 _engine: Optional[Engine] = None
 _session_factory: Optional[scoped_session] = None
+# réplica de leitura opcional (DATABASE_READ_URL)
+_read_engine: Optional[Engine] = None
+_read_session_factory: Optional[scoped_session] = None
+
+# após uma escrita, o cliente lê do primário até o instante (epoch) do cookie
+REPLICA_STICKY_COOKIE = "ff_primary_until"
+
+# opções do unit of work da requisição em andamento na thread, até o primeiro get_session()
+_pending_request = threading.local()
+
+
+class PoolMetrics:
+    """
+    Contadores do pool de conexões: checkouts, conexões em uso (atual e
+    pico) e espera para obter a conexão de cada requisição.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def attach(self, engine: Engine) -> None:
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def record_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def snapshot(self, engine: Optional[Engine] = None) -> Dict[str, Any]:
+        with self._lock:
+            data = {
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "request_checkouts": self.waits,
+                "avg_wait_ms": round(self.wait_total / self.waits * 1000, 3) if self.waits else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 3),
+            }
+        pool = engine.pool if engine is not None else None
+        if isinstance(pool, QueuePool):
+            data["pool_size"] = pool.size()
+            data["overflow"] = pool.overflow()
+        return data
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+            self.checked_out = max(self.checked_out - 1, 0)
+
+
+pool_metrics = PoolMetrics()
+
+
+def pool_sizing(threads: int, extra: int = 2) -> Dict[str, int]:
+    """
+    Tamanho do pool por processo: cada thread do gunicorn atende uma
+    requisição por vez e usa uma única conexão (unit of work), mais algumas
+    conexões para threads de fundo (treino, IA).
+    """
+    return {"pool_size": threads + extra, "max_overflow": threads}
 
 
 def init_engine(
     database_url: Optional[str] = None,
     echo: bool = False,
     engine_options: Optional[Dict] = None,
+    read_url: Optional[str] = None,
 ) -> Engine:
     """
     Inicializa o engine SQLAlchemy e sessão compartilhada.
@@ -28,35 +116,171 @@ def init_engine(
     Args:
         database_url: URL de conexão do banco
         echo: Flag para logar SQL
+        read_url: URL opcional de uma réplica de leitura
 
     Returns:
         Engine inicializado
     """
-    global _engine, _session_factory
+    global _engine, _session_factory, _read_engine, _read_session_factory, pool_metrics
 
     db_url = database_url or Config.SQLALCHEMY_DATABASE_URI
     options = {"future": True, **(engine_options or {})}
     _engine = create_engine(db_url, echo=echo, **options)
+    pool_metrics = PoolMetrics()
+    pool_metrics.attach(_engine)
     _session_factory = scoped_session(
         sessionmaker(bind=_engine, autocommit=False, autoflush=False)
     )
+    _read_engine = _read_session_factory = None
+    if read_url:
+        _read_engine = create_engine(read_url, echo=echo, **options)
+        pool_metrics.attach(_read_engine)
+        _read_session_factory = scoped_session(
+            sessionmaker(bind=_read_engine, autocommit=False, autoflush=False)
+        )
     Base.metadata.bind = _engine
     return _engine
 
 
 def init_app(app) -> Engine:
     """
-    Inicializa engine a partir da configuração Flask e registra teardown.
+    Inicializa engine a partir da configuração Flask e registra o unit of
+    work por requisição (aberto no primeiro get_session() da requisição,
+    descartado no teardown).
     """
+    engine_options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    is_sqlite = make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name() == "sqlite"
+    if "pool_size" not in engine_options and not is_sqlite:
+        engine_options.update(pool_sizing(app.config.get("WEB_THREADS", 2), app.config.get("DB_POOL_EXTRA", 2)))
     engine = init_engine(
         database_url=app.config["SQLALCHEMY_DATABASE_URI"],
         echo=app.config.get("SQLALCHEMY_ECHO", False),
-        engine_options=app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}),
+        engine_options=engine_options,
+        read_url=app.config.get("SQLALCHEMY_DATABASE_READ_URI"),
     )
+    if "pool_size" in engine_options:
+        app.logger.info(
+            "DB pool: %s + %s overflow por worker (%s workers)",
+            engine_options["pool_size"],
+            engine_options.get("max_overflow", 10),
+            app.config.get("WEB_WORKERS", 1),
+        )
+
+    sticky_seconds = app.config.get("REPLICA_STICKY_SECONDS", 5)
+
+    @app.before_request
+    def _open_request_session():
+        from flask import current_app, request
+
+        view = current_app.view_functions.get(request.endpoint)
+        read_only = getattr(view, "_read_only", False)
+        defer_request_session(read_only=read_only, use_replica=read_only and not _is_sticky(request))
+
+    @app.after_request
+    def _stick_to_primary_after_write(response):
+        # read-your-writes: quem acabou de escrever lê do primário por alguns segundos
+        if _read_engine is not None and _session_factory.registry.has():
+            if _session_factory.registry().info.get("wrote"):
+                response.set_cookie(
+                    REPLICA_STICKY_COOKIE,
+                    str(int(time.time() + sticky_seconds)),
+                    max_age=sticky_seconds,
+                    httponly=True,
+                    samesite="Lax",
+                )
+        return response
+
+    app.teardown_request(remove_session)
     app.teardown_appcontext(remove_session)
     return engine
 
 
+def read_only(view: Callable) -> Callable:
+    """
+    Marca uma rota como somente leitura: a requisição roda em uma transação
+    read-only e qualquer flush levanta erro.
+    """
+    view._read_only = True
+    return view
+
+
+def _is_sticky(request) -> bool:
+    try:
+        return float(request.cookies.get(REPLICA_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def defer_request_session(read_only: bool = False, use_replica: bool = False) -> None:
+    """
+    Registra o unit of work da requisição sem abrir conexão: ela só é
+    retirada do pool no primeiro get_session()/get_read_session(), então
+    rotas que não usam o banco (health, IA, respostas 429) não ocupam o pool.
+    """
+    _pending_request.options = {"read_only": read_only, "use_replica": use_replica}
+
+
+def _in_request_session() -> bool:
+    return _session_factory.registry.has() or getattr(_pending_request, "options", None) is not None
+
+
+def begin_request_session(read_only: bool = False, use_replica: bool = False) -> Optional[Session]:
+    """
+    Abre o unit of work da requisição: uma conexão do pool e uma sessão
+    ligada a ela, compartilhadas por todos os serviços via get_session().
+
+    Os serviços continuam fazendo commit/close normalmente; como a sessão
+    está ligada à conexão da requisição, isso não devolve a conexão ao pool
+    (nem repete o pre-ping) entre uma operação e outra.
+
+    Com ``use_replica`` e uma réplica configurada, a conexão vem da réplica.
+    Se a thread já tem uma sessão ativa (ex.: testes), ela é reaproveitada.
+    """
+    if _session_factory is None or _session_factory.registry.has():
+        return None
+
+    engine = _read_engine if use_replica and _read_engine is not None else get_engine()
+    started = time.perf_counter()
+    connection = engine.connect()
+    pool_metrics.record_wait(time.perf_counter() - started)
+
+    if read_only:
+        connection = _read_only_connection(connection)
+    session = _session_factory.session_factory(bind=connection)
+    session.info["request_connection"] = connection
+    session.info["read_only"] = read_only
+    _session_factory.registry.set(session)
+    return session
+
+
+def _read_only_connection(connection):
+    if connection.dialect.name == "postgresql":
+        return connection.execution_options(postgresql_readonly=True)
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("PRAGMA query_only = ON")
+        connection.commit()
+    return connection
+
+
+@event.listens_for(Session, "before_flush")
+def _reject_read_only_flush(session, flush_context, instances):
+    if session.info.get("read_only"):
+        raise RuntimeError("Escrita em requisição somente leitura")
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_write(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    # insert/update/delete executados direto (session.execute, query.update)
+    # não passam pelo flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
 def get_engine() -> Engine:
     """
     Retorna engine atual ou lança erro caso ainda não tenha sido inicializado.
@@ -68,13 +292,36 @@ def get_engine() -> Engine:
 
 def get_session() -> Session:
     """
-    Obtém uma sessão ligada ao scoped_session global.
+    Obtém uma sessão ligada ao scoped_session global. Dentro de uma
+    requisição, a primeira chamada abre o unit of work.
     """
     if _session_factory is None:
         raise RuntimeError("Session factory not initialized. Call init_engine() first.")
+    options = getattr(_pending_request, "options", None)
+    if options is not None:
+        _pending_request.options = None
+        begin_request_session(**options)
     return _session_factory()
 
 
+def get_read_session() -> Session:
+    """
+    Sessão para consultas que toleram atraso de replicação.
+
+    Dentro de uma requisição devolve a sessão do unit of work (já ligada à
+    réplica nas rotas @read_only, ou ao primário logo após uma escrita).
+    Fora dela, usa a réplica quando DATABASE_READ_URL está configurada.
+    """
+    if _read_session_factory is None or (_session_factory is not None and _in_request_session()):
+        return get_session()
+    return _read_session_factory()
+
+
+def get_read_engine() -> Engine:
+    """Engine da réplica de leitura, ou o primário se não houver réplica."""
+    return _read_engine or get_engine()
+
+
 @contextmanager
 def session_scope() -> Generator[Session, None, None]:
     """
@@ -93,7 +340,28 @@ def session_scope() -> Generator[Session, None, None]:
 
 def remove_session(exception=None):
     """
-    Remove sessão associada ao contexto Flask atual.
+    Remove sessão associada ao contexto Flask atual e devolve ao pool a
+    conexão do unit of work, se houver.
     """
-    if _session_factory is not None:
-        _session_factory.remove()
+    _pending_request.options = None
+    if _session_factory is None:
+        return
+    connection = None
+    if _session_factory.registry.has():
+        session = _session_factory.registry()
+        connection = session.info.pop("request_connection", None)
+        if connection is not None and session.info.pop("read_only", False):
+            if connection.dialect.name == "sqlite":
+                session.close()
+                connection.exec_driver_sql("PRAGMA query_only = OFF")
+                connection.commit()
+    _session_factory.remove()
+    if _read_session_factory is not None:
+        _read_session_factory.remove()
+    if connection is not None:
+        connection.close()
+
+
+def get_pool_metrics() -> Dict[str, Any]:
+    """Métricas do pool de conexões do engine atual."""
+    return pool_metrics.snapshot(_engine)
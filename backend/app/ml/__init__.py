@@ -1,12 +1,24 @@
 """
 Módulo de Machine Learning para classificação de transações.
+
+As classes são carregadas sob demanda: importar o pacote não importa
+pandas/scikit-learn, o que mantém rápida a inicialização da aplicação.
 """
-from .feature_extractor import TransactionFeatureExtractor
-from .model_trainer import TransactionClassifierTrainer
-from .predictor import TransactionPredictor
-
-__all__ = [
-    'TransactionFeatureExtractor',
-    'TransactionClassifierTrainer',
-    'TransactionPredictor'
-]
+from importlib import import_module
+
+_EXPORTS = {
+    'TransactionFeatureExtractor': '.feature_extractor',
+    'TransactionClassifierTrainer': '.model_trainer',
+    'TransactionPredictor': '.predictor',
+    'LazyTransactionPredictor': '.lazy_predictor',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,59 @@
+"""
+Preditor carregado no primeiro uso.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LazyTransactionPredictor:
+    """
+    Adia a importação do scikit-learn e a leitura do modelo (pickle) até a
+    primeira predição, com a mesma interface de ``TransactionPredictor``.
+
+    ``warm_up`` carrega o modelo antecipadamente (em background, se pedido),
+    útil para que o primeiro request de um worker não pague o custo.
+    """
+
+    def __init__(self, model_path: str):
+        self.model_path = model_path
+        self._predictor = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._predictor is not None
+
+    def load(self):
+        """Retorna o ``TransactionPredictor``, carregando-o uma única vez."""
+        if self._predictor is None:
+            with self._lock:
+                if self._predictor is None:
+                    from .predictor import TransactionPredictor
+
+                    self._predictor = TransactionPredictor(self.model_path)
+        return self._predictor
+
+    def warm_up(self, background: bool = False) -> Optional[threading.Thread]:
+        if not background:
+            self.load()
+            return None
+        thread = threading.Thread(target=self._warm_up_quietly, name="predictor-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up_quietly(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            logger.exception("Falha ao pré-carregar o modelo de ML em %s", self.model_path)
+
+    def __getattr__(self, name: str) -> Any:
+        # só é chamado para atributos que não existem no proxy
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
@@ -9,7 +9,7 @@ from .category import Category, CategoryType
 from .institution import Institution
 from .credit_card import CreditCard
 from .investment_type import InvestmentType
-from .investment import Investment, Dividend
+from .investment import Investment, Dividend, InvestmentEvent, InvestmentEventType
 from .financial_plan import FinancialPlan
 from .income_projection import IncomeProjection, IncomeProjectionType
 from .category_budget import CategoryBudget
@@ -32,6 +32,8 @@ __all__ = [
     'InvestmentType',
     'Investment',
     'Dividend',
+    'InvestmentEvent',
+    'InvestmentEventType',
     'FinancialPlan',
     'IncomeProjection',
     'IncomeProjectionType',
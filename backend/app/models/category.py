@@ -13,9 +13,11 @@ from sqlalchemy import (
     DateTime,
     Enum,
     ForeignKey,
+    Index,
     Integer,
     String,
     UniqueConstraint,
+    func,
 )
 from sqlalchemy.orm import relationship
 
@@ -93,3 +95,16 @@ class Category(Base):
             self.icon = icon
         if is_active is not None:
             self.is_active = is_active
+
+
+# Categorias raiz: nome único por usuário e tipo, sem diferenciar caixa
+# (parent_id NULL não conflita em uq_category_per_parent)
+Index(
+    "uq_category_root_name_type",
+    Category.user_id,
+    func.lower(Category.name),
+    Category.type,
+    unique=True,
+    sqlite_where=Category.parent_id.is_(None),
+    postgresql_where=Category.parent_id.is_(None),
+)
@@ -3,6 +3,7 @@ Modelo de investimentos (carteira) e proventos.
 """
 from __future__ import annotations
 
+import enum
 from datetime import datetime, date
 from typing import Optional
 
@@ -11,11 +12,14 @@ from sqlalchemy import (
     Column,
     Date,
     DateTime,
+    Enum,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    false,
 )
 from sqlalchemy.orm import relationship
 
@@ -44,6 +48,12 @@ class Investment(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     dividends = relationship("Dividend", back_populates="investment", cascade="all, delete-orphan")
+    events = relationship(
+        "InvestmentEvent",
+        back_populates="investment",
+        cascade="all, delete-orphan",
+        order_by="InvestmentEvent.occurred_at",
+    )
 
     def to_dict(self) -> dict:
         return {
@@ -114,6 +124,8 @@ class Dividend(Base):
     description = Column(String(200), nullable=True)
     amount = Column(Float, nullable=False, default=0.0)
     received_at = Column(Date, nullable=True)
+    # proventos antigos eram somados ao current_value do investimento
+    counted_in_value = Column(Boolean, default=False, server_default=false(), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -127,6 +139,53 @@ class Dividend(Base):
             "description": self.description,
             "amount": self.amount,
             "received_at": self.received_at.isoformat() if self.received_at else None,
+            "counted_in_value": bool(self.counted_in_value),
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None,
         }
+
+
+class InvestmentEventType(enum.Enum):
+    """Tipo de evento no histórico de uma posição."""
+    CONTRIBUTION = "contribution"  # aporte (amount soma ao valor da posição)
+    REDEMPTION = "redemption"  # resgate (amount sai da posição)
+    DIVIDEND = "dividend"  # provento pago (não altera o valor da posição)
+    VALUATION = "valuation"  # marcação a mercado (value é o valor da posição)
+
+
+class InvestmentEvent(Base):
+    """
+    Histórico append-only de uma posição: aportes, resgates, proventos e
+    marcações a mercado. Correções são registradas como novos eventos (ex.:
+    provento estornado com amount negativo), nunca editando os anteriores.
+    """
+
+    __tablename__ = "investment_events"
+    __table_args__ = (
+        Index("ix_investment_events_investment_date", "investment_id", "occurred_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    investment_id = Column(Integer, ForeignKey("investments.id"), nullable=False)
+    user_id = Column(Integer, nullable=False, default=1, index=True)
+    event_type = Column(Enum(InvestmentEventType), nullable=False)
+    occurred_at = Column(Date, nullable=False)
+    amount = Column(Float, nullable=False, default=0.0)
+    value = Column(Float, nullable=True)
+    notes = Column(String(200), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    investment = relationship("Investment", back_populates="events")
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "investment_id": self.investment_id,
+            "user_id": self.user_id,
+            "event_type": self.event_type.value if self.event_type else None,
+            "occurred_at": self.occurred_at.isoformat() if self.occurred_at else None,
+            "amount": self.amount,
+            "value": self.value,
+            "notes": self.notes,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
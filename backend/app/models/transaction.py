@@ -3,7 +3,7 @@ Transaction model for manual financial transactions.
 Separate from PendingTransaction (import-based) - these are user-created entries.
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, Boolean, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum, Boolean, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 import enum
 
@@ -31,6 +31,9 @@ class Transaction(Base):
     track in their cash flow. These are independent of imported OFX data.
     """
     __tablename__ = 'transactions'
+    __table_args__ = (
+        UniqueConstraint('recurrence_parent_id', 'event_date', name='uq_transaction_recurrence_occurrence'),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
@@ -77,6 +80,12 @@ class Transaction(Base):
     recurrence_parent_id = Column(Integer, ForeignKey('transactions.id'), nullable=True)
     """If this was auto-generated from a recurring transaction, link to parent"""
 
+    recurrence_rule = Column(String(255), nullable=True)
+    """RRULE-like schedule stored on the parent (e.g. FREQ=MONTHLY;INTERVAL=1;COUNT=12)"""
+
+    recurrence_materialized_until = Column(DateTime, nullable=True)
+    """Horizon up to which occurrences of the schedule were already materialized"""
+
     # Metadata
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -124,6 +133,8 @@ class Transaction(Base):
             'status': self.status.value,
             'is_recurring': self.is_recurring,
             'recurrence_parent_id': self.recurrence_parent_id,
+            'recurrence_rule': self.recurrence_rule,
+            'recurrence_materialized_until': self.recurrence_materialized_until.isoformat() if self.recurrence_materialized_until else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'deleted_at': self.deleted_at.isoformat() if self.deleted_at else None
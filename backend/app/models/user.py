@@ -2,6 +2,7 @@
 Modelo de usuário para autenticação.
 """
 from datetime import datetime
+from typing import Optional
 from sqlalchemy import Column, Integer, String, DateTime, Boolean
 from sqlalchemy.orm import relationship
 import bcrypt
@@ -20,6 +21,8 @@ class User(Base):
         full_name: Nome completo do usuário
         is_active: Flag indicando se usuário está ativo
         is_admin: Flag indicando se é administrador
+        token_version: Versão dos tokens; incrementada ao trocar a senha ou
+            desativar o usuário, revogando os tokens emitidos antes
         created_at: Data de criação
         updated_at: Data de atualização
     """
@@ -32,6 +35,7 @@ class User(Base):
     full_name = Column(String(255), nullable=False)
     is_active = Column(Boolean, default=True, nullable=False)
     is_admin = Column(Boolean, default=False, nullable=False)
+    token_version = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
@@ -103,7 +107,8 @@ class User(Base):
         return data
 
     @classmethod
-    def create_user(cls, email: str, password: str, full_name: str, is_admin: bool = False):
+    def create_user(cls, email: str, password: str, full_name: str, is_admin: bool = False,
+                    password_hash: Optional[str] = None):
         """
         Factory method para criar novo usuário.
 
@@ -112,6 +117,8 @@ class User(Base):
             password: Senha em texto plano
             full_name: Nome completo
             is_admin: Se é administrador
+            password_hash: Hash já calculado (ex.: pelo PasswordHasher); se
+                informado, a senha não é processada novamente
 
         Returns:
             Instância de User
@@ -121,5 +128,8 @@ class User(Base):
             full_name=full_name.strip(),
             is_admin=is_admin
         )
-        user.set_password(password)
+        if password_hash:
+            user.password_hash = password_hash
+        else:
+            user.set_password(password)
         return user
@@ -0,0 +1,222 @@
+"""
+Cache de respostas da IA endereçado por conteúdo.
+
+A chave é o SHA-256 do modelo, do template de prompt (nome e versão) e do
+payload de entrada normalizado; respostas iguais para entradas equivalentes
+são reaproveitadas sem nova chamada à API.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, Text, create_engine, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from ..utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# casas decimais consideradas na normalização de valores monetários
+AMOUNT_PRECISION = 2
+
+
+def normalize_payload(value: Any) -> Any:
+    """
+    Normaliza o payload para que entradas equivalentes gerem a mesma chave:
+    valores numéricos arredondados, textos sem espaços nas pontas e
+    ``None`` removido dos dicionários.
+    """
+    if isinstance(value, dict):
+        return {str(k): normalize_payload(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [normalize_payload(v) for v in value]
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, (int, float, Decimal)):
+        number = round(float(value), AMOUNT_PRECISION)
+        return int(number) if number.is_integer() else number
+    if isinstance(value, str):
+        return value.strip()
+    return str(value)
+
+
+def make_cache_key(model: str, template: str, version: str, payload: Any) -> str:
+    canonical = json.dumps(
+        {"model": model, "template": template, "version": version, "payload": normalize_payload(payload)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class AIResponseCache:
+    """
+    Cache em dois níveis: LRU em memória por processo na frente de uma
+    tabela ``ai_response_cache`` (SQLite/PostgreSQL), que sobrevive a
+    reinícios e é compartilhada entre workers.
+
+    As entradas expiram após ``ttl`` segundos; acima de ``max_entries`` as
+    menos usadas recentemente são removidas. Sem ``url`` o cache fica apenas
+    em memória. Falhas do banco são registradas e tratadas como miss.
+
+    No banco da aplicação a tabela vem da migração 0009; ``create_table``
+    cria a tabela na inicialização e serve só para um banco próprio do cache.
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        ttl: float = 86400,
+        max_entries: int = 5000,
+        memory_size: int = 256,
+        table_name: str = "ai_response_cache",
+        create_table: bool = False,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._memory = TTLCache(maxsize=memory_size, ttl=ttl)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+        self.engine = None
+        self.table = Table(
+            table_name,
+            MetaData(),
+            Column("key", String(64), primary_key=True),
+            Column("model", String(100), nullable=False),
+            Column("template", String(100), nullable=False),
+            Column("response", Text, nullable=False),
+            Column("created_at", Float, nullable=False),
+            Column("expires_at", Float, nullable=False, index=True),
+            Column("last_used_at", Float, nullable=False, index=True),
+            Column("hits", Integer, nullable=False, default=0),
+        )
+        if url:
+            self.engine = create_engine(url, future=True, pool_pre_ping=True)
+            if create_table:
+                self.table.create(self.engine, checkfirst=True)
+            self._insert = sqlite_insert if self.engine.dialect.name == "sqlite" else pg_insert
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+
+        value = self._load(key) if self.engine is not None else None
+        if value is None:
+            self._count("misses")
+            return None
+        self._memory.set(key, value)
+        self._count("disk_hits")
+        return value
+
+    def set(self, key: str, value: str, model: str, template: str) -> None:
+        self._memory.set(key, value)
+        self._count("writes")
+        if self.engine is None:
+            return
+        now = time.time()
+        row = {
+            "key": key,
+            "model": model,
+            "template": template,
+            "response": value,
+            "created_at": now,
+            "expires_at": now + self.ttl,
+            "last_used_at": now,
+            "hits": 0,
+        }
+        stmt = self._insert(self.table).values(row)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[self.table.c.key],
+            set_={name: stmt.excluded[name] for name in ("response", "created_at", "expires_at", "last_used_at")},
+        )
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(stmt)
+                evicted = self._evict(conn, now)
+        except SQLAlchemyError:
+            logger.warning("Falha ao gravar no cache de respostas da IA", exc_info=True)
+            self._count("errors")
+            return
+        if evicted:
+            self._count("evictions", evicted)
+
+    def clear(self) -> int:
+        self._memory.clear()
+        if self.engine is None:
+            return 0
+        with self.engine.begin() as conn:
+            return conn.execute(delete(self.table)).rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            data = dict(self._counters)
+        hits = data["memory_hits"] + data["disk_hits"]
+        total = hits + data["misses"]
+        data.update(
+            hits=hits,
+            hit_rate=round(hits / total, 4) if total else 0.0,
+            memory_entries=len(self._memory),
+            stored_entries=self._stored_entries(),
+            max_entries=self.max_entries,
+            ttl=self.ttl,
+            persistent=self.engine is not None,
+        )
+        return data
+
+    def _load(self, key: str) -> Optional[str]:
+        now = time.time()
+        table = self.table
+        try:
+            with self.engine.begin() as conn:
+                row = conn.execute(
+                    select(table.c.response).where(table.c.key == key, table.c.expires_at > now)
+                ).first()
+                if row is None:
+                    return None
+                conn.execute(
+                    update(table)
+                    .where(table.c.key == key)
+                    .values(last_used_at=now, hits=table.c.hits + 1)
+                )
+                return row.response
+        except SQLAlchemyError:
+            logger.warning("Falha ao ler o cache de respostas da IA", exc_info=True)
+            self._count("errors")
+            return None
+
+    def _evict(self, conn, now: float) -> int:
+        """Remove expiradas e o excedente de ``max_entries`` (menos usadas primeiro)."""
+        table = self.table
+        removed = conn.execute(delete(table).where(table.c.expires_at <= now)).rowcount
+        surplus = (
+            select(table.c.key)
+            .order_by(table.c.last_used_at.desc())
+            .offset(self.max_entries)
+        )
+        removed += conn.execute(delete(table).where(table.c.key.in_(surplus))).rowcount
+        return removed
+
+    def _stored_entries(self) -> Optional[int]:
+        if self.engine is None:
+            return None
+        try:
+            with self.engine.connect() as conn:
+                return conn.execute(select(func.count()).select_from(self.table)).scalar_one()
+        except SQLAlchemyError:
+            return None
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += amount
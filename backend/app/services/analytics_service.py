@@ -9,7 +9,9 @@ from typing import Callable, Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
-from ..models import PendingTransaction, ReviewStatus, Category
+from ..models import PendingTransaction, ReviewStatus
+from .category_index import get_category_index
+from .recurring_plan_engine import RecurringPlanEngine
 
 
 def _parse_date(value: Optional[str]) -> Optional[datetime]:
@@ -65,46 +67,20 @@ class AnalyticsService:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         include_planned: bool = True,
+        user_id: Optional[int] = None,
     ) -> Dict:
         """
         Retorna uma matriz mensal por categoria, separando receitas e despesas.
+
+        Os valores planejados vêm do RecurringPlanEngine, calculados apenas
+        para a janela de meses retornada (e mantidos em cache).
         """
         start_dt = _parse_date(start_date)
         end_dt = _parse_date(end_date)
 
         session = self.session_factory()
         try:
-            category_map = {c.name: c for c in session.query(Category).all()}
-
-            planned_map: Dict[str, Dict[str, float]] = defaultdict(dict)
-            if include_planned:
-                from ..models import CategoryRecurringPlan  # avoid circular
-                recurring = session.query(CategoryRecurringPlan).all()
-                for r in recurring:
-                    cat = None
-                    # reverse lookup by name? we have only id; need name
-                # Build map category_id->name
-                cat_id_to_name = {c.id: c.name for c in category_map.values() if hasattr(c, "id")}
-                for r in session.query(CategoryRecurringPlan).all():
-                    cat_name = cat_id_to_name.get(r.category_id, None)
-                    if not cat_name:
-                        continue
-                    current = r.start_date
-                    end = r.end_date
-                    while True:
-                        key_month = f"{current.year:04d}-{current.month:02d}"
-                        planned_map[cat_name][key_month] = planned_map[cat_name].get(key_month, 0.0) + r.amount
-                        # advance one month
-                        if end and (current.year > end.year or (current.year == end.year and current.month >= end.month)):
-                            break
-                        if end is None and current > datetime.utcnow().date():
-                            break
-                        next_month = current.month + 1
-                        next_year = current.year + 1 if next_month > 12 else current.year
-                        next_month = 1 if next_month > 12 else next_month
-                        current = current.replace(year=next_year, month=next_month, day=1)
-                        if end and current > end:
-                            break
+            categories_index = get_category_index(self.session_factory, user_id, session=session)
 
             query = session.query(PendingTransaction)
             if start_dt:
@@ -142,11 +118,28 @@ class AnalyticsService:
             ordered_months.sort(key=lambda x: (x[0], x[1]))
 
             months_meta = [{"year": y, "month": m, "key": key} for y, m, key in ordered_months]
+
+            planned_map: Dict[str, Dict[str, float]] = {}
+            if include_planned and months_meta:
+                planned_by_id = RecurringPlanEngine(self.session_factory).monthly_planned(
+                    [(y, m) for y, m, _ in ordered_months],
+                    user_id=user_id,
+                    session=session,
+                )
+                for category_id, values in planned_by_id.items():
+                    category = categories_index.get(category_id)
+                    if not category:
+                        continue
+                    cat_name = category["name"]
+                    merged = planned_map.setdefault(cat_name, {})
+                    for key_month, value in values.items():
+                        merged[key_month] = merged.get(key_month, 0.0) + value
+
             categories = []
             for name, values in buckets.items():
-                cat_type = None
-                if name in category_map and getattr(category_map[name], "type", None):
-                    cat_type = category_map[name].type.value
+                category = categories_index.find(name)
+                if category and category["type"]:
+                    cat_type = category["type"]
                 else:
                     # infer: se despesas (negativo dominante) marcar expense, senão income
                     cat_type = "expense" if abs(values["neg"]) >= values["pos"] else "income"
@@ -1,12 +1,20 @@
 """
 Serviço de autenticação e gerenciamento de usuários.
 """
-from typing import Dict, Optional, Tuple
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import jwt
+from sqlalchemy.orm import make_transient_to_detached
 
 from app.models import User
 from app.database import get_session
+from app.utils.cache import TTLCache
+from .password_hasher import PasswordHasher, PasswordHasherBusy
+
+# Colunas guardadas no cache de usuários autenticados
+USER_CACHE_COLUMNS = tuple(User.__table__.columns.keys())
 
 
 class AuthService:
@@ -15,7 +23,9 @@ class AuthService:
     """
 
     def __init__(self, jwt_secret: str, jwt_algorithm: str = 'HS256',
-                 access_token_expires: int = 3600, refresh_token_expires: int = 2592000):
+                 access_token_expires: int = 3600, refresh_token_expires: int = 2592000,
+                 user_cache_ttl: float = 60, user_cache_size: int = 1024,
+                 password_hasher: Optional[PasswordHasher] = None):
         """
         Inicializa o serviço de autenticação.
 
@@ -24,12 +34,23 @@ class AuthService:
             jwt_algorithm: Algoritmo de assinatura JWT
             access_token_expires: Tempo de expiração do access token em segundos (padrão: 1 hora)
             refresh_token_expires: Tempo de expiração do refresh token em segundos (padrão: 30 dias)
+            user_cache_ttl: Validade (s) do cache de usuários autenticados; 0 desativa o cache
+            user_cache_size: Número máximo de usuários no cache
+            password_hasher: Pool de hash de senhas (padrão: bcrypt com 12 rounds)
         """
         self.jwt_secret = jwt_secret
         self.jwt_algorithm = jwt_algorithm
         self.access_token_expires = access_token_expires
         self.refresh_token_expires = refresh_token_expires
 
+        # Cache por processo, chaveado por (user_id, token_version): trocar a
+        # senha ou desativar o usuário muda a versão e invalida a entrada. Em
+        # outros workers a entrada antiga expira em no máximo user_cache_ttl.
+        self._user_cache = TTLCache(maxsize=user_cache_size, ttl=user_cache_ttl) if user_cache_ttl else None
+        self._metrics_lock = threading.Lock()
+        self._metrics: Dict[str, list] = {}
+        self.password_hasher = password_hasher or PasswordHasher()
+
     def register_user(self, email: str, password: str, full_name: str,
                      is_admin: bool = False) -> Tuple[bool, Optional[User], Optional[str]]:
         """
@@ -65,7 +86,8 @@ class AuthService:
                 email=email,
                 password=password,
                 full_name=full_name,
-                is_admin=is_admin
+                is_admin=is_admin,
+                password_hash=self.password_hasher.hash(password)
             )
 
             session.add(user)
@@ -74,6 +96,8 @@ class AuthService:
 
             return True, user, None
 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             session.rollback()
             return False, None, f"Erro ao criar usuário: {str(e)}"
@@ -102,12 +126,24 @@ class AuthService:
                 return False, None, "Usuário desativado"
 
             # Verificar senha
-            if not user.check_password(password):
+            if not self.password_hasher.verify(password, user.password_hash):
                 return False, None, "Credenciais inválidas"
 
+            # Custo do bcrypt mudou desde o último login: refazer o hash
+            # (se o pool estiver cheio, fica para o próximo login)
+            if self.password_hasher.needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = self.password_hasher.hash(password)
+                    session.commit()
+                except PasswordHasherBusy:
+                    pass
+
             return True, user, None
 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
+            session.rollback()
             return False, None, f"Erro ao autenticar: {str(e)}"
 
     def generate_access_token(self, user: User) -> str:
@@ -124,6 +160,7 @@ class AuthService:
             'user_id': user.id,
             'email': user.email,
             'is_admin': user.is_admin,
+            'ver': user.token_version or 0,
             'exp': datetime.utcnow() + timedelta(seconds=self.access_token_expires),
             'iat': datetime.utcnow(),
             'type': 'access'
@@ -143,6 +180,7 @@ class AuthService:
         """
         payload = {
             'user_id': user.id,
+            'ver': user.token_version or 0,
             'exp': datetime.utcnow() + timedelta(seconds=self.refresh_token_expires),
             'iat': datetime.utcnow(),
             'type': 'refresh'
@@ -179,23 +217,37 @@ class AuthService:
         """
         Obtém o usuário a partir de um token JWT.
 
+        Usuários ativos ficam em cache por alguns segundos, evitando uma
+        consulta ao banco a cada requisição autenticada.
+
         Args:
             token: Token JWT codificado
 
         Returns:
             Tupla (sucesso, usuário, mensagem_erro)
         """
+        started = time.perf_counter()
+
         # Verificar token
         valid, payload, error = self.verify_token(token, token_type='access')
 
         if not valid:
+            self._record('rejected', started)
             return False, None, error
 
         session = get_session()
+        version = payload.get('ver', 0)
 
         try:
+            cached = self._user_cache.get((payload['user_id'], version)) if self._user_cache else None
+            if cached is not None:
+                user = self._attach_cached_user(session, cached)
+                self._record('cache_hit', started)
+                return True, user, None
+
             # Buscar usuário
             user = session.query(User).filter(User.id == payload['user_id']).first()
+            self._record('db_lookup', started)
 
             if not user:
                 return False, None, "Usuário não encontrado"
@@ -203,11 +255,63 @@ class AuthService:
             if not user.is_active:
                 return False, None, "Usuário desativado"
 
+            if (user.token_version or 0) != version:
+                return False, None, "Token revogado"
+
+            if self._user_cache is not None:
+                self._user_cache.set(
+                    (user.id, version),
+                    {column: getattr(user, column) for column in USER_CACHE_COLUMNS}
+                )
+
             return True, user, None
 
         except Exception as e:
             return False, None, f"Erro ao buscar usuário: {str(e)}"
 
+    def _attach_cached_user(self, session, values: Dict[str, Any]) -> User:
+        """
+        Reconstrói o usuário a partir do cache e o associa à sessão atual sem
+        consultar o banco (merge com load=False).
+        """
+        user = User(**values)
+        make_transient_to_detached(user)
+        return session.merge(user, load=False)
+
+    def invalidate_user_cache(self, user_id: int) -> None:
+        """Remove do cache todas as entradas de um usuário."""
+        if self._user_cache is not None:
+            self._user_cache.invalidate_where(lambda key: key[0] == user_id)
+
+    def _record(self, outcome: str, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        with self._metrics_lock:
+            entry = self._metrics.setdefault(outcome, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+
+    def auth_metrics(self) -> Dict[str, Any]:
+        """
+        Custo da autenticação por requisição, separado por resultado
+        (cache_hit, db_lookup, rejected), e estatísticas do cache.
+        """
+        with self._metrics_lock:
+            outcomes = {
+                outcome: {
+                    'count': count,
+                    'avg_ms': round(total / count * 1000, 3) if count else 0.0,
+                }
+                for outcome, (count, total) in self._metrics.items()
+            }
+        total_count = sum(item['count'] for item in outcomes.values())
+        total_ms = sum(item['count'] * item['avg_ms'] for item in outcomes.values())
+        return {
+            'requests': total_count,
+            'avg_ms': round(total_ms / total_count, 3) if total_count else 0.0,
+            'outcomes': outcomes,
+            'user_cache': self._user_cache.stats() if self._user_cache else None,
+        }
+
     def refresh_access_token(self, refresh_token: str) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Gera um novo access token a partir de um refresh token válido.
@@ -233,6 +337,9 @@ class AuthService:
             if not user or not user.is_active:
                 return False, None, "Usuário inválido ou desativado"
 
+            if (user.token_version or 0) != payload.get('ver', 0):
+                return False, None, "Token revogado"
+
             # Gerar novo access token
             new_access_token = self.generate_access_token(user)
 
@@ -266,23 +373,56 @@ class AuthService:
                 return False, "Usuário desativado"
 
             # Verificar senha atual
-            if not user.check_password(current_password):
+            if not self.password_hasher.verify(current_password, user.password_hash):
                 return False, "Senha atual incorreta"
 
             # Validar nova senha
             if len(new_password) < 6:
                 return False, "Nova senha deve ter no mínimo 6 caracteres"
 
-            # Atualizar senha
-            user.set_password(new_password)
+            # Atualizar senha e revogar tokens emitidos com a senha antiga
+            user.password_hash = self.password_hasher.hash(new_password)
+            user.token_version = (user.token_version or 0) + 1
             session.commit()
+            self.invalidate_user_cache(user_id)
 
             return True, None
 
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             session.rollback()
             return False, f"Erro ao alterar senha: {str(e)}"
 
+    def deactivate_user(self, user_id: int) -> Tuple[bool, Optional[str]]:
+        """
+        Desativa um usuário e revoga os tokens já emitidos.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Tupla (sucesso, mensagem_erro)
+        """
+        session = get_session()
+
+        try:
+            user = session.query(User).filter(User.id == user_id).first()
+
+            if not user:
+                return False, "Usuário não encontrado"
+
+            user.is_active = False
+            user.token_version = (user.token_version or 0) + 1
+            session.commit()
+            self.invalidate_user_cache(user_id)
+
+            return True, None
+
+        except Exception as e:
+            session.rollback()
+            return False, f"Erro ao desativar usuário: {str(e)}"
+
     def login(self, email: str, password: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """
         Realiza login completo (autentica e gera tokens).
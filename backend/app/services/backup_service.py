@@ -3,14 +3,20 @@ Service for data backup and restore operations.
 """
 from __future__ import annotations
 
+import csv
+import enum
 import json
+import os
+import tempfile
+import time
+import zipfile
 from contextlib import contextmanager
-from datetime import datetime
-from typing import Callable, Dict, List, Optional
+from datetime import date, datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 import io
 
 from sqlalchemy.orm import Session
-from sqlalchemy import inspect
+from sqlalchemy import Date, DateTime, func, insert, inspect, or_, update
 
 from ..models import (
     Category,
@@ -22,6 +28,7 @@ from ..models import (
     IncomeProjection,
     Institution,
     Investment,
+    InvestmentEvent,
     Dividend,
     InvestmentType,
     PendingTransaction,
@@ -29,6 +36,179 @@ from ..models import (
     Transaction,
     TrainingJob,
 )
+from .cashflow_service import invalidate_cashflow_cache
+from .category_index import invalidate_category_index
+from .portfolio_analytics import invalidate_portfolio_cache
+from .recurring_plan_engine import invalidate_planned_cache
+
+BACKUP_FORMAT = 'flow_forecaster_backup'
+BACKUP_VERSION = '1.0'
+
+# Rows fetched per round-trip by the streaming exporters
+STREAM_CHUNK_ROWS = 1000
+
+# Compact snapshot: ZIP with a manifest plus one NDJSON member per entity,
+# each line a JSON array of values in the manifest field order
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MANIFEST = 'manifest.json'
+SNAPSHOT_EXTENSION = '.ffsnap'
+SNAPSHOT_MAX_ERRORS = 50
+
+# Columns that tell whether a row changed after an incremental watermark
+# (models without updated_at fall back to their creation/review timestamps)
+CHANGE_TRACKING_COLUMNS = ('created_at', 'updated_at', 'reviewed_at', 'completed_at')
+
+# Exported entities in dependency order: (backup key, model, fields)
+BACKUP_ENTITIES: Tuple[Tuple[str, type, Tuple[str, ...]], ...] = (
+    ('categories', Category, (
+        'id', 'name', 'type', 'parent_id', 'color', 'icon', 'is_active',
+    )),
+    ('institutions', Institution, (
+        'id', 'name', 'account_type', 'partition', 'initial_balance',
+        'current_balance', 'is_active',
+    )),
+    ('credit_cards', CreditCard, (
+        'id', 'institution_id', 'name', 'brand', 'last_four_digits',
+        'closing_day', 'due_day', 'limit_amount', 'is_active',
+    )),
+    ('transactions', Transaction, (
+        'id', 'event_date', 'effective_date', 'transaction_type', 'category_id',
+        'institution_id', 'credit_card_id', 'amount', 'description', 'notes',
+        'status', 'is_recurring', 'recurrence_parent_id', 'recurrence_rule',
+    )),
+    ('import_batches', ImportBatch, (
+        'id', 'filename', 'status', 'institution_name', 'account_id',
+        'total_transactions', 'processed_transactions', 'period_start',
+        'period_end', 'balance', 'created_at', 'error_message',
+    )),
+    ('pending_transactions', PendingTransaction, (
+        'id', 'import_batch_id', 'fitid', 'date', 'description', 'amount',
+        'transaction_type', 'payee', 'memo', 'predicted_category',
+        'confidence_score', 'confidence_level', 'user_category',
+        'review_status', 'reviewed_at', 'notes',
+    )),
+    ('financial_plans', FinancialPlan, (
+        'id', 'name', 'goal_amount', 'current_balance', 'monthly_contribution',
+        'target_date', 'institution_id', 'partition', 'notes', 'is_active',
+    )),
+    ('income_projections', IncomeProjection, (
+        'id', 'description', 'amount', 'expected_date', 'projection_type',
+        'received',
+    )),
+    ('category_budgets', CategoryBudget, (
+        'id', 'category_id', 'month', 'year', 'amount',
+    )),
+    ('category_recurring_plans', CategoryRecurringPlan, (
+        'id', 'category_id', 'amount', 'start_date', 'end_date',
+    )),
+    ('planning_notes', PlanningNote, (
+        'id', 'content', 'created_at',
+    )),
+    ('investments', Investment, (
+        'id', 'name', 'institution_id', 'investment_type_id', 'classification',
+        'amount_invested', 'current_value', 'applied_at', 'maturity_date',
+        'profitability_rate', 'notes', 'is_active',
+    )),
+    ('dividends', Dividend, (
+        'id', 'investment_id', 'description', 'amount', 'received_at', 'counted_in_value',
+    )),
+    ('investment_events', InvestmentEvent, (
+        'id', 'investment_id', 'event_type', 'occurred_at', 'amount', 'value', 'notes',
+    )),
+    ('training_jobs', TrainingJob, (
+        'id', 'status', 'source', 'csv_path', 'model_version', 'metrics',
+        'created_at', 'completed_at', 'error_message',
+    )),
+)
+
+
+BACKUP_ENTITIES_BY_NAME = {name: fields for name, _, fields in BACKUP_ENTITIES}
+
+# Restore rules per entity: (natural key fields, {fk field: (target entity, required)}).
+# Keys are compared after the foreign keys were remapped to new IDs.
+RESTORE_SPECS: Dict[str, Tuple[Tuple[str, ...], Dict[str, Tuple[str, bool]]]] = {
+    'categories': (('name', 'parent_id'), {'parent_id': ('categories', False)}),
+    'institutions': (('name',), {}),
+    'credit_cards': (('institution_id', 'name'), {'institution_id': ('institutions', True)}),
+    'transactions': (
+        ('event_date', 'transaction_type', 'amount', 'description', 'category_id'),
+        {
+            'category_id': ('categories', True),
+            'institution_id': ('institutions', False),
+            'credit_card_id': ('credit_cards', False),
+            'recurrence_parent_id': ('transactions', False),
+        },
+    ),
+    'import_batches': (('filename', 'created_at'), {}),
+    'pending_transactions': (
+        ('import_batch_id', 'fitid'),
+        {'import_batch_id': ('import_batches', True)},
+    ),
+    'financial_plans': (('name',), {'institution_id': ('institutions', False)}),
+    'income_projections': (('description', 'expected_date', 'amount'), {}),
+    'category_budgets': (
+        ('category_id', 'year', 'month'),
+        {'category_id': ('categories', True)},
+    ),
+    'category_recurring_plans': (
+        ('category_id', 'start_date', 'amount'),
+        {'category_id': ('categories', True)},
+    ),
+    'planning_notes': (('content', 'created_at'), {}),
+    'investments': (('name', 'applied_at'), {'institution_id': ('institutions', False)}),
+    'dividends': (
+        ('investment_id', 'received_at', 'amount'),
+        {'investment_id': ('investments', True)},
+    ),
+    'investment_events': (
+        ('investment_id', 'event_type', 'occurred_at', 'amount', 'value'),
+        {'investment_id': ('investments', True)},
+    ),
+    'training_jobs': (('created_at', 'source'), {}),
+}
+
+
+def _serialize_value(value):
+    """Convert a column value into its JSON representation"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, enum.Enum):
+        return value.value
+    return value
+
+
+def _deserialize_value(column, value):
+    """Convert a JSON value back into the Python type of ``column``"""
+    if value is None:
+        return None
+    column_type = column.type
+    if isinstance(column_type, DateTime) and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    if isinstance(column_type, Date) and isinstance(value, str):
+        return datetime.fromisoformat(value).date()
+    enum_class = getattr(column_type, 'enum_class', None)
+    if enum_class is not None and not isinstance(value, enum_class):
+        try:
+            return enum_class(value)
+        except ValueError:
+            return enum_class[str(value).upper()]
+    return value
+
+
+def _without_null_defaults(columns, row: dict) -> dict:
+    """Drop NULLs meant for NOT NULL columns, so their defaults apply"""
+    return {k: v for k, v in row.items() if v is not None or columns[k].nullable}
+
+
+def _tabular_value(value):
+    """Cell value for XLSX/CSV exports (nested JSON becomes text)"""
+    if isinstance(value, (dict, list)):
+        return _dumps(value)
+    return value
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False)
 
 
 class BackupService:
@@ -50,278 +230,313 @@ class BackupService:
         finally:
             session.close()
 
-    def export_full_backup(self, user_id: int) -> dict:
+    def export_full_backup(self, user_id: int, since: Optional[datetime] = None) -> dict:
         """
         Export complete user data in JSON format.
 
         Returns dictionary with all user data organized by entity type.
+        With ``since``, only rows changed after that watermark are exported
+        (incremental backup) plus tombstones for soft-deleted transactions.
+        Prefer ``stream_json_backup`` for downloads: this builds everything
+        in memory.
         """
-        session = self.session_factory()
-        try:
-            backup_data = {
-                'metadata': {
-                    'export_date': datetime.utcnow().isoformat(),
-                    'user_id': user_id,
-                    'version': '1.0',
-                    'format': 'flow_forecaster_backup'
-                },
-                'data': {}
-            }
-
-            # Export Categories
-            categories = session.query(Category).filter_by(user_id=user_id).all()
-            backup_data['data']['categories'] = [
-                {
-                    'id': c.id,
-                    'name': c.name,
-                    'type': c.type.value,
-                    'parent_id': c.parent_id,
-                    'color': c.color,
-                    'icon': c.icon,
-                    'is_active': c.is_active
-                }
-                for c in categories
-            ]
-
-            # Export Institutions
-            institutions = session.query(Institution).filter_by(user_id=user_id).all()
-            backup_data['data']['institutions'] = [
-                {
-                    'id': i.id,
-                    'name': i.name,
-                    'account_type': i.account_type,
-                    'partition': i.partition,
-                    'initial_balance': i.initial_balance,
-                    'current_balance': i.current_balance,
-                    'is_active': i.is_active
-                }
-                for i in institutions
-            ]
-
-            # Export Credit Cards
-            credit_cards = session.query(CreditCard).filter_by(user_id=user_id).all()
-            backup_data['data']['credit_cards'] = [
-                {
-                    'id': cc.id,
-                    'institution_id': cc.institution_id,
-                    'name': cc.name,
-                    'brand': cc.brand,
-                    'last_four_digits': cc.last_four_digits,
-                    'closing_day': cc.closing_day,
-                    'due_day': cc.due_day,
-                    'limit_amount': cc.limit_amount,
-                    'is_active': cc.is_active
-                }
-                for cc in credit_cards
-            ]
-
-            # Export Transactions (manual)
-            transactions = session.query(Transaction).filter_by(
-                user_id=user_id
-            ).filter(
-                Transaction.deleted_at.is_(None)
-            ).all()
-            backup_data['data']['transactions'] = [
-                {
-                    'id': t.id,
-                    'event_date': t.event_date.isoformat() if t.event_date else None,
-                    'effective_date': t.effective_date.isoformat() if t.effective_date else None,
-                    'transaction_type': t.transaction_type.value,
-                    'category_id': t.category_id,
-                    'institution_id': t.institution_id,
-                    'credit_card_id': t.credit_card_id,
-                    'amount': t.amount,
-                    'description': t.description,
-                    'notes': t.notes,
-                    'status': t.status.value,
-                    'is_recurring': t.is_recurring,
-                    'recurrence_parent_id': t.recurrence_parent_id
-                }
-                for t in transactions
-            ]
-
-            # Export Import Batches
-            import_batches = session.query(ImportBatch).filter_by(user_id=user_id).all()
-            backup_data['data']['import_batches'] = [
-                {
-                    'id': ib.id,
-                    'filename': ib.filename,
-                    'uploaded_at': ib.uploaded_at.isoformat() if ib.uploaded_at else None,
-                    'status': ib.status.value,
-                    'institution_name': ib.institution_name,
-                    'account_id': ib.account_id,
-                    'start_date': ib.start_date.isoformat() if ib.start_date else None,
-                    'end_date': ib.end_date.isoformat() if ib.end_date else None,
-                    'balance': ib.balance,
-                    'processed_at': ib.processed_at.isoformat() if ib.processed_at else None,
-                    'reviewed_at': ib.reviewed_at.isoformat() if ib.reviewed_at else None,
-                    'message': ib.message
-                }
-                for ib in import_batches
-            ]
+        backup_data = {
+            'metadata': self._backup_metadata(user_id, since),
+            'data': {name: [] for name, _, _ in BACKUP_ENTITIES}
+        }
+        for name, row in self.iter_backup_rows(user_id, since=since):
+            backup_data['data'][name].append(row)
+        if since is not None:
+            backup_data['tombstones'] = self._tombstones(user_id, since)
 
-            # Export Pending Transactions
-            pending_txs = session.query(PendingTransaction).join(ImportBatch).filter(
-                ImportBatch.user_id == user_id
-            ).all()
-            backup_data['data']['pending_transactions'] = [
-                {
-                    'id': pt.id,
-                    'batch_id': pt.batch_id,
-                    'fitid': pt.fitid,
-                    'date': pt.date.isoformat() if pt.date else None,
-                    'description': pt.description,
-                    'amount': pt.amount,
-                    'transaction_type': pt.transaction_type,
-                    'predicted_category': pt.predicted_category,
-                    'confidence_score': pt.confidence_score,
-                    'confidence_level': pt.confidence_level,
-                    'user_category': pt.user_category,
-                    'review_status': pt.review_status.value if pt.review_status else None,
-                    'reviewed_at': pt.reviewed_at.isoformat() if pt.reviewed_at else None,
-                    'notes': pt.notes
-                }
-                for pt in pending_txs
-            ]
+        backup_data['metadata']['statistics'] = {
+            name: len(rows) for name, rows in backup_data['data'].items()
+        }
+        return backup_data
 
-            # Export Financial Plans
-            plans = session.query(FinancialPlan).filter_by(user_id=user_id).all()
-            backup_data['data']['financial_plans'] = [
-                {
-                    'id': fp.id,
-                    'name': fp.name,
-                    'goal_amount': fp.goal_amount,
-                    'current_balance': fp.current_balance,
-                    'monthly_contribution': fp.monthly_contribution,
-                    'target_date': fp.target_date.isoformat() if fp.target_date else None,
-                    'institution_id': fp.institution_id,
-                    'partition': fp.partition,
-                    'notes': fp.notes,
-                    'is_active': fp.is_active
-                }
-                for fp in plans
-            ]
+    def count_backup_rows(self, user_id: int, since: Optional[datetime] = None) -> Dict[str, int]:
+        """Row count per exported entity, using COUNT(*) only"""
+        session = self.session_factory()
+        try:
+            counts = {}
+            for name, model, _ in BACKUP_ENTITIES:
+                query = self._entity_query(session, model, user_id, func.count(model.id), since=since)
+                counts[name] = query.scalar() or 0
+            return counts
+        finally:
+            session.close()
 
-            # Export Income Projections
-            income_projs = session.query(IncomeProjection).filter_by(user_id=user_id).all()
-            backup_data['data']['income_projections'] = [
-                {
-                    'id': ip.id,
-                    'description': ip.description,
-                    'amount': ip.amount,
-                    'expected_date': ip.expected_date.isoformat() if ip.expected_date else None,
-                    'projection_type': ip.projection_type.value,
-                    'received': ip.received,
-                    'notes': ip.notes
-                }
-                for ip in income_projs
-            ]
+    def iter_backup_rows(
+        self,
+        user_id: int,
+        entities: Optional[List[str]] = None,
+        since: Optional[datetime] = None
+    ) -> Iterator[Tuple[str, dict]]:
+        """
+        Yield ``(entity_name, row)`` for every exported row, in dependency
+        order. Each table is read with a server-side cursor in chunks of
+        STREAM_CHUNK_ROWS, so memory stays bounded by one chunk.
+        """
+        session = self.session_factory()
+        try:
+            for name, model, fields in BACKUP_ENTITIES:
+                if entities is not None and name not in entities:
+                    continue
+                for row in self._iter_entity_rows(session, model, fields, user_id, since):
+                    yield name, row
+        finally:
+            session.close()
 
-            # Export Category Budgets
-            budgets = session.query(CategoryBudget).filter_by(user_id=user_id).all()
-            backup_data['data']['category_budgets'] = [
-                {
-                    'id': cb.id,
-                    'category_id': cb.category_id,
-                    'month': cb.month,
-                    'year': cb.year,
-                    'amount': cb.amount
-                }
-                for cb in budgets
-            ]
+    def stream_json_backup(
+        self,
+        user_id: int,
+        ndjson: bool = False,
+        since: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """
+        Stream the backup as text chunks.
 
-            # Export Category Recurring Plans
-            recurring_plans = session.query(CategoryRecurringPlan).filter_by(user_id=user_id).all()
-            backup_data['data']['category_recurring_plans'] = [
-                {
-                    'id': crp.id,
-                    'category_id': crp.category_id,
-                    'amount': crp.amount,
-                    'start_date': crp.start_date.isoformat() if crp.start_date else None,
-                    'end_date': crp.end_date.isoformat() if crp.end_date else None
-                }
-                for crp in recurring_plans
-            ]
+        JSON output has the same shape as ``export_full_backup``; NDJSON
+        output is one metadata line followed by one
+        ``{"entity": ..., "row": ...}`` line per row (and a final
+        ``{"tombstones": ...}`` line for incremental backups). Statistics
+        come from ``count_backup_rows`` so the metadata can be written first.
+        """
+        metadata = self._backup_metadata(user_id, since)
+        metadata['statistics'] = self.count_backup_rows(user_id, since)
+
+        buffer: List[str] = []
+        if ndjson:
+            yield _dumps({'metadata': metadata}) + '\n'
+            for name, row in self.iter_backup_rows(user_id, since=since):
+                buffer.append(_dumps({'entity': name, 'row': row}) + '\n')
+                if len(buffer) >= STREAM_CHUNK_ROWS:
+                    yield ''.join(buffer)
+                    buffer = []
+            if since is not None:
+                buffer.append(_dumps({'tombstones': self._tombstones(user_id, since)}) + '\n')
+            if buffer:
+                yield ''.join(buffer)
+            return
 
-            # Export Planning Notes
-            notes = session.query(PlanningNote).filter_by(user_id=user_id).all()
-            backup_data['data']['planning_notes'] = [
-                {
-                    'id': pn.id,
-                    'content': pn.content,
-                    'created_at': pn.created_at.isoformat() if pn.created_at else None
-                }
-                for pn in notes
-            ]
+        session = self.session_factory()
+        try:
+            yield '{"metadata": ' + _dumps(metadata) + ', "data": {'
+            for position, (name, model, fields) in enumerate(BACKUP_ENTITIES):
+                buffer.append((', ' if position else '') + _dumps(name) + ': [')
+                rows = self._iter_entity_rows(session, model, fields, user_id, since)
+                for index, row in enumerate(rows):
+                    buffer.append((', ' if index else '') + _dumps(row))
+                    if len(buffer) >= STREAM_CHUNK_ROWS:
+                        yield ''.join(buffer)
+                        buffer = []
+                buffer.append(']')
+            buffer.append('}')
+            if since is not None:
+                buffer.append(', "tombstones": ' + _dumps(self._tombstones(user_id, since)))
+            buffer.append('}')
+            yield ''.join(buffer)
+        finally:
+            session.close()
 
-            # Export Investments
-            investments = session.query(Investment).filter_by(user_id=user_id).all()
-            backup_data['data']['investments'] = [
-                {
-                    'id': inv.id,
-                    'institution_id': inv.institution_id,
-                    'investment_type_id': inv.investment_type_id,
-                    'description': inv.description,
-                    'amount_invested': inv.amount_invested,
-                    'current_value': inv.current_value,
-                    'classification': inv.classification,
-                    'applied_at': inv.applied_at.isoformat() if inv.applied_at else None,
-                    'maturity_date': inv.maturity_date.isoformat() if inv.maturity_date else None,
-                    'profitability_rate': inv.profitability_rate,
-                    'notes': inv.notes
-                }
-                for inv in investments
-            ]
+    def _iter_entity_rows(
+        self,
+        session: Session,
+        model,
+        fields: Tuple[str, ...],
+        user_id: int,
+        since: Optional[datetime] = None
+    ) -> Iterator[dict]:
+        columns = [getattr(model, field) for field in fields]
+        query = self._entity_query(session, model, user_id, *columns, since=since)
+        for values in query.order_by(model.id).yield_per(STREAM_CHUNK_ROWS):
+            yield {
+                field: _serialize_value(value)
+                for field, value in zip(fields, values)
+            }
 
-            # Export Dividends
-            dividends = session.query(Dividend).join(Investment).filter(
-                Investment.user_id == user_id
-            ).all()
-            backup_data['data']['dividends'] = [
-                {
-                    'id': d.id,
-                    'investment_id': d.investment_id,
-                    'amount': d.amount,
-                    'received_at': d.received_at.isoformat() if d.received_at else None,
-                    'description': d.description
-                }
-                for d in dividends
-            ]
+    def export_snapshot_file(self, user_id: int) -> str:
+        """
+        Export a compact snapshot (ZIP) to a temp file and return its path.
 
-            # Export Training Jobs
-            training_jobs = session.query(TrainingJob).filter_by(user_id=user_id).all()
-            backup_data['data']['training_jobs'] = [
-                {
-                    'id': tj.id,
-                    'status': tj.status.value,
-                    'source': tj.source.value,
-                    'csv_path': tj.csv_path,
-                    'model_version': tj.model_version,
-                    'metrics': tj.metrics,
-                    'started_at': tj.started_at.isoformat() if tj.started_at else None,
-                    'completed_at': tj.completed_at.isoformat() if tj.completed_at else None,
-                    'error_message': tj.error_message
+        ``manifest.json`` carries the usual backup metadata plus the field
+        list of each entity; each ``<entity>.ndjson`` member holds one JSON
+        array of values per row, in manifest field order. The caller must
+        remove the file.
+        """
+        metadata = self._backup_metadata(user_id)
+        statistics = {}
+        handle, path = tempfile.mkstemp(prefix='flow_forecaster_', suffix=SNAPSHOT_EXTENSION)
+        os.close(handle)
+        session = self.session_factory()
+        try:
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for name, model, fields in BACKUP_ENTITIES:
+                    count = 0
+                    with archive.open(f'{name}.ndjson', 'w') as member:
+                        buffer: List[str] = []
+                        for row in self._iter_entity_rows(session, model, fields, user_id):
+                            buffer.append(_dumps([row[field] for field in fields]) + '\n')
+                            count += 1
+                            if len(buffer) >= STREAM_CHUNK_ROWS:
+                                member.write(''.join(buffer).encode('utf-8'))
+                                buffer = []
+                        member.write(''.join(buffer).encode('utf-8'))
+                    statistics[name] = count
+
+                metadata['statistics'] = statistics
+                metadata['snapshot'] = {
+                    'version': SNAPSHOT_VERSION,
+                    'entities': {
+                        name: {'file': f'{name}.ndjson', 'fields': list(fields)}
+                        for name, _, fields in BACKUP_ENTITIES
+                    }
                 }
-                for tj in training_jobs
-            ]
-
-            # Add summary statistics
-            backup_data['metadata']['statistics'] = {
-                'categories': len(backup_data['data']['categories']),
-                'institutions': len(backup_data['data']['institutions']),
-                'credit_cards': len(backup_data['data']['credit_cards']),
-                'transactions': len(backup_data['data']['transactions']),
-                'import_batches': len(backup_data['data']['import_batches']),
-                'pending_transactions': len(backup_data['data']['pending_transactions']),
-                'financial_plans': len(backup_data['data']['financial_plans']),
-                'income_projections': len(backup_data['data']['income_projections']),
-                'category_budgets': len(backup_data['data']['category_budgets']),
-                'investments': len(backup_data['data']['investments']),
-                'dividends': len(backup_data['data']['dividends'])
+                archive.writestr(SNAPSHOT_MANIFEST, _dumps({'metadata': metadata}))
+        except Exception:
+            os.remove(path)
+            raise
+        finally:
+            session.close()
+        return path
+
+    def read_snapshot(self, fileobj) -> dict:
+        """Load a snapshot into the ``export_full_backup`` dictionary shape"""
+        with zipfile.ZipFile(fileobj) as archive:
+            metadata = self._snapshot_metadata(archive)
+            data = {
+                name: list(self._iter_snapshot_rows(archive, entity))
+                for name, entity in metadata['snapshot']['entities'].items()
             }
+        return {'metadata': metadata, 'data': data}
 
-            return backup_data
+    def validate_snapshot(self, fileobj) -> dict:
+        """
+        Validate a snapshot member by member, line by line, without
+        materializing the rows. Same result shape as /api/backup/validate.
+        """
+        errors: List[str] = []
+        warnings: List[str] = []
+        metadata: dict = {}
+        try:
+            with zipfile.ZipFile(fileobj) as archive:
+                metadata = self._snapshot_metadata(archive)
+                if metadata.get('format') != BACKUP_FORMAT:
+                    warnings.append('Unknown backup format')
+                expected = metadata.get('statistics') or {}
+                known = set(BACKUP_ENTITIES_BY_NAME)
+
+                for name, entity in metadata['snapshot']['entities'].items():
+                    if name not in known:
+                        warnings.append(f'{name}: unknown entity, will be ignored')
+                    width = len(entity.get('fields') or [])
+                    count = 0
+                    with archive.open(entity['file']) as member:
+                        for line_number, line in enumerate(member, 1):
+                            if not line.strip():
+                                continue
+                            count += 1
+                            try:
+                                values = json.loads(line)
+                            except ValueError:
+                                errors.append(f'{name}: invalid JSON at line {line_number}')
+                                continue
+                            if not isinstance(values, list) or len(values) != width:
+                                errors.append(f'{name}: line {line_number} has wrong number of fields')
+                            if len(errors) >= SNAPSHOT_MAX_ERRORS:
+                                break
+                    if name in expected and expected[name] != count:
+                        warnings.append(f'{name}: expected {expected[name]} items, found {count}')
+                    if len(errors) >= SNAPSHOT_MAX_ERRORS:
+                        errors.append('Too many errors, validation stopped')
+                        break
+        except (zipfile.BadZipFile, KeyError, ValueError) as e:
+            errors.append(f'Invalid snapshot: {e}')
+
+        return {
+            'valid': len(errors) == 0,
+            'version': metadata.get('version'),
+            'snapshot_version': (metadata.get('snapshot') or {}).get('version'),
+            'export_date': metadata.get('export_date'),
+            'statistics': metadata.get('statistics', {}),
+            'warnings': warnings,
+            'errors': errors
+        }
 
+    def _snapshot_metadata(self, archive: zipfile.ZipFile) -> dict:
+        metadata = json.loads(archive.read(SNAPSHOT_MANIFEST)).get('metadata') or {}
+        snapshot = metadata.get('snapshot')
+        if not snapshot or not isinstance(snapshot.get('entities'), dict):
+            raise ValueError('Missing snapshot manifest')
+        if snapshot.get('version', 0) > SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}")
+        return metadata
+
+    def _iter_snapshot_rows(self, archive: zipfile.ZipFile, entity: dict) -> Iterator[dict]:
+        fields = entity['fields']
+        with archive.open(entity['file']) as member:
+            for line in member:
+                if line.strip():
+                    yield dict(zip(fields, json.loads(line)))
+
+    def _backup_metadata(self, user_id: int, since: Optional[datetime] = None) -> dict:
+        # The export start is the watermark for the next incremental backup
+        now = datetime.utcnow().isoformat()
+        metadata = {
+            'export_date': now,
+            'user_id': user_id,
+            'version': BACKUP_VERSION,
+            'format': BACKUP_FORMAT,
+            'backup_type': 'full' if since is None else 'incremental',
+            'watermark': now
+        }
+        if since is not None:
+            metadata['since'] = since.isoformat()
+        return metadata
+
+    def _entity_query(
+        self,
+        session: Session,
+        model,
+        user_id: int,
+        *columns,
+        since: Optional[datetime] = None
+    ):
+        """
+        Base query of one exported entity, scoped to the user. With
+        ``since``, only rows created or changed after it are returned.
+        """
+        query = session.query(*columns)
+        if model is PendingTransaction:
+            query = query.join(
+                ImportBatch, ImportBatch.id == PendingTransaction.import_batch_id
+            ).filter(ImportBatch.user_id == user_id)
+        elif model is Dividend:
+            query = query.join(
+                Investment, Investment.id == Dividend.investment_id
+            ).filter(Investment.user_id == user_id)
+        else:
+            query = query.filter(model.user_id == user_id)
+        if model is Transaction:
+            query = query.filter(Transaction.deleted_at.is_(None))
+
+        if since is not None:
+            query = query.filter(or_(*[
+                getattr(model, column) > since
+                for column in CHANGE_TRACKING_COLUMNS
+                if column in model.__table__.c
+            ]))
+        return query
+
+    def _tombstones(self, user_id: int, since: datetime) -> Dict[str, List[int]]:
+        """IDs of transactions soft-deleted after ``since``"""
+        session = self.session_factory()
+        try:
+            deleted = session.query(Transaction.id).filter(
+                Transaction.user_id == user_id,
+                Transaction.deleted_at > since
+            ).order_by(Transaction.id)
+            return {'transactions': [row[0] for row in deleted]}
         finally:
             session.close()
 
@@ -334,29 +549,52 @@ class BackupService:
         """
         Restore data from backup.
 
+        Entities are restored in dependency order. Existing rows are matched
+        by natural key (loaded once per entity), every old ID is mapped to
+        the new one so foreign keys point at the restored rows, and missing
+        rows are bulk-inserted. Restoring the same backup twice is a no-op.
+
         Args:
             user_id: User to restore data for
             backup_data: Backup dictionary from export_full_backup
             overwrite: If True, delete existing data first (DANGEROUS!)
 
         Returns:
-            dict with statistics about restored items
+            dict with inserted rows per entity, skipped (already present)
+            rows, errors and throughput
         """
-        if not backup_data.get('metadata') or not backup_data.get('data'):
-            raise ValueError("Invalid backup format")
-
-        stats = {
-            'categories': 0,
-            'institutions': 0,
-            'credit_cards': 0,
-            'transactions': 0,
-            'financial_plans': 0,
-            'income_projections': 0,
-            'category_budgets': 0,
-            'investments': 0,
-            'dividends': 0,
-            'errors': []
-        }
+        return self.restore_backup_chain(user_id, backup_data, [], overwrite=overwrite)
+
+    def restore_backup_chain(
+        self,
+        user_id: int,
+        base: dict,
+        deltas: List[dict],
+        overwrite: bool = False
+    ) -> dict:
+        """
+        Restore a base backup followed by incremental backups, in order.
+
+        The old -> new ID maps built while restoring the base are kept for
+        the deltas, so a changed row updates the row restored before it
+        instead of creating a copy, and tombstones soft-delete the restored
+        transactions. Each delta must start at or before the watermark of
+        the previous backup, otherwise changes would be missing.
+
+        Returns the same statistics as ``import_full_backup``, plus updated
+        and deleted rows per entity.
+        """
+        chain = [base] + list(deltas)
+        for backup in chain:
+            if not backup.get('metadata') or not backup.get('data'):
+                raise ValueError("Invalid backup format")
+        for previous, delta in zip(chain, chain[1:]):
+            self._check_chain_link(previous['metadata'], delta['metadata'])
+
+        stats = {name: 0 for name, _, _ in BACKUP_ENTITIES}
+        stats.update({'skipped': {}, 'updated': {}, 'deleted': {}, 'errors': []})
+        id_maps: Dict[str, Dict[int, int]] = {name: {} for name, _, _ in BACKUP_ENTITIES}
+        started = time.perf_counter()
 
         with self._session_scope() as session:
             if overwrite:
@@ -364,88 +602,201 @@ class BackupService:
                 # In production, you might want additional safeguards
                 self._delete_user_data(session, user_id)
 
-            # Restore in dependency order (foreign keys)
-
-            # 1. Categories (no dependencies)
-            for cat_data in backup_data['data'].get('categories', []):
-                try:
-                    # Check if exists (by name)
-                    existing = session.query(Category).filter_by(
-                        user_id=user_id,
-                        name=cat_data['name'],
-                        parent_id=cat_data.get('parent_id')
-                    ).first()
-
-                    if not existing:
-                        category = Category(
-                            user_id=user_id,
-                            name=cat_data['name'],
-                            type=cat_data['type'],
-                            parent_id=cat_data.get('parent_id'),
-                            color=cat_data.get('color'),
-                            icon=cat_data.get('icon'),
-                            is_active=cat_data.get('is_active', True)
-                        )
-                        session.add(category)
-                        stats['categories'] += 1
-                except Exception as e:
-                    stats['errors'].append(f"Category {cat_data.get('name')}: {str(e)}")
-
-            session.flush()  # Get IDs for foreign keys
-
-            # 2. Institutions
-            for inst_data in backup_data['data'].get('institutions', []):
-                try:
-                    existing = session.query(Institution).filter_by(
-                        user_id=user_id,
-                        name=inst_data['name']
-                    ).first()
-
-                    if not existing:
-                        institution = Institution(
-                            user_id=user_id,
-                            name=inst_data['name'],
-                            account_type=inst_data.get('account_type', 'checking'),
-                            partition=inst_data.get('partition'),
-                            initial_balance=inst_data.get('initial_balance', 0),
-                            current_balance=inst_data.get('current_balance', 0),
-                            is_active=inst_data.get('is_active', True)
-                        )
-                        session.add(institution)
-                        stats['institutions'] += 1
-                except Exception as e:
-                    stats['errors'].append(f"Institution {inst_data.get('name')}: {str(e)}")
-
-            session.flush()
-
-            # 3. Credit Cards (depends on institutions)
-            # ... (similar pattern)
-
-            # 4. Transactions
-            for tx_data in backup_data['data'].get('transactions', []):
-                try:
-                    transaction = Transaction(
-                        user_id=user_id,
-                        event_date=datetime.fromisoformat(tx_data['event_date']),
-                        effective_date=datetime.fromisoformat(tx_data['effective_date']) if tx_data.get('effective_date') else None,
-                        transaction_type=tx_data['transaction_type'],
-                        category_id=self._map_category_id(session, user_id, tx_data['category_id']),
-                        amount=tx_data['amount'],
-                        description=tx_data['description'],
-                        notes=tx_data.get('notes'),
-                        institution_id=tx_data.get('institution_id'),
-                        credit_card_id=tx_data.get('credit_card_id'),
-                        status=tx_data['status'],
-                        is_recurring=tx_data.get('is_recurring', False)
+            investment_types = {row[0] for row in session.query(InvestmentType.id)}
+            for position, backup in enumerate(chain):
+                data = backup['data']
+                for name, model, _ in BACKUP_ENTITIES:
+                    self._restore_entity(
+                        session, user_id, name, model, data.get(name) or [],
+                        id_maps, investment_types, stats, update_known=position > 0
                     )
-                    session.add(transaction)
-                    stats['transactions'] += 1
-                except Exception as e:
-                    stats['errors'].append(f"Transaction {tx_data.get('description')}: {str(e)}")
+                self._apply_tombstones(session, user_id, backup.get('tombstones') or {}, id_maps, stats)
+
+        elapsed = time.perf_counter() - started
+        processed = sum(stats[name] for name, _, _ in BACKUP_ENTITIES) + sum(
+            sum(stats[kind].values()) for kind in ('skipped', 'updated', 'deleted')
+        )
+        stats['elapsed_seconds'] = round(elapsed, 3)
+        stats['rows_per_second'] = round(processed / elapsed, 1) if elapsed > 0 else None
+
+        invalidate_planned_cache(user_id)
+        invalidate_cashflow_cache(user_id)
+        invalidate_portfolio_cache(user_id)
+        invalidate_category_index(user_id)
+        return stats
 
-            # 5. Financial Plans, Investments, etc. (similar pattern)
+    def _check_chain_link(self, previous: dict, delta: dict):
+        if delta.get('backup_type') != 'incremental' or not delta.get('since'):
+            raise ValueError("Only incremental backups can follow the base backup")
+        watermark = previous.get('watermark') or previous.get('export_date')
+        if not watermark or datetime.fromisoformat(delta['since']) > datetime.fromisoformat(watermark):
+            raise ValueError(
+                f"Gap in backup chain: delta since {delta['since']} starts after watermark {watermark}"
+            )
 
-        return stats
+    def _apply_tombstones(
+        self,
+        session: Session,
+        user_id: int,
+        tombstones: Dict[str, List[int]],
+        id_maps: Dict[str, Dict[int, int]],
+        stats: dict
+    ):
+        """Soft-delete restored transactions listed as deleted in a delta"""
+        old_ids = tombstones.get('transactions') or []
+        new_ids = [id_maps['transactions'][i] for i in old_ids if i in id_maps['transactions']]
+        if not new_ids:
+            return
+        deleted = session.query(Transaction).filter(
+            Transaction.id.in_(new_ids),
+            Transaction.user_id == user_id,
+            Transaction.deleted_at.is_(None)
+        ).update({'deleted_at': datetime.utcnow()}, synchronize_session=False)
+        stats['deleted']['transactions'] = stats['deleted'].get('transactions', 0) + deleted
+
+    def _restore_entity(
+        self,
+        session: Session,
+        user_id: int,
+        name: str,
+        model,
+        rows: List[dict],
+        id_maps: Dict[str, Dict[int, int]],
+        investment_types: set,
+        stats: dict,
+        update_known: bool = False
+    ):
+        """
+        Restore one entity, filling ``id_maps[name]`` (old ID -> new ID).
+        With ``update_known``, rows whose old ID is already mapped update
+        that row instead of being matched by natural key.
+
+        The natural key only matches rows that already existed in the
+        target database, one backup row per existing row; every other
+        backup row is inserted on its own, so identical rows (two equal
+        purchases on the same day) are all kept.
+        """
+        key_fields, foreign_keys = RESTORE_SPECS[name]
+        id_map = id_maps[name]
+        if not rows:
+            return
+
+        columns = model.__table__.c
+        fields = [f for f in BACKUP_ENTITIES_BY_NAME[name] if f != 'id']
+        self_field = next((f for f, (target, _) in foreign_keys.items() if target == name), None)
+
+        key_columns = [getattr(model, f) for f in key_fields]
+        existing: Dict[tuple, List[int]] = {}
+        for values in self._entity_query(session, model, user_id, model.id, *key_columns).order_by(model.id):
+            existing.setdefault(tuple(values[1:]), []).append(values[0])
+
+        # Self references (category tree, recurrence parents) are restored
+        # level by level so the parent always has its new ID first
+        remaining = rows
+        while remaining:
+            ready = [
+                r for r in remaining
+                if not self_field or r.get(self_field) is None or r.get(self_field) in id_map
+            ]
+            if not ready:
+                stats['errors'].append(
+                    f"{name}: {len(remaining)} rows reference missing parents; restored without parent"
+                )
+                for r in remaining:
+                    r[self_field] = None
+                ready = remaining
+            ready_ids = {id(r) for r in ready}
+            remaining = [r for r in remaining if id(r) not in ready_ids]
+
+            inserts: List[dict] = []
+            updates: List[dict] = []
+            old_ids: List[Optional[int]] = []
+            for raw in ready:
+                row = self._restore_row(name, raw, fields, columns, foreign_keys, id_maps, id_map, investment_types, stats)
+                if row is None:
+                    continue
+                if 'user_id' in columns:
+                    row['user_id'] = user_id
+                if update_known and raw.get('id') in id_map:
+                    updates.append(dict(row, id=id_map[raw['id']]))
+                    continue
+                matches = existing.get(tuple(row.get(f) for f in key_fields))
+                if matches:
+                    id_map[raw.get('id')] = matches.pop(0)
+                    stats['skipped'][name] = stats['skipped'].get(name, 0) + 1
+                    continue
+                inserts.append(row)
+                old_ids.append(raw.get('id'))
+
+            new_ids = self._bulk_insert(session, model, inserts)
+            for old_id, new_id in zip(old_ids, new_ids):
+                if old_id is not None:
+                    id_map[old_id] = new_id
+            stats[name] += len(inserts)
+
+            if updates:
+                session.execute(update(model), [_without_null_defaults(columns, row) for row in updates])
+                stats['updated'][name] = stats['updated'].get(name, 0) + len(updates)
+
+    def _restore_row(
+        self,
+        name: str,
+        raw: dict,
+        fields: List[str],
+        columns,
+        foreign_keys: Dict[str, Tuple[str, bool]],
+        id_maps: Dict[str, Dict[int, int]],
+        id_map: Dict[int, int],
+        investment_types: set,
+        stats: dict
+    ) -> Optional[dict]:
+        """Convert one backup row into insert values with remapped foreign keys"""
+        row = {f: _deserialize_value(columns[f], raw.get(f)) for f in fields}
+
+        for field, (target, required) in foreign_keys.items():
+            old_id = raw.get(field)
+            if old_id is None:
+                continue
+            mapping = id_map if target == name else id_maps.get(target, {})
+            new_id = mapping.get(old_id)
+            if new_id is None and required:
+                stats['errors'].append(f"{name} {raw.get('id')}: {field} {old_id} not found in backup")
+                return None
+            row[field] = new_id
+
+        # Backups older than counted_in_value hold dividends that were added
+        # to the investment's current_value
+        if name == 'dividends' and 'counted_in_value' not in raw:
+            row['counted_in_value'] = True
+
+        # Investment types are a shared catalog, not part of the backup
+        if 'investment_type_id' in row and row['investment_type_id'] not in investment_types:
+            row['investment_type_id'] = None
+        return row
+
+    def _bulk_insert(self, session: Session, model, rows: List[dict]) -> List[int]:
+        """
+        Insert rows with executemany and return the new IDs in input order.
+        Rows are grouped by key set, since NULLs in NOT NULL columns are
+        left out so the column defaults apply.
+        """
+        columns = model.__table__.c
+        groups: Dict[frozenset, List[int]] = {}
+        cleaned = []
+        for position, row in enumerate(rows):
+            row = _without_null_defaults(columns, row)
+            cleaned.append(row)
+            groups.setdefault(frozenset(row), []).append(position)
+
+        new_ids: List[Optional[int]] = [None] * len(rows)
+        for positions in groups.values():
+            result = session.execute(
+                insert(model).returning(model.id, sort_by_parameter_order=True),
+                [cleaned[p] for p in positions]
+            )
+            for position, new_id in zip(positions, result.scalars()):
+                new_ids[position] = new_id
+        return new_ids
 
     def _delete_user_data(self, session: Session, user_id: int):
         """Delete all user data (for overwrite restore)"""
@@ -455,9 +806,18 @@ class BackupService:
                 session.query(Investment.id).filter_by(user_id=user_id)
             )
         ).delete(synchronize_session=False)
+        session.query(InvestmentEvent).filter_by(user_id=user_id).delete()
+
+        session.query(PendingTransaction).filter(
+            PendingTransaction.import_batch_id.in_(
+                session.query(ImportBatch.id).filter_by(user_id=user_id)
+            )
+        ).delete(synchronize_session=False)
 
         session.query(Investment).filter_by(user_id=user_id).delete()
         session.query(Transaction).filter_by(user_id=user_id).delete()
+        session.query(ImportBatch).filter_by(user_id=user_id).delete()
+        session.query(TrainingJob).filter_by(user_id=user_id).delete()
         session.query(CategoryBudget).filter_by(user_id=user_id).delete()
         session.query(CategoryRecurringPlan).filter_by(user_id=user_id).delete()
         session.query(PlanningNote).filter_by(user_id=user_id).delete()
@@ -467,53 +827,86 @@ class BackupService:
         session.query(Institution).filter_by(user_id=user_id).delete()
         session.query(Category).filter_by(user_id=user_id).delete()
 
-    def _map_category_id(self, session: Session, user_id: int, old_cat_id: int) -> int:
-        """Map old category ID to new one (for restore)"""
-        # This is simplified - in production you'd need a proper ID mapping
-        # For now, just return the same ID
-        return old_cat_id
-
     def export_to_excel(self, user_id: int) -> bytes:
         """
         Export data to Excel format (XLSX).
         Returns bytes that can be sent as file download.
+        Prefer ``export_to_excel_file`` for downloads.
+        """
+        path = self.export_to_excel_file(user_id)
+        try:
+            with open(path, 'rb') as handle:
+                return handle.read()
+        finally:
+            os.remove(path)
+
+    def export_to_excel_file(self, user_id: int) -> str:
+        """
+        Export data to an XLSX temp file and return its path.
+
+        Uses openpyxl write-only mode fed from the chunked cursors, so memory
+        is bounded by one chunk regardless of export size. The caller owns
+        the file and must remove it.
         """
         try:
             import openpyxl
-            from openpyxl.utils import get_column_letter
         except ImportError:
             raise ImportError("openpyxl library required for Excel export")
 
-        backup_data = self.export_full_backup(user_id)
-
-        # Create workbook
-        wb = openpyxl.Workbook()
-
-        # Remove default sheet
-        wb.remove(wb.active)
-
-        # Create sheets for each entity
-        for entity_name, items in backup_data['data'].items():
-            if not items:
-                continue
-
-            ws = wb.create_sheet(title=entity_name[:31])  # Excel limit
+        wb = openpyxl.Workbook(write_only=True)
+        session = self.session_factory()
+        try:
+            for name, model, fields in BACKUP_ENTITIES:
+                rows = self._iter_entity_rows(session, model, fields, user_id)
+                first = next(rows, None)
+                if first is None:
+                    continue
+
+                ws = wb.create_sheet(title=name[:31])  # Excel limit
+                ws.append(list(fields))
+                ws.append([_tabular_value(first[field]) for field in fields])
+                for row in rows:
+                    ws.append([_tabular_value(row[field]) for field in fields])
+        finally:
+            session.close()
 
-            # Headers
-            if items:
-                headers = list(items[0].keys())
-                for col_num, header in enumerate(headers, 1):
-                    ws.cell(row=1, column=col_num, value=header)
+        # Workbook without sheets cannot be saved
+        if not wb.worksheets:
+            wb.create_sheet(title='empty')
 
-                # Data
-                for row_num, item in enumerate(items, 2):
-                    for col_num, header in enumerate(headers, 1):
-                        value = item.get(header)
-                        ws.cell(row=row_num, column=col_num, value=value)
+        handle, path = tempfile.mkstemp(prefix='flow_forecaster_', suffix='.xlsx')
+        os.close(handle)
+        try:
+            wb.save(path)
+        except Exception:
+            os.remove(path)
+            raise
+        return path
 
-        # Save to bytes
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+    def export_to_csv_zip_file(self, user_id: int) -> str:
+        """
+        Export data as a ZIP with one CSV per entity; returns the temp file path.
 
-        return output.read()
+        Cheaper than XLSX: rows are written straight into the compressed
+        members while the cursors stream. The caller must remove the file.
+        """
+        handle, path = tempfile.mkstemp(prefix='flow_forecaster_', suffix='.zip')
+        os.close(handle)
+        session = self.session_factory()
+        try:
+            with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for name, model, fields in BACKUP_ENTITIES:
+                    with archive.open(f'{name}.csv', 'w') as member:
+                        text = io.TextIOWrapper(member, encoding='utf-8', newline='')
+                        writer = csv.writer(text)
+                        writer.writerow(fields)
+                        for row in self._iter_entity_rows(session, model, fields, user_id):
+                            writer.writerow([_tabular_value(row[field]) for field in fields])
+                        text.flush()
+                        text.detach()
+        except Exception:
+            os.remove(path)
+            raise
+        finally:
+            session.close()
+        return path
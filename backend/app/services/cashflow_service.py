@@ -0,0 +1,287 @@
+"""
+Projeção de fluxo de caixa (diária ou mensal) por conta.
+"""
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models import (
+    Category,
+    CategoryBudget,
+    CategoryType,
+    FinancialPlan,
+    IncomeProjection,
+    Institution,
+    Transaction,
+    TransactionStatus,
+    TransactionType,
+)
+from ..utils.cache import DERIVED_DATA_TTL, TTLCache
+from .recurring_plan_engine import RecurringPlanEngine
+
+MAX_MONTHS = 60
+GRANULARITIES = ("month", "day")
+
+# (user_id, meses, granularidade, data inicial) -> projeção
+_cashflow_cache = TTLCache(maxsize=256, ttl=DERIVED_DATA_TTL)
+
+# índices dos tipos de fluxo na matriz (tipo × período × conta)
+_INCOME, _EXPENSE, _CONTRIBUTION = 0, 1, 2
+
+
+def invalidate_cashflow_cache(user_id: Optional[int] = None) -> None:
+    """Descarta projeções em cache do usuário (ou todas, se user_id=None)."""
+    if user_id is None:
+        _cashflow_cache.clear()
+    else:
+        _cashflow_cache.invalidate_where(lambda key: key[0] == user_id)
+
+
+def _month_index(value: date) -> int:
+    return value.year * 12 + (value.month - 1)
+
+
+class CashFlowForecaster:
+    """
+    Projeta saldo futuro combinando:
+
+    - saldo atual das instituições (ponto de partida);
+    - transações manuais pendentes (Transaction com status PENDING);
+    - receitas previstas não recebidas (IncomeProjection);
+    - despesas/receitas planejadas por categoria: meta do mês (CategoryBudget)
+      quando existir, senão a recorrência (CategoryRecurringPlan);
+    - aportes mensais dos planos ativos (FinancialPlan.monthly_contribution)
+      até a data alvo ou até a meta ser atingida.
+
+    Os fluxos são acumulados em uma matriz NumPy (tipo × período × conta) e o
+    saldo é a soma acumulada ao longo dos períodos. Itens sem instituição vão
+    para a conta "não atribuída". Na granularidade diária, fluxos mensais
+    (metas, recorrências e aportes) caem no primeiro dia de cada mês.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def forecast(
+        self,
+        *,
+        user_id: int = 1,
+        months: int = 12,
+        granularity: str = "month",
+        start: Optional[date] = None,
+    ) -> Dict:
+        if granularity not in GRANULARITIES:
+            raise ValueError("granularity inválida. Use 'month' ou 'day'.")
+        if months < 1 or months > MAX_MONTHS:
+            raise ValueError(f"months deve estar entre 1 e {MAX_MONTHS}.")
+
+        start = start or date.today()
+        key = (user_id, months, granularity, start)
+        cached = _cashflow_cache.get(key)
+        if cached is not None:
+            return cached
+
+        result = self._compute(user_id, months, granularity, start)
+        _cashflow_cache.set(key, result)
+        return result
+
+    # --- internals ---
+    def _compute(self, user_id: int, months: int, granularity: str, start: date) -> Dict:
+        first_month = _month_index(start)
+        month_ids = np.arange(first_month, first_month + months)
+        month_starts = [date(int(i) // 12, int(i) % 12 + 1, 1) for i in month_ids]
+        end = self._next_month(month_starts[-1])
+
+        if granularity == "month":
+            labels = [f"{d.year:04d}-{d.month:02d}" for d in month_starts]
+            month_to_period = np.arange(months)
+        else:
+            n_days = (end - start).days
+            labels = [(start + timedelta(days=i)).isoformat() for i in range(n_days)]
+            month_to_period = np.array([max((d - start).days, 0) for d in month_starts])
+
+        session = self.session_factory()
+        try:
+            accounts = (
+                session.query(Institution.id, Institution.name, Institution.current_balance)
+                .filter(Institution.user_id == user_id, Institution.is_active.is_(True))
+                .order_by(Institution.name)
+                .all()
+            )
+            account_pos = {acc_id: pos for pos, (acc_id, _, _) in enumerate(accounts)}
+            unassigned = len(accounts)
+            flows = np.zeros((3, len(labels), len(accounts) + 1))
+
+            def _account_positions(institution_ids) -> np.ndarray:
+                return np.array([account_pos.get(i, unassigned) for i in institution_ids], dtype=int)
+
+            def _date_periods(dates) -> np.ndarray:
+                if granularity == "month":
+                    idx = np.array([_month_index(d) for d in dates]) - first_month
+                else:
+                    idx = np.array([(d - start).days for d in dates])
+                # pendências vencidas entram no primeiro período
+                return np.clip(idx, 0, None)
+
+            # 1. Transações manuais pendentes
+            tx_date = func.coalesce(Transaction.effective_date, Transaction.event_date)
+            pending = (
+                session.query(
+                    Transaction.institution_id,
+                    Transaction.transaction_type,
+                    Transaction.amount,
+                    tx_date,
+                )
+                .filter(
+                    Transaction.user_id == user_id,
+                    Transaction.deleted_at.is_(None),
+                    Transaction.status == TransactionStatus.PENDING,
+                    tx_date < end,
+                )
+                .all()
+            )
+            if pending:
+                inst_ids, types, amounts, dates = zip(*pending)
+                periods = _date_periods([d.date() for d in dates])
+                positions = _account_positions(inst_ids)
+                amounts = np.array(amounts, dtype=float)
+                is_income = np.array([t == TransactionType.INCOME for t in types])
+                np.add.at(flows[_INCOME], (periods[is_income], positions[is_income]), amounts[is_income])
+                np.add.at(flows[_EXPENSE], (periods[~is_income], positions[~is_income]), amounts[~is_income])
+
+            # 2. Receitas previstas ainda não recebidas
+            projections = (
+                session.query(IncomeProjection.amount, IncomeProjection.expected_date)
+                .filter(
+                    IncomeProjection.user_id == user_id,
+                    IncomeProjection.received.is_(False),
+                    IncomeProjection.expected_date < end,
+                )
+                .all()
+            )
+            if projections:
+                amounts, dates = zip(*projections)
+                np.add.at(flows[_INCOME], (_date_periods(dates), unassigned), np.array(amounts, dtype=float))
+
+            # 3. Planejado por categoria: meta do mês prevalece sobre a recorrência
+            budget_month = CategoryBudget.year * 12 + (CategoryBudget.month - 1)
+            budgets = (
+                session.query(CategoryBudget.category_id, budget_month, CategoryBudget.amount)
+                .filter(
+                    CategoryBudget.user_id == user_id,
+                    budget_month >= first_month,
+                    budget_month < first_month + months,
+                )
+                .all()
+            )
+            recurring = RecurringPlanEngine(self.session_factory).monthly_planned(
+                [(d.year, d.month) for d in month_starts],
+                user_id=user_id,
+                session=session,
+            )
+            category_ids = sorted(set(recurring) | {row[0] for row in budgets})
+            if category_ids:
+                category_row = {cid: pos for pos, cid in enumerate(category_ids)}
+                month_labels = [f"{d.year:04d}-{d.month:02d}" for d in month_starts]
+                planned = np.zeros((len(category_ids), months))
+                for category_id, values in recurring.items():
+                    planned[category_row[category_id]] = [values.get(k, 0.0) for k in month_labels]
+                for category_id, month_id, amount in budgets:
+                    planned[category_row[category_id], int(month_id) - first_month] = amount or 0.0
+
+                types = dict(
+                    session.query(Category.id, Category.type)
+                    .filter(Category.id.in_(category_ids))
+                    .all()
+                )
+                is_income = np.array([types.get(cid) == CategoryType.INCOME for cid in category_ids])
+                np.add.at(flows[_INCOME], (month_to_period, unassigned), planned[is_income].sum(axis=0))
+                np.add.at(flows[_EXPENSE], (month_to_period, unassigned), planned[~is_income].sum(axis=0))
+
+            # 4. Aportes mensais dos planos ativos
+            plans = (
+                session.query(
+                    FinancialPlan.institution_id,
+                    FinancialPlan.monthly_contribution,
+                    FinancialPlan.goal_amount,
+                    FinancialPlan.current_balance,
+                    FinancialPlan.target_date,
+                )
+                .filter(
+                    FinancialPlan.user_id == user_id,
+                    FinancialPlan.is_active.is_(True),
+                    FinancialPlan.monthly_contribution > 0,
+                )
+                .all()
+            )
+            if plans:
+                inst_ids, contributions, goals, balances, targets = zip(*plans)
+                contributions = np.array(contributions, dtype=float)
+                remaining = np.clip(np.array(goals, dtype=float) - np.array(balances, dtype=float), 0, None)
+                # meses necessários para atingir a meta e meses até a data alvo
+                needed = np.ceil(remaining / contributions)
+                until_target = np.array(
+                    [(_month_index(t) - first_month + 1) if t else months for t in targets], dtype=float
+                )
+                active_months = np.minimum(needed, until_target)
+                offsets = np.arange(months)
+                mask = offsets[None, :] < active_months[:, None]
+                schedule = mask * contributions[:, None]
+                positions = _account_positions(inst_ids)
+                np.add.at(
+                    flows[_CONTRIBUTION],
+                    (month_to_period[None, :], positions[:, None]),
+                    schedule,
+                )
+        finally:
+            session.close()
+
+        opening = np.array([acc[2] or 0.0 for acc in accounts] + [0.0])
+        net = flows[_INCOME] - flows[_EXPENSE] - flows[_CONTRIBUTION]
+        balances = opening[None, :] + np.cumsum(net, axis=0)
+        totals = balances.sum(axis=1)
+        lowest = int(np.argmin(totals))
+
+        account_names = [name for _, name, _ in accounts] + ["Não atribuído"]
+        account_ids: List[Optional[int]] = [acc_id for acc_id, _, _ in accounts] + [None]
+
+        return {
+            "start": start.isoformat(),
+            "end": (end - timedelta(days=1)).isoformat(),
+            "granularity": granularity,
+            "months": months,
+            "opening_balance": round(float(opening.sum()), 2),
+            "closing_balance": round(float(totals[-1]), 2),
+            "lowest_balance": {"period": labels[lowest], "balance": round(float(totals[lowest]), 2)},
+            "accounts": [
+                {
+                    "institution_id": account_ids[i],
+                    "name": account_names[i],
+                    "opening_balance": round(float(opening[i]), 2),
+                    "closing_balance": round(float(balances[-1, i]), 2),
+                }
+                for i in range(len(account_names))
+            ],
+            "series": [
+                {
+                    "period": labels[p],
+                    "income": round(float(flows[_INCOME, p].sum()), 2),
+                    "expense": round(float(flows[_EXPENSE, p].sum()), 2),
+                    "contributions": round(float(flows[_CONTRIBUTION, p].sum()), 2),
+                    "net": round(float(net[p].sum()), 2),
+                    "balance": round(float(totals[p]), 2),
+                }
+                for p in range(len(labels))
+            ],
+        }
+
+    @staticmethod
+    def _next_month(value: date) -> date:
+        if value.month == 12:
+            return date(value.year + 1, 1, 1)
+        return date(value.year, value.month + 1, 1)
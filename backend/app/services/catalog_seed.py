@@ -4,17 +4,26 @@ Utilitário para popular cadastros base a partir dos dados já importados.
 from __future__ import annotations
 
 from contextlib import contextmanager
-from typing import Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+from typing import Callable, Dict, List
 
-from sqlalchemy import func
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
 from ..models import Category, CategoryType, ImportBatch, Institution, PendingTransaction
+from .category_index import DEFAULT_USER_ID, get_category_index, invalidate_category_index, normalize_category_name
 
 
 class CatalogSeeder:
     """
     Cria registros iniciais de categorias e instituições com base nas importações já existentes.
+
+    Os nomes distintos são agregados no banco (``SELECT DISTINCT``/``GROUP BY``),
+    de modo que o custo em Python depende do número de nomes, não do número de
+    transações importadas; os ausentes entram num único INSERT que ignora
+    conflitos com linhas criadas em paralelo.
     """
 
     DEFAULT_ACCOUNT_TYPE = "corrente"
@@ -42,72 +51,129 @@ class CatalogSeeder:
             institutions_created = self._seed_institutions(session)
             categories_created = self._seed_categories(session)
 
-            return {
-                "institutions_created": institutions_created,
-                "categories_created": categories_created,
-            }
+        if categories_created:
+            invalidate_category_index(DEFAULT_USER_ID)
+        return {
+            "institutions_created": institutions_created,
+            "categories_created": categories_created,
+        }
 
     # --- Internals ---
+    @staticmethod
+    def _insert_ignoring_conflicts(session: Session, model, rows: List[dict], **conflict_target) -> int:
+        """INSERT multi-linhas; ``conflict_target`` escolhe o índice único (index_elements/index_where)."""
+        if not rows:
+            return 0
+        dialect = session.get_bind().dialect.name
+        if dialect == "sqlite":
+            stmt = sqlite_insert(model.__table__).on_conflict_do_nothing(**conflict_target)
+        elif dialect == "postgresql":
+            stmt = pg_insert(model.__table__).on_conflict_do_nothing(**conflict_target)
+        else:
+            stmt = insert(model.__table__)
+        return session.execute(stmt.values(rows)).rowcount
+
+    @staticmethod
+    def _clean_name(column):
+        """Nome sem espaços nas pontas; vazio vira NULL."""
+        return func.nullif(func.trim(column), "")
+
     def _seed_institutions(self, session: Session) -> int:
+        name = self._clean_name(ImportBatch.institution_name)
+        # primeiro lote de cada instituição e primeiro lote com saldo informado
+        first_batches = (
+            session.query(name, func.min(ImportBatch.id))
+            .filter(name.isnot(None))
+            .group_by(name)
+            .all()
+        )
+        if not first_batches:
+            return 0
+        first_with_balance = (
+            session.query(func.min(ImportBatch.id))
+            .filter(name.isnot(None), ImportBatch.balance.isnot(None))
+            .group_by(name)
+        )
+        balances = dict(
+            session.query(name, ImportBatch.balance)
+            .filter(ImportBatch.id.in_(first_with_balance))
+            .all()
+        )
+
         existing = {
-            inst.name.lower(): inst
-            for inst in session.query(Institution).all()
+            inst_name.lower(): (inst_id, current_balance)
+            for inst_id, inst_name, current_balance in session.query(
+                Institution.id, Institution.name, Institution.current_balance
+            ).filter(Institution.user_id == DEFAULT_USER_ID)
         }
-        created = 0
 
-        batches: List[Tuple[Optional[str], Optional[float]]] = (
-            session.query(ImportBatch.institution_name, ImportBatch.balance)
-            .filter(ImportBatch.institution_name.isnot(None))
-            .all()
-        )
-        for name, balance in batches:
-            if not name:
-                continue
-            key = name.strip().lower()
+        now = datetime.utcnow()
+        rows: Dict[str, dict] = {}
+        balance_updates = []
+        for inst_name, _ in sorted(first_batches, key=lambda row: row[1]):
+            key = inst_name.lower()
+            balance = balances.get(inst_name)
             if key in existing:
                 # Atualiza saldo atual se fornecido
-                if balance is not None and existing[key].current_balance == 0:
-                    existing[key].current_balance = balance
+                inst_id, current_balance = existing[key]
+                if balance is not None and current_balance == 0:
+                    balance_updates.append({"id": inst_id, "current_balance": balance})
+                    existing[key] = (inst_id, balance)
                 continue
+            if key in rows:
+                continue
+            rows[key] = {
+                "user_id": DEFAULT_USER_ID,
+                "name": inst_name,
+                "account_type": self.DEFAULT_ACCOUNT_TYPE,
+                "current_balance": balance or 0.0,
+                "initial_balance": balance or 0.0,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
 
-            inst = Institution(
-                name=name.strip(),
-                account_type=self.DEFAULT_ACCOUNT_TYPE,
-                current_balance=balance or 0.0,
-                initial_balance=balance or 0.0,
-            )
-            session.add(inst)
-            existing[key] = inst
-            created += 1
-        return created
+        if balance_updates:
+            session.execute(update(Institution), balance_updates)
+        return self._insert_ignoring_conflicts(session, Institution, list(rows.values()))
 
     def _seed_categories(self, session: Session) -> int:
-        existing = {
-            (cat.name.lower(), cat.type): cat
-            for cat in session.query(Category).all()
-        }
-        created = 0
-
-        tx_rows: List[Tuple[Optional[str], float]] = (
-            session.query(PendingTransaction.user_category, PendingTransaction.predicted_category, PendingTransaction.amount)
+        name = func.coalesce(
+            self._clean_name(PendingTransaction.user_category),
+            self._clean_name(PendingTransaction.predicted_category),
+        )
+        is_expense = case((PendingTransaction.amount < 0, True), else_=False)
+        distinct_names = (
+            session.query(name, is_expense)
+            .filter(name.isnot(None))
+            .distinct()
+            .order_by(name)
             .all()
         )
-        for user_cat, predicted_cat, amount in tx_rows:
-            name = (user_cat or predicted_cat or "").strip()
-            if not name:
+        if not distinct_names:
+            return 0
+
+        index = get_category_index(self.session_factory, DEFAULT_USER_ID, session=session)
+        now = datetime.utcnow()
+        rows: Dict[tuple, dict] = {}
+        for cat_name, expense in distinct_names:
+            cat_type = CategoryType.EXPENSE if expense else CategoryType.INCOME
+            key = (normalize_category_name(cat_name), cat_type)
+            if key in rows or index.find(cat_name, cat_type):
                 continue
-
-            cat_type = CategoryType.EXPENSE if amount < 0 else CategoryType.INCOME
-            key = (name.lower(), cat_type)
-            if key in existing:
-                continue
-
-            cat = Category(
-                name=name,
-                type=cat_type,
-            )
-            session.add(cat)
-            existing[key] = cat
-            created += 1
-
-        return created
+            rows[key] = {
+                "user_id": DEFAULT_USER_ID,
+                "name": cat_name,
+                "type": cat_type,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+        # seeders concorrentes: o índice uq_category_root_name_type descarta a cópia
+        return self._insert_ignoring_conflicts(
+            session,
+            Category,
+            list(rows.values()),
+            index_elements=[Category.user_id, func.lower(Category.name), Category.type],
+            index_where=Category.parent_id.is_(None),
+        )
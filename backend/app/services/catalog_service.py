@@ -16,6 +16,8 @@ from ..models import (
     Institution,
     InvestmentType,
 )
+from .cashflow_service import invalidate_cashflow_cache
+from .category_index import get_category_index, invalidate_category_index
 
 
 class CatalogService:
@@ -45,31 +47,28 @@ class CatalogService:
         category_type: Optional[str] = None,
         parent_id: Optional[int] = None,
         include_inactive: bool = False,
+        user_id: int = 1,
     ) -> List[dict]:
-        session = self.session_factory()
-        try:
-            query = session.query(Category)
-
-            parsed_type = self._parse_category_type(category_type) if category_type else None
-            if parsed_type:
-                query = query.filter(Category.type == parsed_type)
-
-            if parent_id is not None:
-                query = query.filter(Category.parent_id == parent_id)
-
-            if not include_inactive:
-                query = query.filter(Category.is_active.is_(True))
+        parsed_type = self._parse_category_type(category_type) if category_type else None
+        return get_category_index(self.session_factory, user_id).categories(
+            category_type=parsed_type,
+            parent_id=parent_id,
+            include_inactive=include_inactive,
+        )
 
-            categories = query.order_by(Category.name.asc()).all()
-            return [c.to_dict() for c in categories]
-        finally:
-            session.close()
+    def category_tree(self, *, include_inactive: bool = False, user_id: int = 1) -> List[dict]:
+        """Categorias raiz com subcategorias aninhadas."""
+        return get_category_index(self.session_factory, user_id).tree(include_inactive=include_inactive)
 
     def get_category(self, category_id: int) -> Optional[dict]:
         session = self.session_factory()
         try:
             category = session.get(Category, category_id)
-            return category.to_dict(include_children=True) if category else None
+            if not category:
+                return None
+            data = category.to_dict()
+            data["children"] = get_category_index(self.session_factory, category.user_id).children(category.id)
+            return data
         finally:
             session.close()
 
@@ -109,7 +108,9 @@ class CatalogService:
             )
             session.add(category)
             session.flush()
-            return category.to_dict()
+            result = category.to_dict()
+        invalidate_category_index(user_id)
+        return result
 
     def update_category(
         self,
@@ -159,7 +160,9 @@ class CatalogService:
                 is_active=is_active,
             )
             session.flush()
-            return category.to_dict()
+            result = category.to_dict()
+        invalidate_category_index(result["user_id"])
+        return result
 
     def delete_category(self, category_id: int) -> bool:
         with self._session_scope() as session:
@@ -168,8 +171,10 @@ class CatalogService:
                 return False
             if category.children:
                 raise ValueError("Remova ou recoloque as subcategorias antes de excluir a categoria.")
+            user_id = category.user_id
             session.delete(category)
-            return True
+        invalidate_category_index(user_id)
+        return True
 
     # --- Instituições ---
     def list_institutions(self, *, include_inactive: bool = False) -> List[dict]:
@@ -207,7 +212,9 @@ class CatalogService:
             )
             session.add(institution)
             session.flush()
-            return institution.to_dict()
+            result = institution.to_dict()
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def update_institution(
         self,
@@ -238,15 +245,20 @@ class CatalogService:
                 is_active=is_active,
             )
             session.flush()
-            return institution.to_dict()
+            result = institution.to_dict()
+            user_id = institution.user_id
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def delete_institution(self, institution_id: int) -> bool:
         with self._session_scope() as session:
             institution = session.get(Institution, institution_id)
             if not institution:
                 return False
+            user_id = institution.user_id
             session.delete(institution)
-            return True
+        invalidate_cashflow_cache(user_id)
+        return True
 
     # --- Cartões de crédito ---
     def list_credit_cards(self, *, include_inactive: bool = False, institution_id: Optional[int] = None) -> List[dict]:
@@ -0,0 +1,139 @@
+"""
+Índice de categorias por usuário.
+
+Carrega todas as categorias do usuário com uma consulta e monta os mapas
+id -> categoria, nome normalizado -> categoria e a árvore completa. O índice
+fica em cache até a próxima alteração do cadastro (CatalogService, seed ou
+restauração de backup) no mesmo processo; nos outros workers, até expirar.
+"""
+from __future__ import annotations
+
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from ..models import Category, CategoryType
+from ..utils.cache import DERIVED_DATA_TTL, TTLCache
+
+DEFAULT_USER_ID = 1
+
+# user_id -> CategoryIndex
+_category_cache = TTLCache(maxsize=256, ttl=DERIVED_DATA_TTL)
+
+
+def invalidate_category_index(user_id: Optional[int] = None) -> None:
+    """Descarta o índice em cache do usuário (ou de todos, se user_id=None)."""
+    if user_id is None:
+        _category_cache.clear()
+    else:
+        _category_cache.invalidate(user_id)
+
+
+def normalize_category_name(name: Optional[str]) -> str:
+    """Chave de comparação de nomes: sem espaços extras e sem caixa."""
+    return " ".join((name or "").split()).casefold()
+
+
+def _type_value(category_type: Union[CategoryType, str, None]) -> Optional[str]:
+    return category_type.value if isinstance(category_type, CategoryType) else category_type
+
+
+class CategoryIndex:
+    """
+    Visão somente leitura das categorias (ativas e inativas) de um usuário.
+
+    Os nós são os dicionários de ``Category.to_dict()``; os métodos que
+    devolvem listas entregam cópias, ``get``/``find`` devolvem o próprio nó
+    (não altere).
+    """
+
+    def __init__(self, user_id: int, rows: Iterable[dict]):
+        self.user_id = user_id
+        self.by_id: Dict[int, dict] = {}
+        self.by_name: Dict[str, dict] = {}
+        self._by_name_type: Dict[Tuple[str, Optional[str]], dict] = {}
+        self._children: Dict[Optional[int], List[int]] = {}
+
+        # categorias raiz têm prioridade quando o nome se repete entre níveis
+        for node in sorted(rows, key=lambda r: (r["parent_id"] is not None, r["id"])):
+            self.by_id[node["id"]] = node
+            key = normalize_category_name(node["name"])
+            self.by_name.setdefault(key, node)
+            self._by_name_type.setdefault((key, node["type"]), node)
+
+        for node in sorted(self.by_id.values(), key=lambda n: n["name"].lower()):
+            parent_id = node["parent_id"] if node["parent_id"] in self.by_id else None
+            self._children.setdefault(parent_id, []).append(node["id"])
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, category_id: Optional[int]) -> Optional[dict]:
+        return self.by_id.get(category_id)
+
+    def find(self, name: Optional[str], category_type: Union[CategoryType, str, None] = None) -> Optional[dict]:
+        """Categoria pelo nome (normalizado), opcionalmente restrita ao tipo."""
+        key = normalize_category_name(name)
+        if category_type is None:
+            return self.by_name.get(key)
+        return self._by_name_type.get((key, _type_value(category_type)))
+
+    def children(self, category_id: int, include_inactive: bool = True) -> List[dict]:
+        return [
+            dict(self.by_id[child_id])
+            for child_id in self._children.get(category_id, [])
+            if include_inactive or self.by_id[child_id]["is_active"]
+        ]
+
+    def categories(
+        self,
+        *,
+        category_type: Union[CategoryType, str, None] = None,
+        parent_id: Optional[int] = None,
+        include_inactive: bool = False,
+    ) -> List[dict]:
+        """Lista plana ordenada por nome, com os mesmos filtros da API."""
+        wanted_type = _type_value(category_type)
+        return [
+            dict(node)
+            for node in sorted(self.by_id.values(), key=lambda n: n["name"])
+            if (wanted_type is None or node["type"] == wanted_type)
+            and (parent_id is None or node["parent_id"] == parent_id)
+            and (include_inactive or node["is_active"])
+        ]
+
+    def tree(self, include_inactive: bool = False) -> List[dict]:
+        """Categorias raiz com as subcategorias aninhadas em ``children``."""
+
+        def build(parent_id: Optional[int]) -> List[dict]:
+            return [
+                dict(self.by_id[node_id], children=build(node_id))
+                for node_id in self._children.get(parent_id, [])
+                if include_inactive or self.by_id[node_id]["is_active"]
+            ]
+
+        return build(None)
+
+
+def get_category_index(
+    session_factory: Callable[[], Session],
+    user_id: Optional[int] = None,
+    session: Optional[Session] = None,
+) -> CategoryIndex:
+    """
+    Índice de categorias do usuário (padrão: usuário 1), do cache ou
+    carregado com uma consulta. Com ``session``, a consulta usa a sessão
+    do chamador e ela não é fechada.
+    """
+    user_id = DEFAULT_USER_ID if user_id is None else user_id
+
+    def load() -> CategoryIndex:
+        current = session or session_factory()
+        try:
+            rows = current.query(Category).filter(Category.user_id == user_id).all()
+            return CategoryIndex(user_id, [category.to_dict() for category in rows])
+        finally:
+            if session is None:
+                current.close()
+
+    return _category_cache.get_or_set(user_id, load)
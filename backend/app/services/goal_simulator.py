@@ -0,0 +1,204 @@
+"""
+Simulação Monte Carlo da chance de um FinancialPlan atingir a meta na data alvo.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import extract, func
+from sqlalchemy.orm import Session
+
+from ..models import (
+    FinancialPlan,
+    ImportBatch,
+    PendingTransaction,
+    ReviewStatus,
+    Transaction,
+    TransactionStatus,
+    TransactionType,
+)
+from ..utils.cache import TTLCache
+
+DEFAULT_PATHS = 5000
+MAX_PATHS = 50000
+HISTORY_MONTHS = 24
+
+# a chave inclui todos os parâmetros da simulação, então qualquer mudança
+# (saldo, meta, aporte, data alvo, histórico) gera uma entrada nova
+_simulation_cache = TTLCache(maxsize=1024, ttl=24 * 3600)
+
+
+def _month_index(value: date) -> int:
+    return value.year * 12 + (value.month - 1)
+
+
+def _simulate_plan(args: Tuple) -> Dict:
+    """
+    Simula ``paths`` trajetórias mensais de um plano.
+
+    Em cada mês o aporte efetivo é o aporte planejado limitado à sobra do mês,
+    sorteada (bootstrap) do histórico de fluxo líquido mensal do usuário. Sem
+    histórico, o aporte planejado é considerado garantido.
+
+    A simulação é vetorizada (NumPy) e roda no próprio processo da requisição:
+    mesmo com MAX_PATHS leva poucos milissegundos por plano, menos do que
+    subir processos a partir de um worker com várias threads.
+    """
+    current, goal, contribution, months, history, paths, seed = args
+    if current >= goal:
+        return {"probability": 1.0, "median_months_to_goal": 0, "final_balance": _percentiles(np.array([current]))}
+    if months <= 0:
+        return {"probability": 0.0, "median_months_to_goal": None, "final_balance": _percentiles(np.array([current]))}
+
+    rng = np.random.default_rng(seed)
+    if history:
+        samples = rng.choice(np.asarray(history, dtype=float), size=(paths, months))
+        monthly = np.clip(samples, 0.0, contribution)
+    else:
+        monthly = np.full((paths, months), contribution, dtype=float)
+
+    balances = current + np.cumsum(monthly, axis=1)
+    reached = balances >= goal
+    hit = reached[:, -1]
+    first_hit = reached.argmax(axis=1)[hit] + 1
+
+    return {
+        "probability": round(float(hit.mean()), 4),
+        "median_months_to_goal": int(np.median(first_hit)) if first_hit.size else None,
+        "final_balance": _percentiles(balances[:, -1]),
+    }
+
+
+def _percentiles(values: np.ndarray) -> Dict[str, float]:
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return {"p10": round(float(p10), 2), "p50": round(float(p50), 2), "p90": round(float(p90), 2)}
+
+
+class GoalSimulator:
+    """
+    Calcula, para cada plano ativo, a probabilidade de atingir goal_amount até
+    target_date a partir do fluxo líquido mensal histórico (transações
+    importadas revisadas + transações manuais concluídas).
+
+    Os resultados são reprodutíveis (semente por plano) e ficam em cache
+    enquanto os parâmetros de entrada não mudarem.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def simulate(
+        self,
+        *,
+        user_id: int = 1,
+        plan_id: Optional[int] = None,
+        paths: int = DEFAULT_PATHS,
+        seed: Optional[int] = None,
+        today: Optional[date] = None,
+    ) -> List[Dict]:
+        if paths < 100 or paths > MAX_PATHS:
+            raise ValueError(f"paths deve estar entre 100 e {MAX_PATHS}.")
+
+        today = today or date.today()
+        session = self.session_factory()
+        try:
+            query = session.query(FinancialPlan).filter(FinancialPlan.user_id == user_id)
+            if plan_id is not None:
+                query = query.filter(FinancialPlan.id == plan_id)
+            else:
+                query = query.filter(FinancialPlan.is_active.is_(True))
+            plans = query.order_by(FinancialPlan.id).all()
+            if not plans:
+                return []
+            history = self._monthly_net_flows(session, user_id, today)
+            plan_rows = [
+                (p.id, p.name, p.current_balance or 0.0, p.goal_amount, p.monthly_contribution or 0.0, p.target_date)
+                for p in plans
+            ]
+        finally:
+            session.close()
+
+        results: Dict[int, Dict] = {}
+        for pid, _, current, goal, contribution, target in plan_rows:
+            if target is None:
+                continue
+            months = _month_index(target) - _month_index(today)
+            args = (current, goal, contribution, months, history, paths, [seed or 0, pid])
+            key = (pid, current, goal, contribution, months, history, paths, seed)
+            results[pid] = _simulation_cache.get_or_set(key, lambda args=args: _simulate_plan(args))
+
+        items = []
+        for pid, name, current, goal, contribution, target in plan_rows:
+            item = {
+                "plan_id": pid,
+                "name": name,
+                "goal_amount": goal,
+                "current_balance": current,
+                "monthly_contribution": contribution,
+                "target_date": target.isoformat() if target else None,
+                "months_remaining": max(_month_index(target) - _month_index(today), 0) if target else None,
+                "history_months": len(history),
+                "paths": paths,
+                "probability": None,
+                "median_months_to_goal": None,
+                "final_balance": None,
+            }
+            item.update(results.get(pid, {}))
+            items.append(item)
+        return items
+
+    # --- internals ---
+    def _monthly_net_flows(self, session: Session, user_id: int, today: date) -> Tuple[float, ...]:
+        """
+        Fluxo líquido dos últimos HISTORY_MONTHS meses fechados, em ordem
+        cronológica. Meses sem movimento dentro do intervalo contam como zero.
+        """
+        first = _month_index(today) - HISTORY_MONTHS
+        last = _month_index(today) - 1
+        since = date(first // 12, first % 12 + 1, 1)
+        until = date(today.year, today.month, 1)
+        totals: Dict[int, float] = {}
+
+        imp_year = extract("year", PendingTransaction.date)
+        imp_month = extract("month", PendingTransaction.date)
+        imported = (
+            session.query(imp_year, imp_month, func.sum(PendingTransaction.amount))
+            .join(ImportBatch, ImportBatch.id == PendingTransaction.import_batch_id)
+            .filter(
+                ImportBatch.user_id == user_id,
+                PendingTransaction.review_status.in_([ReviewStatus.APPROVED, ReviewStatus.MODIFIED]),
+                PendingTransaction.date >= since,
+                PendingTransaction.date < until,
+            )
+            .group_by(imp_year, imp_month)
+        )
+
+        tx_date = func.coalesce(Transaction.effective_date, Transaction.event_date)
+        tx_year = extract("year", tx_date)
+        tx_month = extract("month", tx_date)
+        manual = (
+            session.query(tx_year, tx_month, Transaction.transaction_type, func.sum(Transaction.amount))
+            .filter(
+                Transaction.user_id == user_id,
+                Transaction.deleted_at.is_(None),
+                Transaction.status == TransactionStatus.COMPLETED,
+                tx_date >= since,
+                tx_date < until,
+            )
+            .group_by(tx_year, tx_month, Transaction.transaction_type)
+        )
+
+        for year, month, total in imported:
+            idx = int(year) * 12 + int(month) - 1
+            totals[idx] = totals.get(idx, 0.0) + (total or 0.0)
+        for year, month, tx_type, total in manual:
+            idx = int(year) * 12 + int(month) - 1
+            value = total or 0.0
+            totals[idx] = totals.get(idx, 0.0) + (value if tx_type == TransactionType.INCOME else -value)
+
+        if not totals:
+            return ()
+        start = max(min(totals), first)
+        return tuple(round(totals.get(i, 0.0), 2) for i in range(start, last + 1))
@@ -7,13 +7,15 @@ import json
 from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
-from ..importers import OFXImporter
-from ..ml import TransactionPredictor
 from ..models import ImportBatch, ImportStatus, PendingTransaction, ReviewStatus
+from .insight_context import invalidate_insight_context
+
+if TYPE_CHECKING:
+    from ..ml import TransactionPredictor
 
 
 class ImportService:
@@ -57,6 +59,8 @@ class ImportService:
         Returns:
             Dicionário contendo dados do lote e transações pendentes
         """
+        from ..importers import OFXImporter
+
         parsed_data = OFXImporter.parse_ofx_file(file_path)
         summary = OFXImporter.get_import_summary(parsed_data)
         transactions = parsed_data["transactions"]
@@ -75,12 +79,14 @@ class ImportService:
 
             session.flush()
 
-            return {
+            result = {
                 "batch": batch.to_dict(),
                 "summary": summary,
                 "pending_transactions": [p.to_dict() for p in pending],
                 "duplicates_skipped": duplicates,
             }
+        invalidate_insight_context(user_id)
+        return result
 
     def list_batches(self) -> List[Dict]:
         """
@@ -147,13 +153,18 @@ class ImportService:
             transaction.review_status = status
             transaction.reviewed_at = datetime.utcnow()
             transaction.notes = notes
-            self._update_batch_status(session, batch_id)
+            user_id = self._update_batch_status(session, batch_id)
             session.flush()
-            return transaction.to_dict()
+            result = transaction.to_dict()
+        invalidate_insight_context(user_id)
+        return result
 
-    def _update_batch_status(self, session: Session, batch_id: int) -> None:
+    def _update_batch_status(self, session: Session, batch_id: int) -> Optional[int]:
         """
         Define status do lote como COMPLETED quando todas transações foram revistas.
+
+        Returns:
+            ID do usuário dono do lote
         """
         pending_count = (
             session.query(PendingTransaction)
@@ -163,10 +174,12 @@ class ImportService:
             )
             .count()
         )
+        batch = session.get(ImportBatch, batch_id)
+        if batch is None:
+            return None
         if pending_count == 0:
-            batch = session.get(ImportBatch, batch_id)
-            if batch:
-                batch.status = ImportStatus.COMPLETED
+            batch.status = ImportStatus.COMPLETED
+        return batch.user_id
 
     def _predict_transactions(self, transactions: List[Dict]) -> List[Dict]:
         """
@@ -285,7 +298,8 @@ class ImportService:
             # Remove o lote
             session.delete(batch)
             session.flush()
-            return True
+        invalidate_insight_context(user_id)
+        return True
 
     def update_batch(self, batch_id: int, user_id: int, **kwargs) -> Optional[Dict]:
         """
@@ -336,9 +350,11 @@ class ImportService:
             if not transaction:
                 return False
 
+            user_id = transaction.import_batch.user_id
             session.delete(transaction)
             session.flush()
-            return True
+        invalidate_insight_context(user_id)
+        return True
 
     def find_duplicates(self, threshold_days: int = 3) -> List[Dict]:
         """
@@ -432,7 +448,10 @@ class ImportService:
             ).delete(synchronize_session=False)
 
             session.flush()
-            return keep_tx.to_dict()
+            user_id = keep_tx.import_batch.user_id
+            result = keep_tx.to_dict()
+        invalidate_insight_context(user_id)
+        return result
 
     @staticmethod
     def _similar_strings(str1: str, str2: str, threshold: float = 0.8) -> bool:
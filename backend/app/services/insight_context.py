@@ -0,0 +1,212 @@
+"""
+Contexto financeiro agregado por usuário para os prompts da IA.
+
+Totais por categoria, principais estabelecimentos, variação mês a mês e
+amostra recente são calculados com agregações no banco e mantidos em cache
+até a próxima importação/revisão do usuário.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from ..models import ImportBatch, PendingTransaction, ReviewStatus
+from ..utils.cache import DERIVED_DATA_TTL, TTLCache
+
+TOP_MERCHANTS = 5
+RECENT_TRANSACTIONS = 10
+UNCATEGORIZED = "Sem categoria"
+
+# user_id -> contexto
+_insight_cache = TTLCache(maxsize=512, ttl=DERIVED_DATA_TTL)
+
+
+def invalidate_insight_context(user_id: Optional[int] = None) -> None:
+    """Descarta o contexto em cache do usuário (ou de todos, se user_id=None)."""
+    if user_id is None:
+        _insight_cache.clear()
+    else:
+        _insight_cache.invalidate(user_id)
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def _previous_month(value: datetime) -> datetime:
+    return datetime(value.year - 1, 12, 1) if value.month == 1 else datetime(value.year, value.month - 1, 1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return datetime(value.year + 1, 1, 1) if value.month == 12 else datetime(value.year, value.month + 1, 1)
+
+
+class InsightContextBuilder:
+    """
+    Monta o contexto das transações revisadas (aprovadas/modificadas) de um
+    usuário. O tamanho do resultado depende do número de categorias, não do
+    número de transações.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def build(self, user_id: int) -> Dict:
+        return _insight_cache.get_or_set(user_id, lambda: self._compute(user_id))
+
+    def analysis_summary(self, user_id: int) -> Dict:
+        """Resumo no formato de OpenAIService.analyze_spending."""
+        context = self.build(user_id)
+        return {
+            **context["totals"],
+            "top_categories": [
+                {"name": c["name"], "total": abs(c["total"])}
+                for c in context["categories"] if c["total"] < 0
+            ],
+        }
+
+    def chat_context(self, user_id: int) -> Dict:
+        """Contexto no formato de OpenAIService.chat_with_context."""
+        context = self.build(user_id)
+        months = max(context["months"], 1)
+        return {
+            "current_balance": context["totals"]["balance"],
+            "monthly_income": context["totals"]["total_income"] / months,
+            "monthly_expense": context["totals"]["total_expense"] / months,
+        }
+
+    def _compute(self, user_id: int) -> Dict:
+        session = self.session_factory()
+        try:
+            category = func.coalesce(
+                PendingTransaction.user_category,
+                PendingTransaction.predicted_category,
+                UNCATEGORIZED,
+            )
+            base = (
+                session.query(PendingTransaction)
+                .join(ImportBatch, PendingTransaction.import_batch_id == ImportBatch.id)
+                .filter(
+                    ImportBatch.user_id == user_id,
+                    PendingTransaction.review_status.in_(
+                        [ReviewStatus.APPROVED, ReviewStatus.MODIFIED]
+                    ),
+                )
+            )
+
+            count, income, expense, first_date, last_date = base.with_entities(
+                func.count(PendingTransaction.id),
+                func.coalesce(func.sum(case((PendingTransaction.amount > 0, PendingTransaction.amount), else_=0.0)), 0.0),
+                func.coalesce(func.sum(case((PendingTransaction.amount < 0, PendingTransaction.amount), else_=0.0)), 0.0),
+                func.min(PendingTransaction.date),
+                func.max(PendingTransaction.date),
+            ).one()
+
+            context = {
+                "user_id": user_id,
+                "transactions": count,
+                "period": {
+                    "start": first_date.date().isoformat() if first_date else None,
+                    "end": last_date.date().isoformat() if last_date else None,
+                },
+                "months": 0,
+                "totals": {
+                    "total_income": float(income),
+                    "total_expense": abs(float(expense)),
+                    "balance": float(income) + float(expense),
+                },
+                "categories": [],
+                "top_merchants": [],
+                "month_over_month": [],
+                "recent_transactions": [],
+            }
+            if not count:
+                return context
+
+            context["months"] = (
+                (last_date.year - first_date.year) * 12 + last_date.month - first_date.month + 1
+            )
+
+            categories = (
+                base.with_entities(category, func.count(PendingTransaction.id), func.sum(PendingTransaction.amount))
+                .group_by(category)
+                .all()
+            )
+            context["categories"] = sorted(
+                ({"name": name, "count": n, "total": round(float(total), 2)} for name, n, total in categories),
+                key=lambda c: abs(c["total"]),
+                reverse=True,
+            )
+
+            merchant = func.coalesce(PendingTransaction.payee, PendingTransaction.description)
+            merchants = (
+                base.with_entities(merchant, func.count(PendingTransaction.id), func.sum(PendingTransaction.amount))
+                .filter(PendingTransaction.amount < 0)
+                .group_by(merchant)
+                .order_by(func.sum(PendingTransaction.amount).asc())
+                .limit(TOP_MERCHANTS)
+                .all()
+            )
+            context["top_merchants"] = [
+                {"name": name, "count": n, "total": round(abs(float(total)), 2)} for name, n, total in merchants
+            ]
+
+            context["month_over_month"] = self._month_over_month(base, category, _month_start(last_date))
+
+            recent = (
+                base.with_entities(
+                    PendingTransaction.date,
+                    PendingTransaction.description,
+                    PendingTransaction.amount,
+                    category,
+                )
+                .order_by(PendingTransaction.date.desc())
+                .limit(RECENT_TRANSACTIONS)
+                .all()
+            )
+            context["recent_transactions"] = [
+                {
+                    "date": tx_date.isoformat() if tx_date else None,
+                    "description": description,
+                    "amount": float(amount or 0.0),
+                    "category": name,
+                }
+                for tx_date, description, amount, name in recent
+            ]
+            return context
+        finally:
+            session.close()
+
+    @staticmethod
+    def _month_over_month(base, category, current: datetime) -> List[Dict]:
+        """Total por categoria no último mês com dados contra o mês anterior."""
+        previous = _previous_month(current)
+        is_current = PendingTransaction.date >= current
+        rows = (
+            base.with_entities(
+                category,
+                func.sum(case((is_current, PendingTransaction.amount), else_=0.0)),
+                func.sum(case((is_current, 0.0), else_=PendingTransaction.amount)),
+            )
+            .filter(PendingTransaction.date >= previous, PendingTransaction.date < _next_month(current))
+            .group_by(category)
+            .all()
+        )
+        result = []
+        for name, current_total, previous_total in rows:
+            current_total = round(float(current_total or 0.0), 2)
+            previous_total = round(float(previous_total or 0.0), 2)
+            delta = round(current_total - previous_total, 2)
+            result.append({
+                "name": name,
+                "month": current.strftime("%Y-%m"),
+                "current": current_total,
+                "previous": previous_total,
+                "delta": delta,
+                "delta_pct": round(delta / abs(previous_total) * 100, 1) if previous_total else None,
+            })
+        result.sort(key=lambda item: abs(item["delta"]), reverse=True)
+        return result
@@ -4,12 +4,27 @@ Serviço para CRUD de investimentos e proventos, além de visão de portfólio.
 from __future__ import annotations
 
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import date, datetime
 from typing import Callable, Dict, List, Optional
 
+from sqlalchemy import func, inspect
 from sqlalchemy.orm import Session
 
-from ..models import Dividend, Institution, Investment, InvestmentType
+from ..models import (
+    Dividend,
+    Institution,
+    Investment,
+    InvestmentEvent,
+    InvestmentEventType,
+    InvestmentType,
+)
+from .portfolio_analytics import PortfolioAnalytics, invalidate_portfolio_cache
+
+
+def _committed(item, attribute: str):
+    """Valor do atributo antes das alterações ainda não gravadas."""
+    history = inspect(item).attrs[attribute].history
+    return history.deleted[0] if history.deleted else getattr(item, attribute)
 
 
 def _parse_date(value: Optional[str]):
@@ -39,6 +54,56 @@ class InvestmentService:
         finally:
             session.close()
 
+    @staticmethod
+    def _record_event(
+        session: Session,
+        investment: Investment,
+        event_type: InvestmentEventType,
+        occurred_at: Optional[date] = None,
+        amount: float = 0.0,
+        value: Optional[float] = None,
+        notes: Optional[str] = None,
+    ) -> InvestmentEvent:
+        if investment.id is not None and not investment.events:
+            InvestmentService._record_opening(session, investment)
+        event = InvestmentEvent(
+            investment=investment,
+            user_id=investment.user_id,
+            event_type=event_type,
+            occurred_at=occurred_at or date.today(),
+            amount=amount,
+            value=value,
+            notes=notes,
+        )
+        session.add(event)
+        return event
+
+    @staticmethod
+    def _record_opening(session: Session, investment: Investment) -> None:
+        """
+        Posições criadas antes do histórico de eventos ganham, no primeiro
+        evento, o aporte de abertura e a marcação do valor que tinham até
+        então (valores anteriores às alterações da operação em curso).
+        """
+        invested = _committed(investment, "amount_invested") or 0.0
+        value = _committed(investment, "current_value") or 0.0
+        created_at = investment.created_at or datetime.utcnow()
+        opened_at = _committed(investment, "applied_at") or created_at.date()
+        valued_at = max(opened_at, (_committed(investment, "updated_at") or created_at).date())
+        for event_type, occurred_at, amount, current in (
+            (InvestmentEventType.CONTRIBUTION, opened_at, invested, None),
+            (InvestmentEventType.VALUATION, valued_at, 0.0, value),
+        ):
+            session.add(InvestmentEvent(
+                investment=investment,
+                user_id=investment.user_id,
+                event_type=event_type,
+                occurred_at=occurred_at,
+                amount=amount,
+                value=current,
+                notes="Saldo de abertura",
+            ))
+
     # --- Investimentos ---
     def list_investments(self, include_inactive: bool = False) -> List[dict]:
         session = self.session_factory()
@@ -108,8 +173,14 @@ class InvestmentService:
                 notes=notes,
             )
             session.add(item)
+            opened_at = applied_dt or date.today()
+            self._record_event(session, item, InvestmentEventType.CONTRIBUTION, opened_at, amount=amount_invested)
+            if item.current_value != amount_invested:
+                self._record_event(session, item, InvestmentEventType.VALUATION, opened_at, value=item.current_value)
             session.flush()
-            return item.to_dict()
+            result = item.to_dict()
+        invalidate_portfolio_cache(user_id)
+        return result
 
     def update_investment(
         self,
@@ -144,6 +215,7 @@ class InvestmentService:
                 if not inv_type:
                     raise ValueError("Tipo de investimento não encontrado.")
 
+            previous_invested, previous_value = item.amount_invested or 0, item.current_value or 0
             item.apply_updates(
                 name=name,
                 institution_id=institution_id,
@@ -157,16 +229,27 @@ class InvestmentService:
                 notes=notes,
                 is_active=is_active,
             )
+            if amount_invested is not None and amount_invested != previous_invested:
+                self._record_event(
+                    session, item, InvestmentEventType.CONTRIBUTION,
+                    amount=amount_invested - previous_invested, notes="Ajuste do valor aplicado",
+                )
+            if current_value is not None and current_value != previous_value:
+                self._record_event(session, item, InvestmentEventType.VALUATION, value=current_value)
             session.flush()
-            return item.to_dict()
+            result = item.to_dict()
+        invalidate_portfolio_cache(result["user_id"])
+        return result
 
     def delete_investment(self, investment_id: int) -> bool:
         with self._session_scope() as session:
             item = session.get(Investment, investment_id)
             if not item:
                 return False
+            user_id = item.user_id
             session.delete(item)
-            return True
+        invalidate_portfolio_cache(user_id)
+        return True
 
     # --- Dividends / proventos ---
     def add_dividend(
@@ -195,51 +278,48 @@ class InvestmentService:
                 received_at=received_dt,
             )
             session.add(dividend)
-
-            # opcional: soma no valor atual
-            inv.current_value = (inv.current_value or 0) + amount
+            self._record_event(
+                session, inv, InvestmentEventType.DIVIDEND, received_dt, amount=amount, notes=description,
+            )
+            # o provento entra no retorno como fluxo de caixa próprio
+            # (PortfolioAnalytics), sem alterar o valor atual da posição
             session.flush()
-            return dividend.to_dict()
+            result = dividend.to_dict()
+            owner_id = inv.user_id
+        invalidate_portfolio_cache(owner_id)
+        return result
 
     def delete_dividend(self, dividend_id: int) -> bool:
         with self._session_scope() as session:
             item = session.get(Dividend, dividend_id)
             if not item:
                 return False
+            user_id = item.investment.user_id if item.investment else item.user_id
+            inv = item.investment
+            if inv and item.counted_in_value:
+                # provento antigo, somado ao valor atual quando registrado
+                inv.current_value = (inv.current_value or 0) - (item.amount or 0)
+                self._record_event(
+                    session, inv, InvestmentEventType.VALUATION,
+                    value=inv.current_value, notes="Estorno de provento",
+                )
+            elif inv:
+                # o histórico é append-only: registra o estorno
+                self._record_event(
+                    session, inv, InvestmentEventType.DIVIDEND, item.received_at,
+                    amount=-(item.amount or 0), notes="Estorno de provento",
+                )
             session.delete(item)
-            return True
+        invalidate_portfolio_cache(user_id)
+        return True
 
     # --- Portfolio summary ---
-    def portfolio_summary(self) -> Dict:
-        session = self.session_factory()
-        try:
-            items = session.query(Investment).all()
-            total_invested = sum(inv.amount_invested or 0 for inv in items)
-            total_current = sum(inv.current_value or 0 for inv in items)
-            total_gain = total_current - total_invested
-            by_class = {}
-            for inv in items:
-                key = (inv.classification or "indefinido").lower()
-                by_class.setdefault(key, {"invested": 0, "current": 0})
-                by_class[key]["invested"] += inv.amount_invested or 0
-                by_class[key]["current"] += inv.current_value or 0
-
-            return {
-                "total_invested": round(total_invested, 2),
-                "total_current": round(total_current, 2),
-                "total_gain": round(total_gain, 2),
-                "by_classification": {
-                    k: {
-                        "invested": round(v["invested"], 2),
-                        "current": round(v["current"], 2),
-                        "gain": round(v["current"] - v["invested"], 2),
-                    }
-                    for k, v in by_class.items()
-                },
-                "count": len(items),
-            }
-        finally:
-            session.close()
+    def portfolio_summary(self, user_id: int = 1, include_inactive: bool = False) -> Dict:
+        """
+        Totais da carteira e por classificação, proventos, dividend yield
+        (últimos 12 meses) e XIRR (% a.a.).
+        """
+        return PortfolioAnalytics(self.session_factory).analyze(user_id, include_inactive)["summary"]
 
     def redeem(
         self,
@@ -264,33 +344,84 @@ class InvestmentService:
                 raise ValueError("amount maior que o valor atual.")
 
             inv.current_value = (inv.current_value or 0) - value
+            self._record_event(session, inv, InvestmentEventType.REDEMPTION, amount=value)
             if close_position:
                 inv.is_active = False
 
             session.flush()
-            return inv.to_dict()
+            result = inv.to_dict()
+        invalidate_portfolio_cache(result["user_id"])
+        return result
 
-    def performance(self) -> List[dict]:
-        """
-        Lista cada investimento com ganho absoluto e percentual.
-        """
+    # --- Histórico ---
+    def list_events(self, investment_id: int) -> Optional[List[dict]]:
         session = self.session_factory()
         try:
-            items = session.query(Investment).all()
-            result = []
-            for inv in items:
-                invested = inv.amount_invested or 0
-                current = inv.current_value or 0
-                gain = current - invested
-                roi = (gain / invested * 100) if invested else 0
-                data = inv.to_dict()
-                data.update(
-                    {
-                        "gain": round(gain, 2),
-                        "roi": round(roi, 2),
-                    }
-                )
-                result.append(data)
-            return result
+            if session.get(Investment, investment_id) is None:
+                return None
+            events = (
+                session.query(InvestmentEvent)
+                .filter(InvestmentEvent.investment_id == investment_id)
+                .order_by(InvestmentEvent.occurred_at, InvestmentEvent.id)
+                .all()
+            )
+            return [event.to_dict() for event in events]
         finally:
             session.close()
+
+    def record_valuation(
+        self,
+        *,
+        investment_id: int,
+        value: float,
+        valued_at: Optional[str] = None,
+    ) -> Optional[dict]:
+        """
+        Registra a marcação a mercado da posição. O valor atual só é
+        atualizado quando a data é a mais recente do histórico.
+        """
+        if value < 0:
+            raise ValueError("value não pode ser negativo.")
+        valued_dt = _parse_date(valued_at) or date.today()
+
+        with self._session_scope() as session:
+            inv = session.get(Investment, investment_id)
+            if not inv:
+                return None
+            latest = (
+                session.query(func.max(InvestmentEvent.occurred_at))
+                .filter(InvestmentEvent.investment_id == investment_id)
+                .scalar()
+            )
+            event = self._record_event(session, inv, InvestmentEventType.VALUATION, valued_dt, value=value)
+            if latest is None or valued_dt >= latest:
+                inv.current_value = value
+            session.flush()
+            result = event.to_dict()
+            owner_id = inv.user_id
+        invalidate_portfolio_cache(owner_id)
+        return result
+
+    def value_history(
+        self,
+        user_id: int = 1,
+        granularity: str = "month",
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        include_inactive: bool = True,
+    ) -> Dict:
+        """Série do valor da carteira, capital aplicado e proventos acumulados."""
+        return PortfolioAnalytics(self.session_factory).value_history(
+            user_id,
+            granularity=granularity,
+            start=_parse_date(start),
+            end=_parse_date(end),
+            include_inactive=include_inactive,
+        )
+
+    def performance(self, user_id: int = 1, include_inactive: bool = False) -> List[dict]:
+        """
+        Lista cada investimento com ganho absoluto e percentual, proventos,
+        retorno total, XIRR e dividend yield.
+        """
+        return PortfolioAnalytics(self.session_factory).analyze(user_id, include_inactive)["positions"]
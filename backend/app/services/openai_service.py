@@ -3,13 +3,37 @@ Serviço para integração com OpenAI ChatGPT.
 """
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Dict, List, Optional
-
-from openai import AsyncOpenAI, OpenAIError
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    InternalServerError,
+    OpenAIError,
+    RateLimitError,
+)
+
+from .ai_response_cache import AIResponseCache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
+# Versão de cada template de prompt; incrementar ao alterar o texto do prompt
+# invalida as respostas em cache geradas com a versão anterior.
+PROMPT_VERSIONS = {
+    "analyze_spending": "1",
+    "generate_insights": "2",
+    "create_projections": "1",
+}
+
+# erros transitórios (inclui timeout) em que a chamada é repetida
+RETRYABLE_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
 
 class OpenAIService:
     """
@@ -21,7 +45,14 @@ class OpenAIService:
         api_key: str,
         model: str = "gpt-3.5-turbo",
         max_tokens: int = 1000,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        base_url: Optional[str] = None,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+        cache: Optional[AIResponseCache] = None,
+        max_concurrency: int = 4,
+        retry_backoff: float = 0.5,
+        retry_backoff_max: float = 8.0
     ):
         """
         Inicializa o serviço OpenAI.
@@ -31,14 +62,68 @@ class OpenAIService:
             model: Modelo a usar (gpt-3.5-turbo ou gpt-4)
             max_tokens: Máximo de tokens por resposta
             temperature: Temperatura para geração (0-1)
+            base_url: URL alternativa da API (ex.: servidor local de testes)
+            timeout: Timeout por tentativa em segundos
+            max_retries: Novas tentativas em erros transitórios (conexão,
+                timeout, 429 e 5xx), com backoff exponencial e jitter
+            cache: Cache de respostas para análises, insights e projeções
+            max_concurrency: Máximo de chamadas simultâneas à API
+            retry_backoff: Espera base entre tentativas em segundos
+            retry_backoff_max: Espera máxima entre tentativas em segundos
+
+        O cliente (e seu pool de conexões) deve ser usado sempre no mesmo
+        event loop; as rotas compartilham uma instância por processo e rodam
+        as chamadas no AsyncRunner. Chamadas idênticas simultâneas a
+        análises, insights e projeções compartilham uma única requisição.
         """
         if not api_key:
             raise ValueError("OPENAI_API_KEY não configurada")
 
-        self.client = AsyncOpenAI(api_key=api_key)
+        # as novas tentativas são feitas aqui, fora da vaga de concorrência
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url or None,
+            timeout=timeout,
+            max_retries=0
+        )
         self.model = model
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.cache = cache
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        # semáforo e chamadas em andamento pertencem ao event loop em uso
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._outbound: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._metrics_lock = threading.Lock()
+        self._stream_metrics = {"streams": 0, "errors": 0, "ttft_total": 0.0, "ttft_max": 0.0}
+        self._call_metrics = {"requests": 0, "outbound": 0, "coalesced": 0, "retries": 0, "errors": 0}
+
+    def _loop_state(self) -> Tuple[asyncio.Semaphore, Dict[str, asyncio.Task]]:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._outbound = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+        return self._outbound, self._inflight
+
+    def _count(self, name: str, amount: int = 1) -> None:
+        with self._metrics_lock:
+            self._call_metrics[name] += amount
+
+    def _retry_delay(self, attempt: int, error: OpenAIError) -> float:
+        """Backoff exponencial com jitter; respeita Retry-After quando houver."""
+        delay = random.uniform(0, min(self.retry_backoff_max, self.retry_backoff * 2 ** attempt))
+        if isinstance(error, APIStatusError):
+            try:
+                retry_after = float(error.response.headers.get("retry-after", 0))
+            except (TypeError, ValueError):
+                retry_after = 0.0
+            delay = max(delay, min(retry_after, self.retry_backoff_max))
+        return delay
 
     async def _call_chatgpt(
         self,
@@ -60,22 +145,107 @@ class OpenAIService:
         Raises:
             OpenAIError: Se houver erro na API
         """
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=self.max_tokens,
-                temperature=temperature or self.temperature
+        outbound, _ = self._loop_state()
+        attempt = 0
+        while True:
+            try:
+                async with outbound:
+                    self._count("outbound")
+                    response = await self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_message}
+                        ],
+                        max_tokens=self.max_tokens,
+                        temperature=temperature or self.temperature
+                    )
+
+                return response.choices[0].message.content.strip()
+
+            except RETRYABLE_ERRORS as e:
+                if attempt >= self.max_retries:
+                    logger.error(f"Erro ao chamar OpenAI API após {attempt + 1} tentativas: {e}")
+                    self._count("errors")
+                    raise
+                delay = self._retry_delay(attempt, e)
+                logger.warning(f"Erro transitório na OpenAI API ({e}); nova tentativa em {delay:.2f}s")
+                self._count("retries")
+                attempt += 1
+                await asyncio.sleep(delay)
+            except OpenAIError as e:
+                logger.error(f"Erro ao chamar OpenAI API: {e}")
+                self._count("errors")
+                raise
+
+    async def _cached_call(
+        self,
+        template: str,
+        payload: Any,
+        system_prompt: str,
+        user_message: str,
+        temperature: Optional[float] = None
+    ) -> str:
+        """
+        Chama a API só quando não há resposta em cache para o mesmo modelo,
+        template (nome e versão) e payload normalizado.
+
+        Chamadas com a mesma chave feitas enquanto outra está em andamento
+        aguardam o resultado dela (single-flight) em vez de repetir a
+        requisição. A chamada roda em uma task própria: cancelar qualquer
+        um dos chamadores, inclusive o primeiro, não cancela os demais. O
+        payload deve conter apenas os dados que entram no prompt. O acesso
+        ao cache persistente roda fora do event loop.
+        """
+        self._count("requests")
+        key = make_cache_key(
+            self.model,
+            template,
+            PROMPT_VERSIONS[template],
+            {
+                "input": payload,
+                "temperature": temperature or self.temperature,
+                "max_tokens": self.max_tokens,
+            },
+        )
+        _, inflight = self._loop_state()
+        task = inflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+        else:
+            task = asyncio.get_running_loop().create_task(
+                self._fetch(key, template, system_prompt, user_message, temperature)
             )
+            inflight[key] = task
 
-            return response.choices[0].message.content.strip()
+            def forget(done: asyncio.Task) -> None:
+                if inflight.get(key) is done:
+                    del inflight[key]
+                # evita "exception was never retrieved" quando todos desistiram
+                if not done.cancelled():
+                    done.exception()
 
-        except OpenAIError as e:
-            logger.error(f"Erro ao chamar OpenAI API: {e}")
-            raise
+            task.add_done_callback(forget)
+        # shield: o cancelamento de quem espera não cancela a chamada compartilhada
+        return await asyncio.shield(task)
+
+    async def _fetch(
+        self,
+        key: str,
+        template: str,
+        system_prompt: str,
+        user_message: str,
+        temperature: Optional[float]
+    ) -> str:
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, key)
+            if cached is not None:
+                return cached
+
+        response = await self._call_chatgpt(system_prompt, user_message, temperature)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.set, key, response, self.model, template)
+        return response
 
     async def analyze_spending(
         self,
@@ -121,10 +291,18 @@ Resumo:
 
 Principais categorias de gastos:
 """
-        for cat in summary.get('top_categories', [])[:5]:
+        top_categories = summary.get('top_categories', [])[:5]
+        for cat in top_categories:
             user_message += f"\n- {cat['name']}: R$ {cat['total']:.2f}"
 
-        return await self._call_chatgpt(system_prompt, user_message)
+        payload = {
+            "timeframe": timeframe,
+            "total_income": summary.get('total_income', 0),
+            "total_expense": summary.get('total_expense', 0),
+            "balance": summary.get('balance', 0),
+            "top_categories": [[cat['name'], cat['total']] for cat in top_categories],
+        }
+        return await self._cached_call("analyze_spending", payload, system_prompt, user_message)
 
     async def chat_with_context(
         self,
@@ -149,6 +327,89 @@ Principais categorias de gastos:
                 "categories": {...}
             }
         """
+        system_prompt, user_message = self._chat_prompt(message, financial_data)
+        return await self._call_chatgpt(system_prompt, user_message)
+
+    async def stream_chat_with_context(
+        self,
+        message: str,
+        financial_data: Dict
+    ) -> AsyncIterator[str]:
+        """
+        Versão em streaming de chat_with_context: produz os trechos da
+        resposta à medida que o modelo os gera.
+
+        O tempo até o primeiro trecho (TTFT) é registrado em stream_metrics().
+
+        Raises:
+            OpenAIError: Se houver erro na API
+        """
+        system_prompt, user_message = self._chat_prompt(message, financial_data)
+        outbound, _ = self._loop_state()
+        started = time.perf_counter()
+        first_token = False
+        try:
+            # a vaga de concorrência fica ocupada durante todo o stream
+            async with outbound:
+                self._count("outbound")
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    max_tokens=self.max_tokens,
+                    temperature=self.temperature,
+                    stream=True
+                )
+                try:
+                    async for chunk in stream:
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if not delta:
+                            continue
+                        if not first_token:
+                            first_token = True
+                            self._record_ttft(time.perf_counter() - started)
+                        yield delta
+                finally:
+                    await stream.close()
+        except OpenAIError as e:
+            logger.error(f"Erro no streaming da OpenAI API: {e}")
+            with self._metrics_lock:
+                self._stream_metrics["errors"] += 1
+            raise
+
+    def call_metrics(self) -> Dict[str, int]:
+        """
+        Chamadas a análises/insights/projeções (requests), requisições
+        enviadas à API (outbound), chamadas atendidas por uma requisição já
+        em andamento (coalesced), novas tentativas e erros.
+        """
+        with self._metrics_lock:
+            return dict(self._call_metrics)
+
+    def stream_metrics(self) -> Dict[str, Any]:
+        """Quantidade de streams e tempo até o primeiro trecho (ms)."""
+        with self._metrics_lock:
+            data = dict(self._stream_metrics)
+        streams = data["streams"]
+        return {
+            "streams": streams,
+            "errors": data["errors"],
+            "avg_ttft_ms": round(data["ttft_total"] / streams * 1000, 1) if streams else 0.0,
+            "max_ttft_ms": round(data["ttft_max"] * 1000, 1),
+        }
+
+    def _record_ttft(self, seconds: float) -> None:
+        with self._metrics_lock:
+            self._stream_metrics["streams"] += 1
+            self._stream_metrics["ttft_total"] += seconds
+            self._stream_metrics["ttft_max"] = max(self._stream_metrics["ttft_max"], seconds)
+
+    @staticmethod
+    def _chat_prompt(message: str, financial_data: Dict) -> Tuple[str, str]:
         system_prompt = """Você é um assistente financeiro pessoal inteligente.
 Use os dados financeiros do usuário para fornecer respostas personalizadas.
 Seja claro, prático e mantenha um tom profissional mas amigável.
@@ -163,12 +424,14 @@ Contexto financeiro do usuário:
 
         user_message = f"{context_str}\n\nPergunta: {message}"
 
-        return await self._call_chatgpt(system_prompt, user_message)
+        return system_prompt, user_message
 
     async def generate_insights(
         self,
         categories: List[Dict],
-        transactions: List[Dict]
+        transactions: List[Dict],
+        merchants: Optional[List[Dict]] = None,
+        month_over_month: Optional[List[Dict]] = None
     ) -> str:
         """
         Gera insights sobre padrões de categorização.
@@ -176,6 +439,8 @@ Contexto financeiro do usuário:
         Args:
             categories: Lista de categorias com estatísticas
             transactions: Amostra de transações recentes
+            merchants: Estabelecimentos com maior gasto (opcional)
+            month_over_month: Variação por categoria contra o mês anterior (opcional)
 
         Returns:
             Insights sobre padrões de gastos
@@ -203,7 +468,30 @@ Analise as categorias e transações para identificar:
 
         user_message = categories_str + transactions_str
 
-        return await self._call_chatgpt(system_prompt, user_message)
+        merchants = (merchants or [])[:5]
+        if merchants:
+            user_message += "\nMaiores gastos por estabelecimento:\n"
+            for merchant in merchants:
+                user_message += f"- {merchant['name']}: {merchant['count']} compras, R$ {merchant['total']:.2f}\n"
+
+        month_over_month = (month_over_month or [])[:5]
+        if month_over_month:
+            user_message += f"\nVariação em {month_over_month[0]['month']} contra o mês anterior:\n"
+            for item in month_over_month:
+                user_message += f"- {item['name']}: R$ {item['previous']:.2f} -> R$ {item['current']:.2f}\n"
+
+        payload = {
+            "categories": [[cat['name'], cat['count'], cat['total']] for cat in categories[:10]],
+            "transactions": [
+                [tx['date'], tx['description'], tx['amount'], tx.get('category', 'Sem categoria')]
+                for tx in transactions[:10]
+            ],
+            "merchants": [[m['name'], m['count'], m['total']] for m in merchants],
+            "month_over_month": [
+                [item['month'], item['name'], item['previous'], item['current']] for item in month_over_month
+            ],
+        }
+        return await self._cached_call("generate_insights", payload, system_prompt, user_message)
 
     async def create_projections(
         self,
@@ -256,7 +544,16 @@ Situação atual:
 Crie um plano realista para atingir essa meta.
 """
 
-        return await self._call_chatgpt(system_prompt, user_message, temperature=0.5)
+        payload = {
+            "goals": {key: goals.get(key) for key in ("savings_target", "target_date", "purpose")},
+            "current_state": {
+                key: current_state.get(key)
+                for key in ("current_savings", "monthly_income", "monthly_expense")
+            },
+        }
+        return await self._cached_call(
+            "create_projections", payload, system_prompt, user_message, temperature=0.5
+        )
 
     async def health_check(self) -> bool:
         """
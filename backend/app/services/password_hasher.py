@@ -0,0 +1,75 @@
+"""
+Hash de senhas (bcrypt) em um pool limitado de threads.
+"""
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import bcrypt
+
+
+class PasswordHasherBusy(RuntimeError):
+    """Pool de hash saturado; a requisição deve ser recusada (HTTP 429)."""
+
+
+class PasswordHasher:
+    """
+    Executa bcrypt fora da thread da requisição, com concorrência e fila
+    limitadas.
+
+    O bcrypt libera o GIL, então threads bastam para usar vários núcleos.
+    Quando ``workers + queue_size`` operações já estão em andamento, novas
+    chamadas falham na hora com PasswordHasherBusy em vez de empilhar
+    requisições esperando CPU.
+    """
+
+    def __init__(self, rounds: int = 12, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        """
+        Args:
+            rounds: Custo (log2) usado em novos hashes
+            workers: Threads de hash (padrão: número de CPUs)
+            queue_size: Operações aguardando além das em execução (padrão: 2 × workers)
+        """
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = self.workers * 2 if queue_size is None else queue_size
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+
+    def hash(self, password: str) -> str:
+        """Gera o hash bcrypt da senha com o custo configurado."""
+        return self._submit(self._hash, password)
+
+    def verify(self, password: str, password_hash: str) -> bool:
+        """Verifica a senha contra um hash bcrypt."""
+        return self._submit(self._verify, password, password_hash)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """Indica se o hash foi gerado com um custo diferente do configurado."""
+        try:
+            # formato: $2b$<custo>$<salt+hash>
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy('Muitas requisições de autenticação simultâneas')
+        try:
+            return self._executor.submit(fn, *args).result()
+        finally:
+            self._slots.release()
+
+    def _hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+    @staticmethod
+    def _verify(password: str, password_hash: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
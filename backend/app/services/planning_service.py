@@ -4,9 +4,10 @@ Serviços de planos financeiros e projeções de receita.
 from __future__ import annotations
 
 from contextlib import contextmanager
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from typing import Callable, List, Optional
 
+from sqlalchemy import and_, extract, func
 from sqlalchemy.orm import Session
 
 from ..models import (
@@ -22,6 +23,9 @@ from ..models import (
     PlanningNote,
     ReviewStatus,
 )
+from .cashflow_service import invalidate_cashflow_cache
+from .category_index import get_category_index
+from .recurring_plan_engine import invalidate_planned_cache
 
 
 def _parse_date(value: Optional[str]) -> Optional[date]:
@@ -99,7 +103,9 @@ class PlanningService:
             )
             session.add(plan)
             session.flush()
-            return self._with_progress(plan)
+            result = self._with_progress(plan)
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def update_plan(
         self,
@@ -138,15 +144,20 @@ class PlanningService:
                 notes=notes,
             )
             session.flush()
-            return self._with_progress(plan)
+            result = self._with_progress(plan)
+            user_id = plan.user_id
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def delete_plan(self, plan_id: int) -> bool:
         with self._session_scope() as session:
             plan = session.get(FinancialPlan, plan_id)
             if not plan:
                 return False
+            user_id = plan.user_id
             session.delete(plan)
-            return True
+        invalidate_cashflow_cache(user_id)
+        return True
 
     # --- Income projections ---
     def list_income_projections(
@@ -210,7 +221,9 @@ class PlanningService:
             )
             session.add(item)
             session.flush()
-            return item.to_dict()
+            result = item.to_dict()
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def update_income_projection(
         self,
@@ -243,15 +256,20 @@ class PlanningService:
                 received=received,
             )
             session.flush()
-            return item.to_dict()
+            result = item.to_dict()
+            user_id = item.user_id
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def delete_income_projection(self, item_id: int) -> bool:
         with self._session_scope() as session:
             item = session.get(IncomeProjection, item_id)
             if not item:
                 return False
+            user_id = item.user_id
             session.delete(item)
-            return True
+        invalidate_cashflow_cache(user_id)
+        return True
 
     # --- Planning notes ---
     def list_notes(self) -> List[dict]:
@@ -287,11 +305,10 @@ class PlanningService:
             projected_income = sum(p.amount or 0 for p in projections)
 
             budgets = session.query(CategoryBudget).all()
-            categories = {c.id: c for c in session.query(Category).all()}
             expense_budget = 0.0
             for b in budgets:
-                cat = categories.get(b.category_id)
-                if cat and cat.type == CategoryType.EXPENSE:
+                cat = get_category_index(self.session_factory, b.user_id, session=session).get(b.category_id)
+                if cat and cat["type"] == CategoryType.EXPENSE.value:
                     expense_budget += b.amount or 0
 
             surplus = projected_income - expense_budget
@@ -342,15 +359,21 @@ class PlanningService:
             )
             session.add(item)
             session.flush()
-            return item.to_dict()
+            result = item.to_dict()
+        invalidate_planned_cache(user_id)
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def delete_recurring_plan(self, plan_id: int) -> bool:
         with self._session_scope() as session:
             item = session.get(CategoryRecurringPlan, plan_id)
             if not item:
                 return False
+            user_id = item.user_id
             session.delete(item)
-            return True
+        invalidate_planned_cache(user_id)
+        invalidate_cashflow_cache(user_id)
+        return True
 
     # --- helpers ---
     def _parse_projection_type(self, value: Optional[str]) -> Optional[IncomeProjectionType]:
@@ -381,13 +404,12 @@ class PlanningService:
             items = query.order_by(CategoryBudget.year.desc(), CategoryBudget.month.desc()).all()
 
             # enriquecido com nome/tipo da categoria
-            categories = {c.id: c for c in session.query(Category).all()}
             result = []
             for item in items:
-                cat = categories.get(item.category_id)
+                cat = get_category_index(self.session_factory, item.user_id, session=session).get(item.category_id)
                 payload = item.to_dict()
-                payload["category_name"] = cat.name if cat else None
-                payload["category_type"] = cat.type.value if cat and cat.type else None
+                payload["category_name"] = cat["name"] if cat else None
+                payload["category_type"] = cat["type"] if cat else None
                 result.append(payload)
             return result
         finally:
@@ -425,26 +447,30 @@ class PlanningService:
             if existing:
                 existing.amount = amount
                 session.flush()
-                return existing.to_dict()
-
-            item = CategoryBudget(
-                user_id=user_id,
-                category_id=category_id,
-                month=month,
-                year=year,
-                amount=amount,
-            )
-            session.add(item)
-            session.flush()
-            return item.to_dict()
+                result = existing.to_dict()
+            else:
+                item = CategoryBudget(
+                    user_id=user_id,
+                    category_id=category_id,
+                    month=month,
+                    year=year,
+                    amount=amount,
+                )
+                session.add(item)
+                session.flush()
+                result = item.to_dict()
+        invalidate_cashflow_cache(user_id)
+        return result
 
     def delete_category_budget(self, budget_id: int) -> bool:
         with self._session_scope() as session:
             item = session.get(CategoryBudget, budget_id)
             if not item:
                 return False
+            user_id = item.user_id
             session.delete(item)
-            return True
+        invalidate_cashflow_cache(user_id)
+        return True
 
     def budget_compliance(
         self,
@@ -452,59 +478,93 @@ class PlanningService:
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
         include_pending: bool = False,
+        user_id: Optional[int] = None,
     ) -> List[dict]:
         """
-        Retorna lista de metas vs realizado por categoria no período informado.
+        Retorna lista de metas vs realizado por categoria e mês no período informado.
+
+        Uma única consulta junta as metas (CategoryBudget) ao realizado agregado
+        por (categoria, ano, mês), de modo que cada meta mensal é comparada
+        apenas com o realizado do próprio mês. Com start/end, somente metas de
+        meses dentro da janela são retornadas.
         """
         start_dt = _parse_date(start_date)
         end_dt = _parse_date(end_date)
 
         session = self.session_factory()
         try:
-            budgets = session.query(CategoryBudget).all()
-            categories = {c.id: c for c in session.query(Category).all()}
-
-            # busca transações filtradas
-            tx_query = session.query(PendingTransaction)
+            category_name = func.trim(
+                func.coalesce(
+                    func.nullif(PendingTransaction.user_category, ""),
+                    PendingTransaction.predicted_category,
+                )
+            )
+            tx_year = extract("year", PendingTransaction.date)
+            tx_month = extract("month", PendingTransaction.date)
+
+            actuals = session.query(
+                category_name.label("name"),
+                tx_year.label("year"),
+                tx_month.label("month"),
+                func.sum(PendingTransaction.amount).label("total"),
+            )
             if start_dt:
-                tx_query = tx_query.filter(PendingTransaction.date >= start_dt)
+                actuals = actuals.filter(PendingTransaction.date >= start_dt)
             if end_dt:
-                tx_query = tx_query.filter(PendingTransaction.date <= end_dt)
+                # end inclusivo: considera o dia inteiro
+                actuals = actuals.filter(PendingTransaction.date < end_dt + timedelta(days=1))
             if not include_pending:
-                tx_query = tx_query.filter(
+                actuals = actuals.filter(
                     PendingTransaction.review_status.in_(
                         [ReviewStatus.APPROVED, ReviewStatus.MODIFIED]
                     )
                 )
-            txs = tx_query.all()
-
-            # agrega por nome de categoria para compararmos com meta
-            tx_by_name = {}
-            for tx in txs:
-                name = (tx.final_category or tx.user_category or tx.predicted_category or "").strip()
-                if not name:
-                    continue
-                if name not in tx_by_name:
-                    tx_by_name[name] = 0.0
-                tx_by_name[name] += tx.amount
+            actuals = actuals.group_by(category_name, tx_year, tx_month).subquery()
+
+            query = (
+                session.query(
+                    CategoryBudget.id,
+                    CategoryBudget.category_id,
+                    CategoryBudget.month,
+                    CategoryBudget.year,
+                    CategoryBudget.amount,
+                    Category.name,
+                    Category.type,
+                    actuals.c.total,
+                )
+                .outerjoin(Category, Category.id == CategoryBudget.category_id)
+                .outerjoin(
+                    actuals,
+                    and_(
+                        actuals.c.name == Category.name,
+                        actuals.c.year == CategoryBudget.year,
+                        actuals.c.month == CategoryBudget.month,
+                    ),
+                )
+            )
+            budget_month = CategoryBudget.year * 12 + CategoryBudget.month
+            if start_dt:
+                query = query.filter(budget_month >= start_dt.year * 12 + start_dt.month)
+            if end_dt:
+                query = query.filter(budget_month <= end_dt.year * 12 + end_dt.month)
+            if user_id is not None:
+                query = query.filter(CategoryBudget.user_id == user_id)
+
+            rows = query.order_by(CategoryBudget.year, CategoryBudget.month, Category.name).all()
 
             results = []
-            for b in budgets:
-                cat = categories.get(b.category_id)
-                cat_name = cat.name if cat else ""
-                actual_raw = tx_by_name.get(cat_name, 0.0)
+            for budget_id, category_id, month, year, target, cat_name, cat_type, actual_raw in rows:
+                actual_raw = actual_raw or 0.0
 
                 # normaliza sinal: meta sempre positiva; realizado vira positivo (abs) para despesas
-                if cat and cat.type == CategoryType.EXPENSE:
-                    actual = abs(actual_raw if actual_raw is not None else 0.0)
+                if cat_type == CategoryType.EXPENSE:
+                    actual = abs(actual_raw)
                 else:
-                    actual = actual_raw if actual_raw is not None else 0.0
+                    actual = actual_raw
 
-                target = b.amount
                 delta = target - actual
 
-                status = "ok"
-                if cat and cat.type == CategoryType.INCOME:
+                if cat_type == CategoryType.INCOME:
                     # meta de receita: precisa alcançar ou ultrapassar
                     status = "ok" if actual >= target else "alerta"
                 else:
@@ -513,12 +573,12 @@ class PlanningService:
 
                 results.append(
                     {
-                        "budget_id": b.id,
-                        "category_id": b.category_id,
-                        "category_name": cat_name,
-                        "category_type": cat.type.value if cat and cat.type else None,
-                        "month": b.month,
-                        "year": b.year,
+                        "budget_id": budget_id,
+                        "category_id": category_id,
+                        "category_name": cat_name or "",
+                        "category_type": cat_type.value if cat_type else None,
+                        "month": month,
+                        "year": year,
                         "target": target,
                         "actual": round(actual, 2),
                         "delta": round(delta, 2),
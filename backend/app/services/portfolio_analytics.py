@@ -0,0 +1,410 @@
+"""
+Analytics da carteira de investimentos: totais por posição e por
+classificação, proventos, dividend yield e taxa interna de retorno (XIRR).
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import Dividend, Investment, InvestmentEvent, InvestmentEventType
+from ..utils.cache import DERIVED_DATA_TTL, TTLCache
+
+XIRR_MAX_ITER = 100
+XIRR_TOLERANCE = 1e-9
+# abaixo disso a taxa anualizada não é significativa
+XIRR_MIN_DAYS = 1
+DIVIDEND_YIELD_DAYS = 365
+UNCLASSIFIED = "indefinido"
+HISTORY_GRANULARITIES = ("month", "day")
+MAX_HISTORY_DAYS = 20 * 366
+# ordinal de 1970-01-01 (conversão de datetime64[D] para date.toordinal)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# códigos dos tipos de evento nos arrays
+_CONTRIBUTION, _REDEMPTION, _DIVIDEND, _VALUATION = range(4)
+_EVENT_CODES = {
+    InvestmentEventType.CONTRIBUTION: _CONTRIBUTION,
+    InvestmentEventType.REDEMPTION: _REDEMPTION,
+    InvestmentEventType.DIVIDEND: _DIVIDEND,
+    InvestmentEventType.VALUATION: _VALUATION,
+}
+
+# (user_id, include_inactive, data de referência) -> análise
+_portfolio_cache = TTLCache(maxsize=256, ttl=DERIVED_DATA_TTL)
+
+
+def invalidate_portfolio_cache(user_id: Optional[int] = None) -> None:
+    """Descarta análises em cache do usuário (ou todas, se user_id=None)."""
+    if user_id is None:
+        _portfolio_cache.clear()
+    else:
+        _portfolio_cache.invalidate_where(lambda key: key[0] == user_id)
+
+
+def xirr(days: np.ndarray, amounts: np.ndarray) -> np.ndarray:
+    """
+    XIRR de várias séries de fluxos de uma vez (Newton vetorizado).
+
+    Args:
+        days: matriz (séries × fluxos) com os dias desde o primeiro fluxo
+        amounts: matriz de mesmo formato com os valores (aportes negativos,
+            retornos positivos); posições sem fluxo devem ter valor 0
+
+    Returns:
+        taxa anual por série (0.12 = 12% a.a.); NaN quando não há aporte e
+        retorno, o período é curto demais ou o método não converge
+    """
+    years = days / 365.0
+    scale = np.abs(amounts).sum(axis=1)
+    valid = (
+        (amounts < 0).any(axis=1)
+        & (amounts > 0).any(axis=1)
+        & (days.max(axis=1, initial=0) >= XIRR_MIN_DAYS)
+    )
+    rate = np.full(amounts.shape[0], 0.1)
+    active = valid.copy()
+    with np.errstate(over="ignore", invalid="ignore"):
+        for _ in range(XIRR_MAX_ITER):
+            if not active.any():
+                break
+            base = 1.0 + rate[:, None]
+            discounted = amounts * base ** -years
+            value = discounted.sum(axis=1)
+            slope = (-years * discounted / base).sum(axis=1)
+            step = np.divide(value, slope, out=np.zeros_like(value), where=active & (slope != 0))
+            new_rate = np.maximum(rate - step, -0.9999)
+            active &= np.abs(new_rate - rate) > XIRR_TOLERANCE
+            rate = new_rate
+
+        residual = np.abs((amounts * (1.0 + rate[:, None]) ** -years).sum(axis=1))
+    converged = valid & ~active & (residual <= 1e-6 * np.maximum(scale, 1.0))
+    return np.where(converged, rate, np.nan)
+
+
+def _flow_matrix(series: Sequence[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Empilha séries (dias absolutos, valores) em matrizes com zeros à direita."""
+    width = max((len(d) for d, _ in series), default=0)
+    days = np.zeros((len(series), max(width, 1)))
+    amounts = np.zeros_like(days)
+    for row, (d, a) in enumerate(series):
+        if len(d):
+            days[row, :len(d)] = d - d.min()
+            amounts[row, :len(a)] = a
+    return days, amounts
+
+
+def _history_grid(start: date, end: date, granularity: str) -> np.ndarray:
+    """Ordinais das datas da série: todos os dias, ou o fim de cada mês (o último é ``end``)."""
+    if granularity == "day":
+        return np.arange(start.toordinal(), end.toordinal() + 1, dtype=np.int64)
+    months = np.arange(np.datetime64(start, "M"), np.datetime64(end, "M") + 1)
+    month_ends = (months + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+    days = month_ends.astype(np.int64) + _EPOCH_ORDINAL
+    return np.minimum(days, end.toordinal())
+
+
+def _pct(value: float) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value) * 100, 2)
+
+
+class PortfolioAnalytics:
+    """
+    Calcula a carteira de um usuário com duas consultas (investimentos e
+    proventos) e operações vetorizadas sobre todas as posições.
+
+    Fluxos de caixa de cada posição: aporte (amount_invested) na data de
+    aplicação, proventos nas datas de recebimento e o valor atual na data
+    de referência.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def analyze(
+        self,
+        user_id: int = 1,
+        include_inactive: bool = False,
+        as_of: Optional[date] = None,
+    ) -> Dict:
+        as_of = as_of or date.today()
+        return _portfolio_cache.get_or_set(
+            (user_id, include_inactive, as_of),
+            lambda: self._compute(user_id, include_inactive, as_of),
+        )
+
+    def _compute(self, user_id: int, include_inactive: bool, as_of: date) -> Dict:
+        session = self.session_factory()
+        try:
+            query = session.query(Investment).filter(Investment.user_id == user_id)
+            if not include_inactive:
+                query = query.filter(Investment.is_active.is_(True))
+            investments: List[Investment] = query.order_by(Investment.id).all()
+            ids = [inv.id for inv in investments]
+            dividends = (
+                session.query(
+                    Dividend.investment_id, Dividend.amount, Dividend.received_at, Dividend.created_at,
+                    Dividend.counted_in_value,
+                )
+                .filter(Dividend.investment_id.in_(ids))
+                .all()
+                if ids else []
+            )
+            positions = [inv.to_dict() for inv in investments]
+        finally:
+            session.close()
+
+        count = len(positions)
+        invested = np.array([p["amount_invested"] or 0.0 for p in positions], dtype=float)
+        current = np.array([p["current_value"] or 0.0 for p in positions], dtype=float)
+        end = float(as_of.toordinal())
+        start = np.minimum(
+            np.array([(inv.applied_at or inv.created_at.date()).toordinal() for inv in investments], dtype=float),
+            end,
+        )
+
+        # proventos por posição (índice da posição, valor, dia)
+        index_of = {inv_id: i for i, inv_id in enumerate(ids)}
+        div_pos = np.array([index_of[row[0]] for row in dividends], dtype=int)
+        div_amount = np.array([row[1] or 0.0 for row in dividends], dtype=float)
+        div_day = np.array(
+            [(row[2] or row[3].date()).toordinal() for row in dividends],
+            dtype=float,
+        )
+        if div_day.size:
+            div_day = np.clip(div_day, start[div_pos], end)
+        div_total = np.bincount(div_pos, weights=div_amount, minlength=count)
+        recent = div_day > end - DIVIDEND_YIELD_DAYS
+        div_recent = np.bincount(div_pos[recent], weights=div_amount[recent], minlength=count)
+        # proventos já somados ao valor atual (counted_in_value) não entram
+        # de novo como fluxo de caixa
+        div_cash = np.where(np.array([bool(row[4]) for row in dividends], dtype=bool), 0.0, div_amount)
+        div_cash_total = np.bincount(div_pos, weights=div_cash, minlength=count)
+
+        gain = current - invested
+        total_return = gain + div_cash_total
+
+        # séries de fluxos: uma por posição, uma por classificação e a carteira
+        classes = np.array([(p["classification"] or UNCLASSIFIED).lower() for p in positions], dtype=object)
+        class_names, class_index = (
+            np.unique(classes, return_inverse=True) if count else (np.array([], dtype=object), np.array([], dtype=int))
+        )
+        order = np.argsort(div_pos, kind="stable")
+        bounds = np.searchsorted(div_pos[order], np.arange(count + 1))
+        position_flows = []
+        for i in range(count):
+            own = order[bounds[i]:bounds[i + 1]]
+            position_flows.append((
+                np.concatenate(([start[i]], div_day[own], [end])),
+                np.concatenate(([-invested[i]], div_cash[own], [current[i]])),
+            ))
+        groups = [np.flatnonzero(class_index == c) for c in range(len(class_names))]
+        groups.append(np.arange(count))
+        series = position_flows + [
+            (
+                np.concatenate([position_flows[i][0] for i in members]) if len(members) else np.array([]),
+                np.concatenate([position_flows[i][1] for i in members]) if len(members) else np.array([]),
+            )
+            for members in groups
+        ]
+        rates = xirr(*_flow_matrix(series)) if series else np.array([np.nan])
+        position_rates, class_rates, portfolio_rate = rates[:count], rates[count:-1], rates[-1]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            roi = np.where(invested > 0, gain / invested, 0.0)
+            return_pct = np.where(invested > 0, total_return / invested, np.nan)
+            dividend_yield = np.where(current > 0, div_recent / current, np.nan)
+
+        for i, data in enumerate(positions):
+            data.update(
+                gain=round(float(gain[i]), 2),
+                roi=round(float(roi[i]) * 100, 2),
+                dividends=round(float(div_total[i]), 2),
+                total_return=round(float(total_return[i]), 2),
+                total_return_pct=_pct(return_pct[i]),
+                xirr=_pct(position_rates[i]),
+                dividend_yield=_pct(dividend_yield[i]),
+            )
+
+        by_class = {}
+        for c, name in enumerate(class_names):
+            members = groups[c]
+            class_invested = float(invested[members].sum())
+            class_current = float(current[members].sum())
+            class_dividends = float(div_total[members].sum())
+            by_class[name] = {
+                "invested": round(class_invested, 2),
+                "current": round(class_current, 2),
+                "gain": round(class_current - class_invested, 2),
+                "dividends": round(class_dividends, 2),
+                "xirr": _pct(class_rates[c]),
+            }
+
+        total_invested = float(invested.sum())
+        total_current = float(current.sum())
+        total_dividends = float(div_total.sum())
+        total_cash_dividends = float(div_cash_total.sum())
+        total_recent = float(div_recent.sum())
+        total_gain = total_current - total_invested
+        summary = {
+            "total_invested": round(total_invested, 2),
+            "total_current": round(total_current, 2),
+            "total_gain": round(total_gain, 2),
+            "total_dividends": round(total_dividends, 2),
+            "total_return": round(total_gain + total_cash_dividends, 2),
+            "total_return_pct": round((total_gain + total_cash_dividends) / total_invested * 100, 2) if total_invested else None,
+            "xirr": _pct(portfolio_rate),
+            "dividend_yield": round(total_recent / total_current * 100, 2) if total_current else None,
+            "by_classification": by_class,
+            "count": count,
+            "as_of": as_of.isoformat(),
+        }
+        return {"summary": summary, "positions": positions}
+
+
+    def value_history(
+        self,
+        user_id: int = 1,
+        granularity: str = "month",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        include_inactive: bool = True,
+    ) -> Dict:
+        """
+        Valor da carteira ao longo do tempo a partir do histórico de eventos,
+        com uma consulta para todas as posições.
+
+        O valor de cada posição após cada evento é calculado de forma
+        vetorizada (marcação a mercado redefine o valor; aportes e resgates
+        somam/subtraem até a próxima marcação) e propagado para as datas da
+        série com busca binária (forward-fill). Posições sem eventos (criadas
+        antes do histórico) entram com o aporte na data de aplicação e o
+        valor atual na última atualização.
+        """
+        if granularity not in HISTORY_GRANULARITIES:
+            raise ValueError(f"granularity deve ser um de {HISTORY_GRANULARITIES}")
+        end = end or date.today()
+        key = (user_id, "history", granularity, start, end, include_inactive)
+        return _portfolio_cache.get_or_set(
+            key, lambda: self._compute_history(user_id, granularity, start, end, include_inactive)
+        )
+
+    def _compute_history(
+        self,
+        user_id: int,
+        granularity: str,
+        start: Optional[date],
+        end: date,
+        include_inactive: bool,
+    ) -> Dict:
+        session = self.session_factory()
+        try:
+            query = session.query(
+                Investment.id,
+                Investment.amount_invested,
+                Investment.current_value,
+                Investment.applied_at,
+                Investment.created_at,
+                Investment.updated_at,
+            ).filter(Investment.user_id == user_id)
+            if not include_inactive:
+                query = query.filter(Investment.is_active.is_(True))
+            investments = query.order_by(Investment.id).all()
+            ids = [row.id for row in investments]
+            events = (
+                session.query(
+                    InvestmentEvent.investment_id,
+                    InvestmentEvent.event_type,
+                    InvestmentEvent.occurred_at,
+                    InvestmentEvent.amount,
+                    InvestmentEvent.value,
+                )
+                .filter(InvestmentEvent.user_id == user_id, InvestmentEvent.investment_id.in_(ids))
+                .order_by(InvestmentEvent.investment_id, InvestmentEvent.occurred_at, InvestmentEvent.id)
+                .all()
+                if ids else []
+            )
+        finally:
+            session.close()
+
+        rows = [
+            (row.investment_id, _EVENT_CODES[row.event_type], row.occurred_at.toordinal(), row.amount or 0.0, row.value)
+            for row in events
+        ]
+        with_events = {row[0] for row in rows}
+        for inv in investments:
+            if inv.id in with_events:
+                continue
+            opened = (inv.applied_at or inv.created_at.date()).toordinal()
+            rows.append((inv.id, _CONTRIBUTION, opened, inv.amount_invested or 0.0, None))
+            rows.append((inv.id, _VALUATION, max(opened, inv.updated_at.date().toordinal()), 0.0, inv.current_value or 0.0))
+
+        result = {
+            "granularity": granularity,
+            "start": None,
+            "end": end.isoformat(),
+            "positions": len(ids),
+            "points": [],
+        }
+        if not rows:
+            return result
+
+        index_of = {inv_id: i for i, inv_id in enumerate(ids)}
+        pos = np.array([index_of[r[0]] for r in rows], dtype=np.int64)
+        kind = np.array([r[1] for r in rows], dtype=np.int8)
+        day = np.array([r[2] for r in rows], dtype=np.int64)
+        amount = np.array([r[3] for r in rows], dtype=float)
+        value = np.array([r[4] if r[4] is not None else 0.0 for r in rows], dtype=float)
+        # ordem estável por posição e data (as linhas sintéticas vêm no fim)
+        order = np.lexsort((np.arange(len(rows)), day, pos))
+        pos, kind, day, amount, value = pos[order], kind[order], day[order], amount[order], value[order]
+
+        n = len(pos)
+        idx = np.arange(n)
+        first = np.searchsorted(pos, pos, side="left")
+        flow = np.where(kind == _CONTRIBUTION, amount, np.where(kind == _REDEMPTION, -amount, 0.0))
+        paid = np.where(kind == _DIVIDEND, amount, 0.0)
+        flow_sum = np.concatenate(([0.0], np.cumsum(flow)))
+        paid_sum = np.concatenate(([0.0], np.cumsum(paid)))
+
+        # valor após cada evento: última marcação da posição + fluxos desde ela
+        last_mark = np.maximum.accumulate(np.where(kind == _VALUATION, idx, -1))
+        marked = last_mark >= first
+        ref = np.where(marked, last_mark, first - 1)
+        position_value = np.where(marked, value[np.maximum(last_mark, 0)], 0.0) + flow_sum[idx + 1] - flow_sum[ref + 1]
+        position_invested = flow_sum[idx + 1] - flow_sum[first]
+        position_paid = paid_sum[idx + 1] - paid_sum[first]
+
+        start_ordinal = start.toordinal() if start else int(day.min())
+        if start_ordinal > end.toordinal():
+            raise ValueError("start deve ser anterior a end")
+        if granularity == "day" and end.toordinal() - start_ordinal > MAX_HISTORY_DAYS:
+            raise ValueError("Período longo demais para série diária; use granularity=month")
+        grid = _history_grid(date.fromordinal(start_ordinal), end, granularity)
+
+        # forward-fill: último evento de cada posição até cada data da série
+        stride = int(grid.max()) + 1
+        event_keys = pos * stride + day
+        positions = np.arange(len(ids), dtype=np.int64)
+        lookup = np.searchsorted(event_keys, positions[:, None] * stride + grid[None, :], side="right") - 1
+        found = (lookup >= 0) & (pos[np.maximum(lookup, 0)] == positions[:, None])
+        safe = np.maximum(lookup, 0)
+
+        totals = {
+            "value": np.where(found, position_value[safe], 0.0).sum(axis=0),
+            "invested": np.where(found, position_invested[safe], 0.0).sum(axis=0),
+            "dividends": np.where(found, position_paid[safe], 0.0).sum(axis=0),
+        }
+        result["start"] = date.fromordinal(int(grid[0])).isoformat()
+        result["points"] = [
+            {
+                "date": date.fromordinal(int(grid[i])).isoformat(),
+                "value": round(float(totals["value"][i]), 2),
+                "invested": round(float(totals["invested"][i]), 2),
+                "dividends": round(float(totals["dividends"][i]), 2),
+            }
+            for i in range(len(grid))
+        ]
+        return result
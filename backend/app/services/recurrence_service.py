@@ -0,0 +1,420 @@
+"""
+Recurrence engine for manual transactions.
+
+A recurring transaction stores an RRULE-like schedule on the parent row
+(e.g. ``FREQ=MONTHLY;INTERVAL=1;COUNT=12``). Future occurrences are
+materialized as child transactions with bulk inserts over a requested
+horizon, and the horizon is extended lazily when users look further ahead,
+resuming after the last materialized date.
+Occurrences are idempotent by (parent, event_date): dates already present,
+including soft-deleted ones, are never re-created.
+"""
+from __future__ import annotations
+
+import calendar
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert, or_
+from sqlalchemy.orm import Session
+
+from ..models import Transaction, TransactionStatus
+from .cashflow_service import invalidate_cashflow_cache
+
+
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+
+# Occurrences generated and inserted per batch; longer spans run in batches
+MAX_BATCH_OCCURRENCES = 1000
+DEFAULT_HORIZON_DAYS = 365
+MAX_HORIZON_DAYS = 365 * 10
+SERIES_COMPLETE = datetime(9999, 12, 31)
+
+
+def _add_months(value: datetime, months: int, day: int) -> datetime:
+    """Shift months keeping the requested day, clamped to the month length"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    last_day = calendar.monthrange(year, month)[1]
+    return value.replace(year=year, month=month, day=min(day, last_day))
+
+
+class RecurrenceRule:
+    """
+    Parsed RRULE-like schedule.
+
+    Supported parts: FREQ (DAILY, WEEKLY, MONTHLY, YEARLY), INTERVAL,
+    COUNT, UNTIL (YYYY-MM-DD or ISO datetime) and BYMONTHDAY. Monthly and
+    yearly schedules on days missing from a month (e.g. 31) fall on the
+    last day of that month.
+    """
+
+    def __init__(
+        self,
+        freq: str,
+        interval: int = 1,
+        count: Optional[int] = None,
+        until: Optional[datetime] = None,
+        by_month_day: Optional[int] = None,
+    ):
+        freq = (freq or "").upper()
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Invalid recurrence frequency: {freq or None}")
+        if interval < 1:
+            raise ValueError("Recurrence INTERVAL must be >= 1")
+        if count is not None and count < 1:
+            raise ValueError("Recurrence COUNT must be >= 1")
+        if by_month_day is not None and not (1 <= by_month_day <= 31):
+            raise ValueError("Recurrence BYMONTHDAY must be between 1 and 31")
+
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        self.until = until
+        self.by_month_day = by_month_day
+
+    @classmethod
+    def parse(cls, value: str) -> "RecurrenceRule":
+        """Parse strings like 'FREQ=MONTHLY;INTERVAL=1;COUNT=12'"""
+        if not value or not value.strip():
+            raise ValueError("Recurrence rule is required")
+
+        text = value.strip()
+        if text.upper().startswith("RRULE:"):
+            text = text[len("RRULE:"):]
+
+        parts: Dict[str, str] = {}
+        for chunk in text.split(";"):
+            if not chunk.strip():
+                continue
+            if "=" not in chunk:
+                raise ValueError(f"Invalid recurrence rule part: {chunk}")
+            key, raw = chunk.split("=", 1)
+            parts[key.strip().upper()] = raw.strip()
+
+        unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL", "BYMONTHDAY"}
+        if unknown:
+            raise ValueError(f"Unsupported recurrence rule parts: {', '.join(sorted(unknown))}")
+
+        try:
+            interval = int(parts.get("INTERVAL", 1))
+            count = int(parts["COUNT"]) if "COUNT" in parts else None
+            by_month_day = int(parts["BYMONTHDAY"]) if "BYMONTHDAY" in parts else None
+        except ValueError:
+            raise ValueError("Recurrence INTERVAL, COUNT and BYMONTHDAY must be integers")
+
+        until = None
+        if "UNTIL" in parts:
+            until = cls._parse_until(parts["UNTIL"])
+
+        return cls(
+            freq=parts.get("FREQ", ""),
+            interval=interval,
+            count=count,
+            until=until,
+            by_month_day=by_month_day,
+        )
+
+    @staticmethod
+    def _parse_until(value: str) -> datetime:
+        for fmt in ("%Y%m%d", "%Y%m%dT%H%M%S", "%Y%m%dT%H%M%SZ"):
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+        except ValueError:
+            raise ValueError(f"Invalid recurrence UNTIL: {value}")
+
+    def to_string(self) -> str:
+        parts = [f"FREQ={self.freq}", f"INTERVAL={self.interval}"]
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            parts.append(f"UNTIL={self.until.strftime('%Y%m%d')}")
+        if self.by_month_day is not None:
+            parts.append(f"BYMONTHDAY={self.by_month_day}")
+        return ";".join(parts)
+
+    def nth_occurrence(self, start: datetime, index: int) -> datetime:
+        """Return occurrence ``index`` of the series (0 is the parent itself)"""
+        if index == 0:
+            return start
+        step = index * self.interval
+        if self.freq == "DAILY":
+            return start + timedelta(days=step)
+        if self.freq == "WEEKLY":
+            return start + timedelta(weeks=step)
+        day = self.by_month_day or start.day
+        if self.freq == "MONTHLY":
+            return _add_months(start, step, day)
+        return _add_months(start, step * 12, day)
+
+    def first_index_after(self, start: datetime, after: datetime) -> int:
+        """Index of the first occurrence strictly after ``after``"""
+        if after < start:
+            return 0
+        if self.freq == "DAILY":
+            index = (after - start).days // self.interval
+        elif self.freq == "WEEKLY":
+            index = (after - start).days // (7 * self.interval)
+        else:
+            months = (after.year - start.year) * 12 + after.month - start.month
+            index = months // (self.interval * (12 if self.freq == "YEARLY" else 1))
+        # the estimate ignores time of day and month lengths: settle it exactly
+        while index > 0 and self.nth_occurrence(start, index - 1) > after:
+            index -= 1
+        while self.nth_occurrence(start, index) <= after:
+            index += 1
+        return index
+
+    def occurrences(
+        self,
+        start: datetime,
+        horizon: datetime,
+        after: Optional[datetime] = None,
+        limit: int = MAX_BATCH_OCCURRENCES,
+    ) -> List[datetime]:
+        """
+        Up to ``limit`` occurrences after ``start`` (the parent date) up to
+        ``horizon``, honoring COUNT (which includes the parent) and UNTIL.
+        With ``after``, resumes from the first occurrence past that date.
+        """
+        end = horizon
+        if self.until is not None:
+            until = self.until
+            if until.time() == datetime.min.time():
+                until = until.replace(hour=23, minute=59, second=59)
+            end = min(end, until)
+
+        first = 1 if after is None else max(self.first_index_after(start, after), 1)
+        last = first + limit - 1
+        if self.count is not None:
+            last = min(last, self.count - 1)
+
+        result: List[datetime] = []
+        for index in range(first, last + 1):
+            occurrence = self.nth_occurrence(start, index)
+            if occurrence > end:
+                break
+            result.append(occurrence)
+        return result
+
+
+class RecurrenceService:
+    """Stores schedules on parent transactions and materializes occurrences"""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    @contextmanager
+    def _session_scope(self, user_id: Optional[int] = None):
+        """
+        Context manager for database sessions. When ``user_id`` is given,
+        the user's cached cash-flow forecast is dropped after the commit.
+        """
+        session = self.session_factory()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        if user_id is not None:
+            invalidate_cashflow_cache(user_id)
+
+    def set_rule(
+        self,
+        transaction_id: int,
+        user_id: int,
+        rule: str,
+        horizon: Optional[str] = None,
+    ) -> dict:
+        """
+        Store the schedule on the parent and materialize occurrences up to
+        ``horizon`` (defaults to one year ahead). Returns the parent and the
+        number of occurrences created.
+        """
+        parsed = RecurrenceRule.parse(rule)
+
+        with self._session_scope(user_id) as session:
+            parent = self._get_parent(session, transaction_id, user_id)
+            if parent.recurrence_parent_id is not None:
+                raise ValueError("Recurrence must be defined on the parent transaction")
+
+            parent.recurrence_rule = parsed.to_string()
+            parent.is_recurring = True
+            parent.recurrence_materialized_until = None
+
+            created = self._materialize(session, parent, parsed, self._resolve_horizon(horizon))
+            session.flush()
+            return {
+                'transaction': parent.to_dict(),
+                'created': created,
+            }
+
+    def clear_rule(self, transaction_id: int, user_id: int, remove_future: bool = False) -> dict:
+        """
+        Remove the schedule from the parent. Optionally soft-delete the
+        still-pending occurrences after today.
+        """
+        with self._session_scope(user_id) as session:
+            parent = self._get_parent(session, transaction_id, user_id)
+            parent.recurrence_rule = None
+            parent.recurrence_materialized_until = None
+
+            removed = 0
+            if remove_future:
+                removed = session.query(Transaction).filter(
+                    Transaction.recurrence_parent_id == parent.id,
+                    Transaction.deleted_at.is_(None),
+                    Transaction.status == TransactionStatus.PENDING,
+                    Transaction.event_date > datetime.utcnow(),
+                ).update({'deleted_at': datetime.utcnow()}, synchronize_session=False)
+
+            session.flush()
+            return {
+                'transaction': parent.to_dict(),
+                'removed': removed,
+            }
+
+    def materialize(self, transaction_id: int, user_id: int, horizon: Optional[str] = None) -> int:
+        """Materialize occurrences of one schedule up to ``horizon``"""
+        with self._session_scope(user_id) as session:
+            parent = self._get_parent(session, transaction_id, user_id)
+            if not parent.recurrence_rule:
+                raise ValueError(f"Transaction {transaction_id} has no recurrence rule")
+            rule = RecurrenceRule.parse(parent.recurrence_rule)
+            return self._materialize(session, parent, rule, self._resolve_horizon(horizon))
+
+    def ensure_horizon(self, user_id: int, horizon: datetime) -> int:
+        """
+        Lazily extend every schedule of the user whose materialized horizon
+        is behind ``horizon``. Cheap when nothing needs extending: one query
+        on the (few) parents carrying a rule.
+        """
+        horizon = min(horizon, datetime.utcnow() + timedelta(days=MAX_HORIZON_DAYS))
+
+        with self._session_scope() as session:
+            parents = session.query(Transaction).filter(
+                Transaction.user_id == user_id,
+                Transaction.recurrence_rule.isnot(None),
+                Transaction.deleted_at.is_(None),
+                or_(
+                    Transaction.recurrence_materialized_until.is_(None),
+                    Transaction.recurrence_materialized_until < horizon
+                )
+            ).all()
+
+            created = 0
+            for parent in parents:
+                rule = RecurrenceRule.parse(parent.recurrence_rule)
+                created += self._materialize(session, parent, rule, horizon)
+        if created:
+            invalidate_cashflow_cache(user_id)
+        return created
+
+    # --- internals ---
+
+    def _get_parent(self, session: Session, transaction_id: int, user_id: int) -> Transaction:
+        parent = session.query(Transaction).filter(
+            Transaction.id == transaction_id,
+            Transaction.user_id == user_id,
+            Transaction.deleted_at.is_(None)
+        ).first()
+        if not parent:
+            raise ValueError(f"Transaction {transaction_id} not found")
+        return parent
+
+    def _resolve_horizon(self, horizon: Optional[str]) -> datetime:
+        now = datetime.utcnow()
+        if not horizon:
+            return now + timedelta(days=DEFAULT_HORIZON_DAYS)
+        try:
+            horizon_dt = datetime.fromisoformat(horizon.replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            raise ValueError("Invalid horizon format")
+        return min(horizon_dt, now + timedelta(days=MAX_HORIZON_DAYS))
+
+    def _materialize(
+        self,
+        session: Session,
+        parent: Transaction,
+        rule: RecurrenceRule,
+        horizon: datetime,
+    ) -> int:
+        """
+        Insert missing occurrences of ``parent`` up to ``horizon``, resuming
+        after the horizon already materialized, one statement per batch of
+        MAX_BATCH_OCCURRENCES.
+        """
+        after = parent.recurrence_materialized_until
+        offset = (parent.effective_date - parent.event_date) if parent.effective_date else timedelta(0)
+        created = 0
+
+        if after is not None and after >= horizon:
+            return 0
+
+        while True:
+            dates = rule.occurrences(parent.event_date, horizon, after=after)
+            if dates:
+                created += self._insert_missing(session, parent, dates, offset)
+            if len(dates) < MAX_BATCH_OCCURRENCES:
+                break
+            after = dates[-1]
+
+        if self._series_ends_before(rule, parent, horizon):
+            # Finite series fully materialized: never look at it again
+            parent.recurrence_materialized_until = SERIES_COMPLETE
+        else:
+            parent.recurrence_materialized_until = horizon
+        return created
+
+    def _insert_missing(
+        self,
+        session: Session,
+        parent: Transaction,
+        dates: List[datetime],
+        offset: timedelta,
+    ) -> int:
+        existing = {
+            row[0]
+            for row in session.query(Transaction.event_date).filter(
+                Transaction.recurrence_parent_id == parent.id,
+                Transaction.event_date.between(dates[0], dates[-1]),
+            )
+        }
+        rows = [
+            {
+                'user_id': parent.user_id,
+                'event_date': occurrence,
+                'effective_date': occurrence + offset,
+                'transaction_type': parent.transaction_type,
+                'category_id': parent.category_id,
+                'amount': parent.amount,
+                'description': parent.description,
+                'notes': parent.notes,
+                'institution_id': parent.institution_id,
+                'credit_card_id': parent.credit_card_id,
+                'status': TransactionStatus.PENDING,
+                'is_recurring': True,
+                'recurrence_parent_id': parent.id,
+            }
+            for occurrence in dates
+            if occurrence not in existing
+        ]
+        if rows:
+            session.execute(insert(Transaction), rows)
+        return len(rows)
+
+    def _series_ends_before(self, rule: RecurrenceRule, parent: Transaction, horizon: datetime) -> bool:
+        if rule.until is not None and rule.until <= horizon:
+            return True
+        if rule.count is not None:
+            return rule.nth_occurrence(parent.event_date, rule.count - 1) <= horizon
+        return False
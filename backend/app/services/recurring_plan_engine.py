@@ -0,0 +1,140 @@
+"""
+Cálculo dos valores planejados por mês a partir das recorrências por categoria.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from ..models import CategoryRecurringPlan
+from ..utils.cache import DERIVED_DATA_TTL, TTLCache
+
+# (user_id, primeiro mês, último mês) -> {category_id: {"YYYY-MM": valor}}
+_planned_cache = TTLCache(maxsize=512, ttl=DERIVED_DATA_TTL)
+
+
+def _month_index(year: int, month: int) -> int:
+    return year * 12 + (month - 1)
+
+
+def _month_key(index: int) -> str:
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def invalidate_planned_cache(user_id: Optional[int] = None) -> None:
+    """
+    Descarta valores planejados em cache do usuário (e as entradas sem
+    filtro de usuário, que também enxergam os dados dele).
+    """
+    _planned_cache.invalidate_where(lambda key: key[0] is None or key[0] == user_id)
+
+
+class RecurringPlanEngine:
+    """
+    Expande CategoryRecurringPlan em valores mensais para uma janela de meses.
+
+    Cada recorrência cobre um intervalo contínuo de meses, então a soma por
+    mês é obtida em forma fechada (vetor de diferenças + soma acumulada),
+    considerando apenas as recorrências que intersectam a janela. O custo é
+    O(recorrências + categorias × meses), independente da idade dos planos.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self.session_factory = session_factory
+
+    def monthly_planned(
+        self,
+        months: List[Tuple[int, int]],
+        *,
+        user_id: Optional[int] = None,
+        session: Optional[Session] = None,
+    ) -> Dict[int, Dict[str, float]]:
+        """
+        Retorna {category_id: {"YYYY-MM": valor}} para os meses (ano, mês)
+        informados. Resultados ficam em cache até a próxima alteração.
+
+        Se ``session`` for informada ela é reutilizada (e não é fechada).
+        """
+        if not months:
+            return {}
+
+        indexes = [_month_index(y, m) for y, m in months]
+        first, last = min(indexes), max(indexes)
+        key = (user_id, first, last)
+
+        window = _planned_cache.get(key)
+        if window is None:
+            window = self._compute(user_id, first, last, session)
+            _planned_cache.set(key, window)
+
+        wanted = {_month_key(i) for i in indexes}
+        return {
+            category_id: {k: v for k, v in values.items() if k in wanted}
+            for category_id, values in window.items()
+        }
+
+    def _compute(
+        self,
+        user_id: Optional[int],
+        first: int,
+        last: int,
+        session: Optional[Session] = None,
+    ) -> Dict[int, Dict[str, float]]:
+        window_start = date(first // 12, first % 12 + 1, 1)
+        window_end = date(last // 12, last % 12 + 1, 1)
+        size = last - first + 1
+
+        owns_session = session is None
+        if owns_session:
+            session = self.session_factory()
+        try:
+            query = session.query(
+                CategoryRecurringPlan.category_id,
+                CategoryRecurringPlan.amount,
+                CategoryRecurringPlan.start_date,
+                CategoryRecurringPlan.end_date,
+            ).filter(
+                # só recorrências que intersectam a janela
+                CategoryRecurringPlan.start_date < self._next_month(window_end),
+                or_(
+                    CategoryRecurringPlan.end_date.is_(None),
+                    CategoryRecurringPlan.end_date >= window_start,
+                ),
+            )
+            if user_id is not None:
+                query = query.filter(CategoryRecurringPlan.user_id == user_id)
+            rows = query.all()
+        finally:
+            if owns_session:
+                session.close()
+
+        diffs: Dict[int, List[float]] = defaultdict(lambda: [0.0] * (size + 1))
+        for category_id, amount, start, end in rows:
+            lo = max(_month_index(start.year, start.month), first)
+            hi = last if end is None else min(_month_index(end.year, end.month), last)
+            if lo > hi:
+                continue
+            diff = diffs[category_id]
+            diff[lo - first] += amount or 0.0
+            diff[hi - first + 1] -= amount or 0.0
+
+        result: Dict[int, Dict[str, float]] = {}
+        for category_id, diff in diffs.items():
+            running = 0.0
+            values: Dict[str, float] = {}
+            for offset in range(size):
+                running += diff[offset]
+                if abs(running) > 1e-9:
+                    values[_month_key(first + offset)] = running
+            result[category_id] = values
+        return result
+
+    @staticmethod
+    def _next_month(value: date) -> date:
+        if value.month == 12:
+            return date(value.year + 1, 1, 1)
+        return date(value.year, value.month + 1, 1)
@@ -18,6 +18,8 @@ from ..models import (
     TransactionType,
     TransactionStatus,
 )
+from .cashflow_service import invalidate_cashflow_cache
+from .recurrence_service import RecurrenceService
 
 
 def _parse_date(value: Optional[str]) -> Optional[datetime]:
@@ -37,8 +39,11 @@ class TransactionService:
         self.session_factory = session_factory
 
     @contextmanager
-    def _session_scope(self):
-        """Context manager for database sessions"""
+    def _session_scope(self, user_id: Optional[int] = None):
+        """
+        Context manager for database sessions. When ``user_id`` is given,
+        the user's cached cash-flow forecast is dropped after the commit.
+        """
         session = self.session_factory()
         try:
             yield session
@@ -48,6 +53,8 @@ class TransactionService:
             raise
         finally:
             session.close()
+        if user_id is not None:
+            invalidate_cashflow_cache(user_id)
 
     # --- CRUD Operations ---
 
@@ -92,7 +99,7 @@ class TransactionService:
 
         effective_dt = _parse_date(effective_date) if effective_date else event_dt
 
-        with self._session_scope() as session:
+        with self._session_scope(user_id) as session:
             # Validate category exists
             category = session.get(Category, category_id)
             if not category:
@@ -164,7 +171,15 @@ class TransactionService:
         """
         List transactions with advanced filters.
         Returns dict with 'items' (list of transactions) and 'total' (count)
+
+        When end_date goes beyond the materialized horizon of recurring
+        schedules, their occurrences are materialized first.
         """
+        if end_date:
+            horizon = _parse_date(end_date)
+            if horizon:
+                RecurrenceService(self.session_factory).ensure_horizon(user_id, horizon.replace(tzinfo=None))
+
         session = self.session_factory()
         try:
             query = session.query(Transaction).filter(Transaction.user_id == user_id)
@@ -246,7 +261,7 @@ class TransactionService:
         **updates
     ) -> dict:
         """Update transaction fields"""
-        with self._session_scope() as session:
+        with self._session_scope(user_id) as session:
             transaction = session.query(Transaction).filter(
                 Transaction.id == transaction_id,
                 Transaction.user_id == user_id,
@@ -289,7 +304,7 @@ class TransactionService:
 
     def delete_transaction(self, transaction_id: int, user_id: int, soft: bool = True) -> bool:
         """Delete transaction (soft delete by default)"""
-        with self._session_scope() as session:
+        with self._session_scope(user_id) as session:
             transaction = session.query(Transaction).filter(
                 Transaction.id == transaction_id,
                 Transaction.user_id == user_id,
@@ -338,7 +353,7 @@ class TransactionService:
         except KeyError:
             raise ValueError(f"Invalid status: {status}")
 
-        with self._session_scope() as session:
+        with self._session_scope(user_id) as session:
             updated = session.query(Transaction).filter(
                 Transaction.id.in_(transaction_ids),
                 Transaction.user_id == user_id,
@@ -374,6 +389,18 @@ class TransactionService:
             if not new_event_dt:
                 raise ValueError("Invalid new_event_date format")
 
+            if link_as_recurrence:
+                # Occurrences are unique by parent + date
+                existing = session.query(Transaction).filter(
+                    Transaction.recurrence_parent_id == transaction_id,
+                    Transaction.event_date == new_event_dt
+                ).first()
+                if existing:
+                    if existing.deleted_at is not None:
+                        # Deleted by the user: never bring it back
+                        raise ValueError("Occurrence on this date was deleted")
+                    return existing.to_dict()
+
             # Create duplicate
             new_transaction = Transaction(
                 user_id=original.user_id,
@@ -397,6 +424,7 @@ class TransactionService:
 
             session.add(new_transaction)
             session.commit()
+            invalidate_cashflow_cache(user_id)
 
             return new_transaction.to_dict()
         except Exception:
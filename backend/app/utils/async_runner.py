@@ -0,0 +1,134 @@
+"""
+Event loop persistente em uma thread de fundo, para rodar corrotinas a
+partir de rotas Flask (síncronas) sem criar um loop por requisição.
+"""
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+_DONE = object()
+
+
+class AsyncRunner:
+    """
+    Mantém um único event loop por processo em uma thread daemon.
+
+    Clientes assíncronos (ex.: AsyncOpenAI/httpx) criados e usados sempre
+    neste loop podem manter o pool de conexões entre requisições. As
+    corrotinas são enviadas com run_coroutine_threadsafe e limitadas a
+    ``max_concurrency`` execuções simultâneas.
+    """
+
+    def __init__(self, max_concurrency: int = 8):
+        self.max_concurrency = max_concurrency
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Loop do processo atual (recriado após fork, ex.: gunicorn --preload)."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Executa a corrotina no loop de fundo e bloqueia até o resultado.
+
+        Raises:
+            TimeoutError: se não terminar em ``timeout`` segundos (a
+                corrotina é cancelada)
+        """
+        future = asyncio.run_coroutine_threadsafe(self._limited(coro), self.loop)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Operação assíncrona excedeu {timeout}s")
+
+    def iterate(self, agen: AsyncIterator[Any], timeout: Optional[float] = None) -> Iterator[Any]:
+        """
+        Consome um gerador assíncrono no loop de fundo e entrega os itens
+        como um gerador síncrono (ex.: para respostas em streaming do Flask).
+
+        O gerador ocupa uma vaga de concorrência até terminar. Fechar o
+        gerador síncrono (ex.: cliente desconectou) cancela o assíncrono.
+
+        Raises:
+            TimeoutError: se nenhum item chegar em ``timeout`` segundos
+        """
+        items: "queue.Queue[tuple]" = queue.Queue()
+
+        async def _pump():
+            try:
+                async for item in agen:
+                    items.put((item, None))
+            except Exception as exc:
+                items.put((_DONE, exc))
+            else:
+                items.put((_DONE, None))
+
+        future = asyncio.run_coroutine_threadsafe(self._limited(_pump()), self.loop)
+        try:
+            while True:
+                try:
+                    item, error = items.get(timeout=timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"Nenhum dado recebido em {timeout}s")
+                if item is _DONE:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            future.cancel()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = self._thread = self._semaphore = None
+
+    async def _limited(self, coro: Awaitable[Any]) -> Any:
+        async with self._semaphore:
+            return await coro
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _serve():
+            asyncio.set_event_loop(loop)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            ready.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=_serve, name="async-runner", daemon=True)
+        thread.start()
+        ready.wait()
+        self._loop, self._thread, self._pid = loop, thread, os.getpid()
+
+
+_runner: Optional[AsyncRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_async_runner(max_concurrency: int = 8) -> AsyncRunner:
+    """Runner compartilhado do processo (criado na primeira chamada)."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncRunner(max_concurrency=max_concurrency)
+            atexit.register(_runner.stop)
+        return _runner
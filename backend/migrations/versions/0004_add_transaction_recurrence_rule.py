@@ -0,0 +1,63 @@
+"""add recurrence schedule to transactions
+
+Revision ID: 0004_add_transaction_recurrence_rule
+Revises: 0003_create_transactions_table
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0004_add_transaction_recurrence_rule"
+down_revision = "0003_create_transactions_table"
+branch_labels = None
+depends_on = None
+
+
+CONSTRAINT_NAME = "uq_transaction_recurrence_occurrence"
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("transactions")}
+    constraints = {uc["name"] for uc in inspector.get_unique_constraints("transactions")}
+
+    if CONSTRAINT_NAME not in constraints:
+        # duplicate_transaction used to allow the same parent and date twice
+        duplicates = bind.execute(sa.text(
+            """
+            SELECT recurrence_parent_id, event_date, count(*) AS total
+            FROM transactions
+            WHERE recurrence_parent_id IS NOT NULL
+            GROUP BY recurrence_parent_id, event_date
+            HAVING count(*) > 1
+            """
+        )).fetchall()
+        if duplicates:
+            listed = ", ".join(
+                f"parent {row.recurrence_parent_id} on {row.event_date} x{row.total}" for row in duplicates
+            )
+            raise RuntimeError(
+                f"Duplicate recurrence occurrences must be merged before creating {CONSTRAINT_NAME}: {listed}"
+            )
+
+    with op.batch_alter_table("transactions") as batch_op:
+        if "recurrence_rule" not in columns:
+            batch_op.add_column(sa.Column("recurrence_rule", sa.String(length=255), nullable=True))
+        if "recurrence_materialized_until" not in columns:
+            batch_op.add_column(sa.Column("recurrence_materialized_until", sa.DateTime(), nullable=True))
+
+        # One occurrence per parent and date (idempotent materialization)
+        if CONSTRAINT_NAME not in constraints:
+            batch_op.create_unique_constraint(CONSTRAINT_NAME, ["recurrence_parent_id", "event_date"])
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("transactions") as batch_op:
+        batch_op.drop_constraint(CONSTRAINT_NAME, type_="unique")
+        batch_op.drop_column("recurrence_materialized_until")
+        batch_op.drop_column("recurrence_rule")
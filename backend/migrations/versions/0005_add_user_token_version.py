@@ -0,0 +1,34 @@
+"""add token version to users
+
+Revision ID: 0005_add_user_token_version
+Revises: 0004_add_transaction_recurrence_rule
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0005_add_user_token_version"
+down_revision = "0004_add_transaction_recurrence_rule"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("users")}
+
+    if "token_version" not in columns:
+        with op.batch_alter_table("users") as batch_op:
+            batch_op.add_column(
+                sa.Column("token_version", sa.Integer(), nullable=False, server_default="0")
+            )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("token_version")
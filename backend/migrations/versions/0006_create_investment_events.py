@@ -0,0 +1,106 @@
+"""create investment event history
+
+The portfolio tables (investments, dividends) predate the migrations and
+are created here only when missing. Downgrade drops only what belongs to
+the event history and deliberately leaves those two tables in place: by
+then they hold the user's positions, and dropping them would lose data
+that did not come from this revision.
+
+Revision ID: 0006_create_investment_events
+Revises: 0005_add_user_token_version
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.models.investment import InvestmentEventType
+
+# revision identifiers, used by Alembic.
+revision = "0006_create_investment_events"
+down_revision = "0005_add_user_token_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Create ENUM type if it doesn't exist
+    event_type_enum = sa.Enum(InvestmentEventType, name="investmenteventtype")
+    event_type_enum.create(op.get_bind(), checkfirst=True)
+
+    from sqlalchemy import inspect
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    tables = inspector.get_table_names()
+
+    # The portfolio tables predate the migrations; create them when missing
+    # so the event foreign key has a target
+    if "investments" not in tables:
+        op.create_table(
+            "investments",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), nullable=False, server_default="1"),
+            sa.Column("name", sa.String(length=200), nullable=False),
+            sa.Column("institution_id", sa.Integer(), sa.ForeignKey("institutions.id"), nullable=True),
+            sa.Column("investment_type_id", sa.Integer(), sa.ForeignKey("investment_types.id"), nullable=True),
+            sa.Column("classification", sa.String(length=50), nullable=True),
+            sa.Column("amount_invested", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("current_value", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("applied_at", sa.Date(), nullable=True),
+            sa.Column("maturity_date", sa.Date(), nullable=True),
+            sa.Column("profitability_rate", sa.Float(), nullable=True),
+            sa.Column("notes", sa.Text(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.sql.expression.true()),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    if "dividends" not in tables:
+        op.create_table(
+            "dividends",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("investment_id", sa.Integer(), sa.ForeignKey("investments.id"), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False, server_default="1"),
+            sa.Column("description", sa.String(length=200), nullable=True),
+            sa.Column("amount", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("received_at", sa.Date(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+            sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    if "investment_events" not in tables:
+        op.create_table(
+            "investment_events",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("investment_id", sa.Integer(), sa.ForeignKey("investments.id"), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False, server_default="1"),
+            sa.Column(
+                "event_type",
+                sa.Enum(InvestmentEventType, name="investmenteventtype", create_type=False),
+                nullable=False,
+            ),
+            sa.Column("occurred_at", sa.Date(), nullable=False),
+            sa.Column("amount", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("value", sa.Float(), nullable=True),
+            sa.Column("notes", sa.String(length=200), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        )
+
+    indexes = {index["name"] for index in inspector.get_indexes("investment_events")} if "investment_events" in tables else set()
+    if "ix_investment_events_user_id" not in indexes:
+        op.create_index("ix_investment_events_user_id", "investment_events", ["user_id"])
+    if "ix_investment_events_investment_date" not in indexes:
+        op.create_index(
+            "ix_investment_events_investment_date",
+            "investment_events",
+            ["investment_id", "occurred_at"],
+        )
+
+
+def downgrade() -> None:
+    # investments and dividends stay (see the module docstring)
+    op.drop_index("ix_investment_events_investment_date", table_name="investment_events")
+    op.drop_index("ix_investment_events_user_id", table_name="investment_events")
+    op.drop_table("investment_events")
+    sa.Enum(name="investmenteventtype").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,61 @@
+"""unique root category name per user and type
+
+Revision ID: 0007_add_category_root_unique_index
+Revises: 0006_create_investment_events
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0007_add_category_root_unique_index"
+down_revision = "0006_create_investment_events"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "uq_category_root_name_type"
+
+
+def _index_exists(bind) -> bool:
+    # expression indexes are not reflected by the SQLite inspector
+    if bind.dialect.name == "sqlite":
+        query = "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"
+    else:
+        query = "SELECT 1 FROM pg_indexes WHERE indexname = :name"
+    return bind.execute(sa.text(query), {"name": INDEX_NAME}).first() is not None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if _index_exists(bind):
+        return
+
+    duplicates = bind.execute(sa.text(
+        """
+        SELECT user_id, lower(name) AS name, type, count(*) AS total
+        FROM categories
+        WHERE parent_id IS NULL
+        GROUP BY user_id, lower(name), type
+        HAVING count(*) > 1
+        """
+    )).fetchall()
+    if duplicates:
+        listed = ", ".join(f"user {row.user_id}: {row.name} ({row.type}) x{row.total}" for row in duplicates)
+        raise RuntimeError(
+            f"Duplicate root categories must be merged before creating {INDEX_NAME}: {listed}"
+        )
+
+    op.create_index(
+        INDEX_NAME,
+        "categories",
+        ["user_id", sa.text("lower(name)"), "type"],
+        unique=True,
+        sqlite_where=sa.text("parent_id IS NULL"),
+        postgresql_where=sa.text("parent_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX_NAME, table_name="categories")
@@ -0,0 +1,40 @@
+"""flag dividends already added to the investment value
+
+Revision ID: 0008_add_dividend_counted_in_value
+Revises: 0007_add_category_root_unique_index
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0008_add_dividend_counted_in_value"
+down_revision = "0007_add_category_root_unique_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    bind = op.get_bind()
+    inspector = inspect(bind)
+    if "dividends" not in inspector.get_table_names():
+        return
+    columns = {col["name"] for col in inspector.get_columns("dividends")}
+
+    if "counted_in_value" not in columns:
+        with op.batch_alter_table("dividends") as batch_op:
+            batch_op.add_column(
+                sa.Column("counted_in_value", sa.Boolean(), nullable=False, server_default=sa.false())
+            )
+        # Dividends recorded before this column were added to the
+        # investment's current_value; analytics must not count them twice
+        dividends = sa.table("dividends", sa.column("counted_in_value", sa.Boolean()))
+        op.execute(dividends.update().values(counted_in_value=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("dividends") as batch_op:
+        batch_op.drop_column("counted_in_value")
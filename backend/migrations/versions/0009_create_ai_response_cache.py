@@ -0,0 +1,47 @@
+"""create persistent AI response cache
+
+Revision ID: 0009_create_ai_response_cache
+Revises: 0008_add_dividend_counted_in_value
+Create Date: 2026-10-19
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0009_create_ai_response_cache"
+down_revision = "0008_add_dividend_counted_in_value"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    from sqlalchemy import inspect
+    bind = op.get_bind()
+    inspector = inspect(bind)
+
+    if "ai_response_cache" not in inspector.get_table_names():
+        op.create_table(
+            "ai_response_cache",
+            sa.Column("key", sa.String(length=64), primary_key=True),
+            sa.Column("model", sa.String(length=100), nullable=False),
+            sa.Column("template", sa.String(length=100), nullable=False),
+            sa.Column("response", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.Float(), nullable=False),
+            sa.Column("expires_at", sa.Float(), nullable=False),
+            sa.Column("last_used_at", sa.Float(), nullable=False),
+            sa.Column("hits", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    indexes = {index["name"] for index in inspect(bind).get_indexes("ai_response_cache")}
+    if "ix_ai_response_cache_expires_at" not in indexes:
+        op.create_index("ix_ai_response_cache_expires_at", "ai_response_cache", ["expires_at"])
+    if "ix_ai_response_cache_last_used_at" not in indexes:
+        op.create_index("ix_ai_response_cache_last_used_at", "ai_response_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ai_response_cache_last_used_at", table_name="ai_response_cache")
+    op.drop_index("ix_ai_response_cache_expires_at", table_name="ai_response_cache")
+    op.drop_table("ai_response_cache")
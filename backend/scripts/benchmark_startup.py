@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Perfil de inicialização da aplicação (python -X importtime).
+
+Mede, num processo novo, o import de ``app`` e o ``create_app``, lista os
+módulos com maior tempo acumulado e confere se as dependências pesadas
+continuam fora do caminho de inicialização.
+
+Uso:
+    python scripts/benchmark_startup.py
+    python scripts/benchmark_startup.py --config production --top 30
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+# Referência (ms, CPython 3.11, create_app('testing')) para comparar execuções:
+# "eager" é o estado anterior, com blueprints importando ML/OpenAI/OFX e o
+# modelo deserializado no create_app; "lazy" é o estado atual.
+BASELINE_MS = {
+    "eager": {"import_app": 2660, "create_app": 126},
+    "lazy": {"import_app": 780, "create_app": 69},
+}
+
+# carregadas apenas quando a funcionalidade é usada
+HEAVY_MODULES = ("pandas", "sklearn", "scipy", "joblib", "openai", "ofxparse", "openpyxl")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app(sys.argv[1])
+created = time.perf_counter()
+print(json.dumps({
+    "import_app": (imported - started) * 1000,
+    "create_app": (created - imported) * 1000,
+    "loaded": [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+def profile(config_name: str) -> tuple[dict, list[tuple[int, int, str]]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE, config_name, *HEAVY_MODULES],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        check=True,
+    )
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "| cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return timings, modules
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Perfil de inicialização da aplicação")
+    parser.add_argument("--config", default="testing")
+    parser.add_argument("--top", type=int, default=20, help="módulos listados por tempo acumulado")
+    args = parser.parse_args()
+
+    timings, modules = profile(args.config)
+    baseline = BASELINE_MS["lazy"]
+    print(f"📊 create_app('{args.config}')")
+    for key in ("import_app", "create_app"):
+        print(f"{key:<12} {timings[key]:8.1f} ms   (referência: {baseline[key]} ms, antes: {BASELINE_MS['eager'][key]} ms)")
+
+    print(f"\nTop {args.top} por tempo acumulado:")
+    for self_us, cumulative_us, name in sorted(modules, key=lambda m: m[1], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:9.1f} ms  {self_us / 1000:7.1f} ms  {name}")
+
+    if timings["loaded"]:
+        print(f"\n⚠️  Dependências pesadas carregadas na inicialização: {', '.join(timings['loaded'])}")
+        sys.exit(1)
+    print("\n✅ Nenhuma dependência pesada carregada na inicialização")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do endpoint /api/auth/login.
+
+Dispara logins concorrentes contra um servidor em execução e reporta
+vazão, latência (p50/p95/p99) e quantas requisições foram recusadas com
+429 pelo pool de hash de senhas.
+
+Uso:
+    python scripts/load_test_login.py --url http://localhost:8000 \\
+        --email user@example.com --password senha123 --requests 200 --concurrency 32
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+def login_once(url: str, email: str, password: str, timeout: float):
+    """
+    Executa um login e retorna (status_http, latência_em_segundos).
+    """
+    body = json.dumps({'email': email, 'password': password}).encode('utf-8')
+    req = urllib.request.Request(
+        f'{url.rstrip("/")}/api/auth/login',
+        data=body,
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except (urllib.error.URLError, TimeoutError):
+        status = 0
+    return status, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga de /api/auth/login')
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--timeout', type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"🚀 {args.requests} logins, {args.concurrency} concorrentes → {args.url}")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda _: login_once(args.url, args.email, args.password, args.timeout),
+            range(args.requests),
+        ))
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in results)
+    ok = np.array([latency for status, latency in results if status == 200]) * 1000
+    print(f"⏱️  Tempo total: {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+    print(f"📊 Status: {dict(sorted(statuses.items()))}")
+    if ok.size:
+        p50, p95, p99 = np.percentile(ok, [50, 95, 99])
+        print(f"✅ Latência (200): p50={p50:.0f}ms p95={p95:.0f}ms p99={p99:.0f}ms max={ok.max():.0f}ms")
+    if statuses.get(429):
+        print(f"⚠️  {statuses[429]} requisições recusadas por saturação do pool de hash (429)")
+
+
+if __name__ == '__main__':
+    main()
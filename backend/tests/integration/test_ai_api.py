@@ -0,0 +1,337 @@
+"""
+Testes de integração dos endpoints de IA contra um servidor OpenAI local.
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from datetime import datetime
+
+from app import create_app
+from app.database import get_engine, get_session, remove_session
+from app.models import Base, ImportBatch, PendingTransaction, ReviewStatus
+from app.services.insight_context import invalidate_insight_context
+from app.utils.async_runner import AsyncRunner
+
+
+STREAM_CHUNKS = ["Resposta ", "de ", "teste"]
+STREAM_DELAY = 0.1
+
+
+class _StubOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, para medir o reuso de conexões
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        server = self.server
+        with server.lock:
+            server.requests.append({"client": self.client_address, "body": body})
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+            failing = server.failures > 0
+            server.failures -= failing
+        try:
+            time.sleep(server.delay)
+            if failing:
+                return self._send_json(500, {"error": {"message": "falha simulada", "type": "server_error"}})
+            if body.get("stream"):
+                return self._stream(body)
+            self._reply(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _reply(self, body):
+        self._send_json(200, {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "Resposta de teste"},
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        })
+
+    def _send_json(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, body):
+        """Resposta em SSE (chunked), com um atraso entre os trechos."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for text in STREAM_CHUNKS:
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            time.sleep(STREAM_DELAY)
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def stub_openai():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubOpenAIHandler)
+    server.requests = []
+    server.lock = threading.Lock()
+    server.active = server.peak = server.failures = 0
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def app(stub_openai):
+    app = create_app("testing")
+    app.config.update(
+        OPENAI_API_KEY="test-key",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{stub_openai.server_port}/v1",
+        AI_RETRY_BACKOFF=0.01,
+    )
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    yield app
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+    invalidate_insight_context()
+
+
+def test_chat_reuses_client_and_connection(app, client, stub_openai):
+    for question in ("Como economizar?", "E investir?"):
+        resp = client.post("/api/ai/chat", json={"message": question, "context": {}})
+        assert resp.status_code == 200
+        assert resp.get_json()["response"] == "Resposta de teste"
+
+    assert len(stub_openai.requests) == 2
+    # um único cliente compartilhado, no mesmo loop: a conexão é reaproveitada
+    assert len({r["client"] for r in stub_openai.requests}) == 1
+    assert app.extensions["ai_service"] is not None
+
+
+def test_insights_use_the_user_context(app, client, stub_openai):
+    session = get_session()
+    for user_id, description in ((1, "Padaria"), (2, "Cinema")):
+        batch = ImportBatch(user_id=user_id, filename="extrato.ofx")
+        session.add(batch)
+        session.flush()
+        session.add(PendingTransaction(
+            import_batch_id=batch.id,
+            fitid=description,
+            date=datetime(2025, 10, 1),
+            description=description,
+            amount=-42.0,
+            transaction_type="debito",
+            predicted_category="Geral",
+            review_status=ReviewStatus.APPROVED,
+        ))
+    session.commit()
+
+    resp = client.get("/api/ai/insights?user_id=2")
+
+    assert resp.status_code == 200
+    assert resp.get_json()["analyzed_transactions"] == 1
+    prompt = stub_openai.requests[0]["body"]["messages"][1]["content"]
+    assert "Cinema" in prompt and "Padaria" not in prompt
+    assert "Maiores gastos por estabelecimento" in prompt
+
+
+def _read_events(resp):
+    """Lê os eventos SSE da resposta, com o instante de chegada de cada um."""
+    events, buffer = [], ""
+    for chunk in resp.response:
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while "\n\n" in buffer:
+            raw, buffer = buffer.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in raw.splitlines())
+            events.append((fields.get("event", "message"), json.loads(fields["data"]), time.perf_counter()))
+    return events
+
+
+def test_chat_streams_deltas_and_records_ttft(app, client, stub_openai):
+    started = time.perf_counter()
+    resp = client.post("/api/ai/chat?stream=1", json={"message": "Como economizar?"})
+
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    events = _read_events(resp)
+
+    deltas = [data["delta"] for kind, data, _ in events if kind == "message"]
+    assert "".join(deltas) == "Resposta de teste"
+    assert len(deltas) == len(STREAM_CHUNKS)
+    assert events[-1][0] == "done"
+    # o primeiro trecho chega antes de a geração terminar
+    first_at, last_at = events[0][2] - started, events[-1][2] - started
+    assert first_at < last_at - STREAM_DELAY
+    assert stub_openai.requests[0]["body"]["stream"] is True
+
+    stream = client.get("/api/ai/metrics").get_json()["chat_stream"]
+    assert stream["streams"] == 1
+    assert 0 < stream["avg_ttft_ms"] < last_at * 1000
+
+
+def test_runner_limits_concurrency_on_a_single_loop():
+    runner = AsyncRunner(max_concurrency=2)
+    state = {"running": 0, "peak": 0, "loops": set()}
+
+    async def job():
+        state["loops"].add(id(asyncio.get_running_loop()))
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.05)
+        state["running"] -= 1
+        return True
+
+    try:
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            results = list(pool.map(lambda _: runner.run(job(), timeout=5), range(6)))
+        with pytest.raises(TimeoutError):
+            runner.run(asyncio.sleep(1), timeout=0.05)
+    finally:
+        runner.stop()
+
+    assert results == [True] * 6
+    assert state["peak"] == 2
+    assert len(state["loops"]) == 1
+
+
+def test_analyses_are_cached_across_restarts(app, client, stub_openai, tmp_path):
+    app.config["AI_CACHE_URL"] = f"sqlite:///{tmp_path / 'ai_cache.db'}"
+    summary = {
+        "total_income": 5000.0,
+        "total_expense": 4200.0,
+        "balance": 800.0,
+        "top_categories": [{"name": "Alimentação", "total": 1200.0}],
+    }
+    # mesmo conteúdo com ordem de chaves e precisão diferentes
+    equivalent = {
+        "top_categories": [{"total": 1200.001, "name": " Alimentação"}],
+        "balance": 800,
+        "total_expense": 4200.0,
+        "total_income": 5000.0,
+    }
+
+    first = client.post("/api/ai/analyze", json={"summary": summary})
+    second = client.post("/api/ai/analyze", json={"summary": equivalent})
+    assert first.get_json()["analysis"] == second.get_json()["analysis"] == "Resposta de teste"
+    assert len(stub_openai.requests) == 1
+
+    # novo processo: o cache em memória se perde, o persistido não
+    app.extensions.pop("ai_service")
+    assert client.post("/api/ai/analyze", json={"summary": summary}).status_code == 200
+    assert len(stub_openai.requests) == 1
+
+    client.post("/api/ai/analyze", json={"summary": summary, "timeframe": "last_year"})
+    assert len(stub_openai.requests) == 2
+
+    stats = client.get("/api/ai/cache").get_json()
+    assert stats["disk_hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["stored_entries"] == 2
+
+
+def _post_concurrently(app, path, payloads):
+    def post(payload):
+        return app.test_client().post(path, json=payload)
+
+    with ThreadPoolExecutor(max_workers=len(payloads)) as pool:
+        return list(pool.map(post, payloads))
+
+
+def test_identical_concurrent_analyses_share_one_call(app, stub_openai):
+    stub_openai.delay = 0.3
+    payload = {"summary": {"total_income": 100.0, "total_expense": 50.0, "balance": 50.0}}
+
+    responses = _post_concurrently(app, "/api/ai/analyze", [payload] * 5)
+
+    assert [r.status_code for r in responses] == [200] * 5
+    assert len(stub_openai.requests) == 1
+    calls = app.test_client().get("/api/ai/metrics").get_json()["calls"]
+    assert calls["requests"] == 5
+    assert calls["outbound"] == 1
+    assert calls["coalesced"] >= 1
+
+
+def test_cancelling_the_first_caller_keeps_the_shared_call(stub_openai):
+    from app.services.openai_service import OpenAIService
+
+    stub_openai.delay = 0.3
+    service = OpenAIService(api_key="test-key", base_url=f"http://127.0.0.1:{stub_openai.server_port}/v1")
+    summary = {"total_income": 100.0, "total_expense": 50.0, "balance": 50.0}
+
+    async def scenario():
+        leader = asyncio.create_task(service.analyze_spending(summary))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(service.analyze_spending(summary))
+        await asyncio.sleep(0.05)
+        leader.cancel()
+        return await follower, leader.cancelled()
+
+    response, leader_cancelled = asyncio.run(scenario())
+
+    assert leader_cancelled
+    assert response == "Resposta de teste"
+    assert len(stub_openai.requests) == 1
+    assert service.call_metrics()["coalesced"] == 1
+
+
+def test_outbound_calls_are_bounded_and_retried(app, stub_openai):
+    app.config["AI_MAX_OUTBOUND"] = 2
+    stub_openai.delay = 0.1
+    payloads = [
+        {"summary": {"total_income": float(i), "total_expense": 0.0, "balance": float(i)}}
+        for i in range(6)
+    ]
+
+    responses = _post_concurrently(app, "/api/ai/analyze", payloads)
+
+    assert [r.status_code for r in responses] == [200] * 6
+    assert len(stub_openai.requests) == 6
+    assert stub_openai.peak == 2
+
+    # dois erros 5xx seguidos: a terceira tentativa responde
+    stub_openai.delay = 0.0
+    stub_openai.failures = 2
+    resp = app.test_client().post("/api/ai/projections", json={
+        "goals": {"savings_target": 1000.0},
+        "current_state": {"monthly_income": 100.0, "monthly_expense": 50.0},
+    })
+    assert resp.status_code == 200
+    assert len(stub_openai.requests) == 9
+    assert app.test_client().get("/api/ai/metrics").get_json()["calls"]["retries"] == 2
+
+    stub_openai.failures = 3
+    resp = app.test_client().post("/api/ai/projections", json={
+        "goals": {"savings_target": 2000.0},
+        "current_state": {"monthly_income": 100.0, "monthly_expense": 50.0},
+    })
+    assert resp.status_code == 503
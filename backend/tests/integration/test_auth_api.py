@@ -118,6 +118,23 @@ class TestLoginEndpoint:
         })
         assert resp.status_code == 400
 
+    def test_login_returns_429_when_hasher_is_saturated(self, app, client, registered_user):
+        hasher = app.extensions['auth_service'].password_hasher
+        capacity = hasher.workers + hasher.queue_size
+        for _ in range(capacity):
+            hasher._slots.acquire()
+        try:
+            resp = client.post('/api/auth/login', json={
+                'email': 'teste@example.com',
+                'password': 'senha123'
+            })
+        finally:
+            for _ in range(capacity):
+                hasher._slots.release()
+
+        assert resp.status_code == 429
+        assert resp.headers['Retry-After'] == '1'
+
 
 class TestChangePasswordEndpoint:
     def test_change_password_success(self, client, auth_headers):
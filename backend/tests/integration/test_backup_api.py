@@ -0,0 +1,165 @@
+"""
+Testes de integração dos endpoints de backup e exportação.
+"""
+import io
+import json
+import os
+import zipfile
+from datetime import datetime
+
+import pytest
+
+from app import create_app
+from app.database import get_engine, get_session, remove_session
+from app.models import Base, Category, CategoryType, Institution, Transaction, TransactionType
+from app.services.backup_service import BackupService
+from app.services.category_index import invalidate_category_index
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = create_app("testing")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    yield app
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+    invalidate_category_index()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+def _register(client, email):
+    resp = client.post('/api/auth/register', json={
+        'email': email,
+        'password': 'senha123',
+        'full_name': 'Usuário Backup'
+    })
+    data = resp.get_json()
+    return data['user']['id'], {'Authorization': f'Bearer {data["access_token"]}'}
+
+
+@pytest.fixture()
+def owner(client):
+    user_id, headers = _register(client, 'backup@example.com')
+    session = get_session()
+    food = Category(user_id=user_id, name="Alimentação", type=CategoryType.EXPENSE)
+    bank = Institution(user_id=user_id, name="Banco", account_type="corrente")
+    session.add_all([food, bank])
+    session.flush()
+    for day in range(1, 4):
+        session.add(Transaction(
+            user_id=user_id,
+            event_date=datetime(2025, 1, day),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=food.id,
+            institution_id=bank.id,
+            amount=10.0 * day,
+            description=f"Mercado {day}",
+        ))
+    session.commit()
+    remove_session()
+    return user_id, headers
+
+
+def _counts(user_id):
+    try:
+        return BackupService(get_session).count_backup_rows(user_id)
+    finally:
+        remove_session()
+
+
+def test_snapshot_export_validate_and_import_round_trip(client, owner):
+    owner_id, headers = owner
+
+    resp = client.get('/api/backup/export/snapshot', headers=headers)
+    assert resp.status_code == 200
+    assert resp.headers['Content-Disposition'].endswith('.ffsnap')
+    snapshot = resp.data
+    assert zipfile.is_zipfile(io.BytesIO(snapshot))
+
+    resp = client.post(
+        '/api/backup/validate',
+        data={'file': (io.BytesIO(snapshot), 'backup.ffsnap')},
+        headers=headers,
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()['valid'] is True
+
+    target_id, target_headers = _register(client, 'destino@example.com')
+    resp = client.post(
+        '/api/backup/import',
+        data={'file': (io.BytesIO(snapshot), 'backup.ffsnap')},
+        headers=target_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()['statistics']['transactions'] == 3
+    assert _counts(target_id) == _counts(owner_id)
+
+    resp = client.post(
+        '/api/backup/validate',
+        data={'file': (io.BytesIO(b'{not json'), 'backup.json')},
+        headers=headers,
+    )
+    assert resp.get_json() == {'valid': False, 'errors': ['Invalid JSON format']}
+
+
+def test_chain_restores_base_snapshot_plus_delta(client, owner):
+    owner_id, headers = owner
+    snapshot = client.get('/api/backup/export/snapshot', headers=headers).data
+    with zipfile.ZipFile(io.BytesIO(snapshot)) as archive:
+        manifest = json.loads(archive.read('manifest.json'))
+    watermark = datetime.fromisoformat(manifest['metadata']['watermark'])
+
+    session = get_session()
+    first = session.query(Transaction).filter_by(user_id=owner_id).order_by(Transaction.id).first()
+    first.amount = 15.0
+    session.commit()
+    remove_session()
+    try:
+        delta = json.loads(json.dumps(BackupService(get_session).export_full_backup(owner_id, since=watermark)))
+    finally:
+        remove_session()
+
+    target_id, target_headers = _register(client, 'destino@example.com')
+    resp = client.post(
+        '/api/backup/import/chain',
+        data={
+            'base': (io.BytesIO(snapshot), 'base.ffsnap'),
+            'deltas': [(io.BytesIO(json.dumps(delta).encode()), 'delta.json')],
+        },
+        headers=target_headers,
+    )
+
+    assert resp.status_code == 200
+    assert resp.get_json()['success'] is True
+    session = get_session()
+    amounts = sorted(t.amount for t in session.query(Transaction).filter_by(user_id=target_id))
+    assert amounts == [15.0, 20.0, 30.0]
+
+    resp = client.post('/api/backup/import/chain', data={}, headers=target_headers)
+    assert resp.status_code == 400
+
+
+def test_csv_export_removes_temp_file_after_response(client, owner, monkeypatch):
+    _, headers = owner
+    created = []
+    export = BackupService.export_to_csv_zip_file
+
+    def tracked(self, user_id):
+        created.append(export(self, user_id))
+        return created[-1]
+
+    monkeypatch.setattr(BackupService, 'export_to_csv_zip_file', tracked)
+
+    resp = client.get('/api/backup/export/csv', headers=headers)
+
+    assert resp.status_code == 200
+    assert resp.headers['Content-Disposition'].endswith('.zip')
+    with zipfile.ZipFile(io.BytesIO(resp.data)) as archive:
+        assert 'transactions.csv' in archive.namelist()
+    resp.close()
+    assert created and not os.path.exists(created[0])
@@ -3,6 +3,7 @@ import pytest
 from app import create_app
 from app.database import get_engine, remove_session
 from app.models import Base
+from app.services.category_index import invalidate_category_index
 
 
 @pytest.fixture(scope="function")
@@ -13,6 +14,7 @@ def app():
     yield app
     Base.metadata.drop_all(bind=engine)
     remove_session()
+    invalidate_category_index()
 
 
 @pytest.fixture()
@@ -5,6 +5,7 @@ import pytest
 from app import create_app
 from app.database import get_engine, remove_session
 from app.models import Base, PendingTransaction, ReviewStatus
+from app.services.category_index import invalidate_category_index
 
 
 @pytest.fixture(scope="function")
@@ -15,6 +16,7 @@ def app():
     yield app
     Base.metadata.drop_all(bind=engine)
     remove_session()
+    invalidate_category_index()
 
 
 @pytest.fixture()
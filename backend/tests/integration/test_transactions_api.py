@@ -0,0 +1,131 @@
+"""
+Testes de integração dos endpoints de recorrência de transações.
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import create_app
+from app.database import get_engine, get_session, remove_session
+from app.models import Base, Category, CategoryType, Transaction, TransactionType
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = create_app("testing")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    yield app
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+
+
+@pytest.fixture()
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture()
+def registered_user(client):
+    resp = client.post('/api/auth/register', json={
+        'email': 'recorrencia@example.com',
+        'password': 'senha123',
+        'full_name': 'Usuário Recorrência'
+    })
+    return resp.get_json()
+
+
+@pytest.fixture()
+def auth_headers(registered_user):
+    return {'Authorization': f'Bearer {registered_user["access_token"]}'}
+
+
+@pytest.fixture()
+def parent_id(registered_user):
+    user_id = registered_user['user']['id']
+    session = get_session()
+    category = Category(user_id=user_id, name="Aluguel", type=CategoryType.EXPENSE)
+    session.add(category)
+    session.flush()
+    start = datetime.utcnow().replace(microsecond=0)
+    parent = Transaction(
+        user_id=user_id,
+        event_date=start,
+        effective_date=start,
+        transaction_type=TransactionType.EXPENSE,
+        category_id=category.id,
+        amount=1500.0,
+        description="Aluguel",
+    )
+    session.add(parent)
+    session.commit()
+    transaction_id = parent.id
+    remove_session()
+    return transaction_id
+
+
+def _occurrences(parent_id):
+    session = get_session()
+    try:
+        return session.query(Transaction).filter(
+            Transaction.recurrence_parent_id == parent_id,
+            Transaction.deleted_at.is_(None),
+        ).count()
+    finally:
+        remove_session()
+
+
+def test_recurrence_routes_require_token(client, parent_id):
+    resp = client.put(f'/api/transactions/{parent_id}/recurrence', json={'rule': 'FREQ=MONTHLY'})
+    assert resp.status_code == 401
+
+
+def test_set_materialize_and_clear_recurrence(client, auth_headers, parent_id):
+    horizon = (datetime.utcnow() + timedelta(days=95)).isoformat()
+    resp = client.put(
+        f'/api/transactions/{parent_id}/recurrence',
+        json={'rule': 'FREQ=MONTHLY', 'horizon': horizon},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data['created'] == 3
+    assert data['transaction']['recurrence_rule'] == 'FREQ=MONTHLY;INTERVAL=1'
+
+    horizon = (datetime.utcnow() + timedelta(days=190)).isoformat()
+    resp = client.post(
+        f'/api/transactions/{parent_id}/recurrence/materialize',
+        json={'horizon': horizon},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.get_json() == {'created': 3}
+    assert _occurrences(parent_id) == 6
+
+    resp = client.delete(
+        f'/api/transactions/{parent_id}/recurrence?remove_future=true',
+        headers=auth_headers,
+    )
+    assert resp.status_code == 200
+    assert resp.get_json()['removed'] == 6
+    assert resp.get_json()['transaction']['recurrence_rule'] is None
+    assert _occurrences(parent_id) == 0
+
+
+def test_recurrence_errors(client, auth_headers, parent_id):
+    resp = client.put(f'/api/transactions/{parent_id}/recurrence', json={}, headers=auth_headers)
+    assert resp.status_code == 400
+
+    resp = client.put(
+        f'/api/transactions/{parent_id}/recurrence',
+        json={'rule': 'FREQ=HOURLY'},
+        headers=auth_headers,
+    )
+    assert resp.status_code == 400
+
+    # sem regra gravada
+    resp = client.post(f'/api/transactions/{parent_id}/recurrence/materialize', headers=auth_headers)
+    assert resp.status_code == 400
+
+    resp = client.delete('/api/transactions/999/recurrence', headers=auth_headers)
+    assert resp.status_code == 404
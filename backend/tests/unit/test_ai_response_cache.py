@@ -0,0 +1,47 @@
+from app.services.ai_response_cache import AIResponseCache, make_cache_key
+
+
+def _url(tmp_path):
+    return f"sqlite:///{tmp_path / 'ai_cache.db'}"
+
+
+def test_key_depends_on_model_template_version_and_normalized_payload():
+    key = make_cache_key("gpt-4", "analyze_spending", "1", {"a": 1.0, "b": "x"})
+
+    assert key == make_cache_key("gpt-4", "analyze_spending", "1", {"b": " x ", "a": 1.001})
+    assert key != make_cache_key("gpt-4", "analyze_spending", "2", {"a": 1.0, "b": "x"})
+    assert key != make_cache_key("gpt-4o", "analyze_spending", "1", {"a": 1.0, "b": "x"})
+    assert key != make_cache_key("gpt-4", "analyze_spending", "1", {"a": 1.01, "b": "x"})
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = AIResponseCache(_url(tmp_path), ttl=-1, create_table=True)
+    cache.set("k", "resposta", model="m", template="t")
+
+    assert AIResponseCache(_url(tmp_path)).get("k") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = AIResponseCache(_url(tmp_path), max_entries=2, create_table=True)
+    cache.set("a", "A", model="m", template="t")
+    cache.set("b", "B", model="m", template="t")
+    # outro worker lê "a", que passa a ser a mais recente
+    assert AIResponseCache(_url(tmp_path)).get("a") == "A"
+    cache.set("c", "C", model="m", template="t")
+
+    restarted = AIResponseCache(_url(tmp_path))
+    assert restarted.get("b") is None
+    assert restarted.get("a") == "A"
+    assert restarted.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+    assert restarted.stats()["hit_rate"] == round(2 / 3, 4)
+
+
+def test_table_is_only_created_when_requested(tmp_path):
+    # no banco da aplicação a tabela vem da migração
+    cache = AIResponseCache(_url(tmp_path))
+    cache.set("k", "resposta", model="m", template="t")
+
+    assert AIResponseCache(_url(tmp_path)).get("k") is None
+    assert cache.stats()["errors"] == 1
+    assert cache.get("k") == "resposta"  # a memória continua servindo
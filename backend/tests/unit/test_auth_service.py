@@ -1,12 +1,17 @@
 """
 Testes unitários para o AuthService.
 """
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from app import create_app
 from app.database import get_engine, get_session, remove_session
 from app.models import Base, User
 from app.services import AuthService
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
 
 
 @pytest.fixture(scope="function")
@@ -214,3 +219,82 @@ class TestTokens:
             )
             assert success is True
             assert new_token is not None
+
+
+class TestUserCache:
+    def test_second_lookup_is_served_from_cache(self, app, auth_service, sample_user):
+        with app.app_context():
+            _, login_data, _ = auth_service.login('teste@example.com', 'senha123')
+            token = login_data['access_token']
+
+            first = auth_service.get_user_from_token(token)
+            second = auth_service.get_user_from_token(token)
+
+            assert first[0] is True and second[0] is True
+            assert second[1].email == 'teste@example.com'
+            assert second[1].to_dict() == first[1].to_dict()
+            metrics = auth_service.auth_metrics()
+            assert metrics['outcomes']['db_lookup']['count'] == 1
+            assert metrics['outcomes']['cache_hit']['count'] == 1
+            assert metrics['user_cache']['hits'] == 1
+
+    def test_change_password_revokes_cached_token(self, app, auth_service, sample_user):
+        with app.app_context():
+            _, login_data, _ = auth_service.login('teste@example.com', 'senha123')
+            token = login_data['access_token']
+            assert auth_service.get_user_from_token(token)[0] is True
+
+            auth_service.change_password(
+                user_id=sample_user.id,
+                current_password='senha123',
+                new_password='nova_senha456'
+            )
+
+            success, _, error = auth_service.get_user_from_token(token)
+            assert success is False
+            assert 'revogado' in error
+            refreshed, _, _ = auth_service.refresh_access_token(login_data['refresh_token'])
+            assert refreshed is False
+
+            _, new_login, _ = auth_service.login('teste@example.com', 'nova_senha456')
+            assert auth_service.get_user_from_token(new_login['access_token'])[0] is True
+
+    def test_deactivate_user_invalidates_cache(self, app, auth_service, sample_user):
+        with app.app_context():
+            _, login_data, _ = auth_service.login('teste@example.com', 'senha123')
+            token = login_data['access_token']
+            assert auth_service.get_user_from_token(token)[0] is True
+
+            success, _ = auth_service.deactivate_user(sample_user.id)
+
+            assert success is True
+            assert auth_service.get_user_from_token(token)[0] is False
+            assert len(auth_service._user_cache) == 0
+
+
+class TestPasswordHasher:
+    def test_login_rehashes_when_cost_changes(self, app, auth_service, sample_user):
+        with app.app_context():
+            assert sample_user.password_hash.startswith('$2b$12$')
+
+            success, user, _ = auth_service.authenticate_user('teste@example.com', 'senha123')
+
+            assert success is True
+            assert user.password_hash.startswith(f'$2b${auth_service.password_hasher.rounds:02d}$')
+            assert auth_service.authenticate_user('teste@example.com', 'senha123')[0] is True
+
+    def test_saturated_pool_rejects_instead_of_queueing(self):
+        hasher = PasswordHasher(rounds=4, workers=1, queue_size=1)
+        release = threading.Event()
+        hasher._hash = lambda password: release.wait(5) and 'hash'
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pending = [pool.submit(hasher.hash, 'senha123') for _ in range(2)]
+            while hasher._slots._value:
+                time.sleep(0.01)
+            with pytest.raises(PasswordHasherBusy):
+                hasher.hash('senha123')
+            release.set()
+            assert [f.result() for f in pending] == ['hash', 'hash']
+
+        assert hasher.verify('senha123', PasswordHasher(rounds=4).hash('senha123')) is True
@@ -0,0 +1,452 @@
+import csv
+import io
+import json
+import os
+import zipfile
+from datetime import date, datetime
+
+import pytest
+
+from app.database import get_engine, init_engine, remove_session
+from app.models import (
+    Base,
+    Category,
+    CategoryBudget,
+    CategoryRecurringPlan,
+    CategoryType,
+    CreditCard,
+    Dividend,
+    FinancialPlan,
+    ImportBatch,
+    IncomeProjection,
+    Institution,
+    Investment,
+    PendingTransaction,
+    PlanningNote,
+    Transaction,
+    TransactionType,
+)
+from app.services.backup_service import BACKUP_ENTITIES, BackupService
+
+
+@pytest.fixture(scope="function")
+def session():
+    init_engine("sqlite:///:memory:")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    from app.database import get_session
+
+    yield get_session()
+
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+
+
+def _seed(session):
+    food = Category(user_id=1, name="Alimentação", type=CategoryType.EXPENSE)
+    other_user = Category(user_id=2, name="Outro", type=CategoryType.EXPENSE)
+    bank = Institution(user_id=1, name="Banco", account_type="corrente")
+    session.add_all([food, other_user, bank])
+    session.flush()
+    for day in range(1, 4):
+        session.add(
+            Transaction(
+                user_id=1,
+                event_date=datetime(2025, 1, day),
+                transaction_type=TransactionType.EXPENSE,
+                category_id=food.id,
+                institution_id=bank.id,
+                amount=10.0 * day,
+                description=f"Mercado {day}",
+            )
+        )
+    session.add(
+        Transaction(
+            user_id=1,
+            event_date=datetime(2025, 1, 9),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=food.id,
+            amount=99.0,
+            description="Removida",
+            deleted_at=datetime(2025, 1, 10),
+        )
+    )
+    batch = ImportBatch(user_id=1, filename="extrato.ofx", file_path="/tmp/extrato.ofx")
+    session.add(batch)
+    session.flush()
+    session.add(
+        PendingTransaction(
+            import_batch_id=batch.id,
+            fitid="1",
+            date=datetime(2025, 1, 5),
+            description="Padaria",
+            amount=-12.5,
+            transaction_type="debito",
+        )
+    )
+    session.commit()
+
+
+def test_streamed_json_matches_in_memory_export(session):
+    _seed(session)
+    service = BackupService(lambda: session)
+
+    streamed = json.loads("".join(service.stream_json_backup(1)))
+    full = service.export_full_backup(1)
+
+    assert streamed["data"] == full["data"]
+    assert list(streamed["data"]) == [name for name, _, _ in BACKUP_ENTITIES]
+    assert streamed["metadata"]["statistics"] == full["metadata"]["statistics"]
+    assert streamed["metadata"]["format"] == "flow_forecaster_backup"
+    assert [c["name"] for c in streamed["data"]["categories"]] == ["Alimentação"]
+    assert [t["description"] for t in streamed["data"]["transactions"]] == ["Mercado 1", "Mercado 2", "Mercado 3"]
+    assert streamed["data"]["transactions"][0]["event_date"] == "2025-01-01T00:00:00"
+    assert streamed["data"]["pending_transactions"][0]["amount"] == -12.5
+
+
+def test_ndjson_stream_and_counts(session):
+    _seed(session)
+    service = BackupService(lambda: session)
+
+    lines = [json.loads(line) for line in "".join(service.stream_json_backup(1, ndjson=True)).splitlines()]
+    counts = service.count_backup_rows(1)
+
+    assert lines[0]["metadata"]["statistics"] == counts
+    assert counts["transactions"] == 3
+    assert counts["pending_transactions"] == 1
+    assert counts["categories"] == 1
+    assert len(lines) - 1 == sum(counts.values())
+    assert {line["entity"] for line in lines[1:]} == {name for name, n in counts.items() if n}
+
+
+def test_empty_user_streams_valid_json(session):
+    streamed = json.loads("".join(BackupService(lambda: session).stream_json_backup(42)))
+
+    assert all(rows == [] for rows in streamed["data"].values())
+    assert set(streamed["metadata"]["statistics"].values()) == {0}
+
+
+def test_excel_export_writes_one_sheet_per_entity(session):
+    openpyxl = pytest.importorskip("openpyxl")
+    _seed(session)
+    path = BackupService(lambda: session).export_to_excel_file(1)
+    try:
+        wb = openpyxl.load_workbook(path, read_only=True)
+        assert "categories" in wb.sheetnames
+        assert "credit_cards" not in wb.sheetnames  # entidades vazias são omitidas
+        rows = list(wb["transactions"].values)
+        assert rows[0][:2] == ("id", "event_date")
+        assert [r[8] for r in rows[1:]] == ["Mercado 1", "Mercado 2", "Mercado 3"]
+        wb.close()
+    finally:
+        os.remove(path)
+
+
+def test_csv_zip_export(session):
+    _seed(session)
+    path = BackupService(lambda: session).export_to_csv_zip_file(1)
+    try:
+        with zipfile.ZipFile(path) as archive:
+            assert set(archive.namelist()) == {f"{name}.csv" for name, _, _ in BACKUP_ENTITIES}
+            reader = csv.DictReader(io.TextIOWrapper(archive.open("transactions.csv"), encoding="utf-8"))
+            rows = list(reader)
+    finally:
+        os.remove(path)
+
+    assert [r["description"] for r in rows] == ["Mercado 1", "Mercado 2", "Mercado 3"]
+    assert rows[0]["amount"] == "10.0"
+
+
+def _seed_full(session):
+    parent = Category(user_id=1, name="Casa", type=CategoryType.EXPENSE)
+    session.add(parent)
+    session.flush()
+    child = Category(user_id=1, name="Aluguel", type=CategoryType.EXPENSE, parent_id=parent.id)
+    bank = Institution(user_id=1, name="Banco", account_type="corrente", current_balance=500.0)
+    session.add_all([child, bank])
+    session.flush()
+    card = CreditCard(user_id=1, institution_id=bank.id, name="Visa")
+    session.add(card)
+    session.flush()
+    rent = Transaction(
+        user_id=1,
+        event_date=datetime(2025, 1, 5),
+        transaction_type=TransactionType.EXPENSE,
+        category_id=child.id,
+        institution_id=bank.id,
+        credit_card_id=card.id,
+        amount=1500.0,
+        description="Aluguel",
+        recurrence_rule="FREQ=MONTHLY;INTERVAL=1",
+    )
+    session.add(rent)
+    session.flush()
+    session.add(
+        Transaction(
+            user_id=1,
+            event_date=datetime(2025, 2, 5),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=child.id,
+            amount=1500.0,
+            description="Aluguel",
+            recurrence_parent_id=rent.id,
+        )
+    )
+    batch = ImportBatch(user_id=1, filename="extrato.ofx")
+    investment = Investment(user_id=1, name="CDB", institution_id=bank.id, amount_invested=1000.0, current_value=1100.0)
+    session.add_all([batch, investment])
+    session.flush()
+    session.add_all(
+        [
+            PendingTransaction(
+                import_batch_id=batch.id,
+                fitid="abc",
+                date=datetime(2025, 1, 7),
+                description="Padaria",
+                amount=-8.0,
+                transaction_type="debito",
+            ),
+            Dividend(user_id=1, investment_id=investment.id, amount=12.0, received_at=date(2025, 1, 31)),
+            FinancialPlan(user_id=1, name="Reserva", goal_amount=10000.0, institution_id=bank.id),
+            IncomeProjection(user_id=1, description="Salário", amount=5000.0, expected_date=date(2025, 2, 1)),
+            CategoryBudget(user_id=1, category_id=child.id, month=2, year=2025, amount=1600.0),
+            CategoryRecurringPlan(user_id=1, category_id=child.id, amount=1500.0, start_date=date(2025, 1, 1)),
+            PlanningNote(user_id=1, content="Revisar aluguel"),
+        ]
+    )
+    session.commit()
+
+
+def test_restore_remaps_ids_and_is_idempotent(session):
+    _seed_full(session)
+    service = BackupService(lambda: session)
+    backup = json.loads(json.dumps(service.export_full_backup(1)))
+
+    stats = service.import_full_backup(2, backup)
+
+    assert stats["errors"] == []
+    for name, rows in backup["data"].items():
+        assert stats[name] == len(rows), name
+    assert stats["rows_per_second"] > 0
+
+    restored = service.export_full_backup(2)["data"]
+    categories = {c["id"]: c for c in restored["categories"]}
+    casa = next(c for c in restored["categories"] if c["name"] == "Casa")
+    aluguel = next(c for c in restored["categories"] if c["name"] == "Aluguel")
+    assert casa["id"] not in {c["id"] for c in backup["data"]["categories"]}
+    assert aluguel["parent_id"] == casa["id"]
+
+    bank_id = restored["institutions"][0]["id"]
+    parent_tx, child_tx = restored["transactions"]
+    assert categories[parent_tx["category_id"]]["name"] == "Aluguel"
+    assert parent_tx["institution_id"] == bank_id
+    assert parent_tx["credit_card_id"] == restored["credit_cards"][0]["id"]
+    assert child_tx["recurrence_parent_id"] == parent_tx["id"]
+    assert restored["credit_cards"][0]["institution_id"] == bank_id
+    assert restored["pending_transactions"][0]["import_batch_id"] == restored["import_batches"][0]["id"]
+    assert restored["dividends"][0]["investment_id"] == restored["investments"][0]["id"]
+    assert restored["category_budgets"][0]["category_id"] == aluguel["id"]
+    assert restored["financial_plans"][0]["institution_id"] == bank_id
+
+    again = service.import_full_backup(2, backup)
+    assert all(again[name] == 0 for name in backup["data"])
+    assert again["skipped"]["transactions"] == 2
+    assert service.count_backup_rows(2) == service.count_backup_rows(1)
+
+
+def test_restore_keeps_identical_rows(session):
+    food = Category(user_id=1, name="Alimentação", type=CategoryType.EXPENSE)
+    session.add(food)
+    session.flush()
+    for _ in range(2):
+        session.add(Transaction(
+            user_id=1,
+            event_date=datetime(2025, 1, 3),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=food.id,
+            amount=10.0,
+            description="Café",
+        ))
+    investment = Investment(user_id=1, name="FII", amount_invested=100.0, current_value=100.0)
+    session.add(investment)
+    session.flush()
+    session.add_all([
+        Dividend(investment_id=investment.id, amount=5.0, received_at=date(2025, 1, 15)) for _ in range(2)
+    ])
+    session.commit()
+    service = BackupService(lambda: session)
+    backup = json.loads(json.dumps(service.export_full_backup(1)))
+
+    stats = service.import_full_backup(2, backup)
+
+    assert stats["transactions"] == 2 and stats["dividends"] == 2
+    assert service.count_backup_rows(2) == service.count_backup_rows(1)
+
+    # restaurar de novo casa cada linha com uma existente, sem duplicar
+    again = service.import_full_backup(2, backup)
+    assert again["transactions"] == 0 and again["skipped"]["transactions"] == 2
+    assert service.count_backup_rows(2)["transactions"] == 2
+
+
+def test_restore_reports_rows_with_missing_required_parent(session):
+    service = BackupService(lambda: session)
+    backup = {
+        "metadata": {"format": "flow_forecaster_backup", "version": "1.0"},
+        "data": {
+            "transactions": [
+                {
+                    "id": 7,
+                    "event_date": "2025-01-01T00:00:00",
+                    "transaction_type": "expense",
+                    "category_id": 99,
+                    "amount": 10.0,
+                    "description": "Sem categoria",
+                    "status": "pending",
+                }
+            ]
+        },
+    }
+
+    stats = service.import_full_backup(1, backup)
+
+    assert stats["transactions"] == 0
+    assert stats["errors"] == ["transactions 7: category_id 99 not found in backup"]
+
+
+def test_restore_marks_dividends_from_older_backups(session):
+    service = BackupService(lambda: session)
+    backup = {
+        "metadata": {"format": "flow_forecaster_backup", "version": "1.0"},
+        "data": {
+            "investments": [{"id": 1, "name": "FII", "amount_invested": 100.0, "current_value": 105.0}],
+            "dividends": [
+                {"id": 1, "investment_id": 1, "amount": 5.0, "received_at": "2025-01-15"},
+                {"id": 2, "investment_id": 1, "amount": 3.0, "received_at": "2025-02-15", "counted_in_value": False},
+            ],
+        },
+    }
+
+    service.import_full_backup(1, backup)
+
+    # sem o campo, o provento já estava somado ao valor atual
+    flags = [d.counted_in_value for d in session.query(Dividend).order_by(Dividend.amount)]
+    assert flags == [False, True]
+
+
+def test_snapshot_round_trip_matches_json_backup(session):
+    _seed_full(session)
+    service = BackupService(lambda: session)
+    path = service.export_snapshot_file(1)
+    try:
+        with open(path, "rb") as handle:
+            snapshot = service.read_snapshot(handle)
+        with open(path, "rb") as handle:
+            report = service.validate_snapshot(handle)
+    finally:
+        os.remove(path)
+
+    backup = json.loads(json.dumps(service.export_full_backup(1)))
+    assert snapshot["data"] == backup["data"]
+    assert snapshot["metadata"]["statistics"] == backup["metadata"]["statistics"]
+    assert snapshot["metadata"]["format"] == "flow_forecaster_backup"
+    assert report["valid"] is True
+    assert report["warnings"] == []
+    assert report["snapshot_version"] == 1
+
+    from_snapshot = service.import_full_backup(2, snapshot)
+    assert from_snapshot["errors"] == []
+    assert service.count_backup_rows(2) == service.count_backup_rows(1)
+
+
+def test_snapshot_is_smaller_and_validation_flags_corruption(session):
+    _seed(session)
+    category_id = session.query(Category.id).filter_by(user_id=1).scalar()
+    session.add_all(
+        Transaction(
+            user_id=1,
+            event_date=datetime(2024, 1, 1 + i % 28),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=category_id,
+            amount=float(i),
+            description=f"Compra {i}",
+        )
+        for i in range(500)
+    )
+    session.commit()
+    service = BackupService(lambda: session)
+    path = service.export_snapshot_file(1)
+    try:
+        json_size = len("".join(service.stream_json_backup(1)).encode("utf-8"))
+        assert os.path.getsize(path) * 3 < json_size
+
+        corrupted = io.BytesIO()
+        with zipfile.ZipFile(path) as source, zipfile.ZipFile(corrupted, "w") as target:
+            for item in source.namelist():
+                content = source.read(item)
+                if item == "transactions.ndjson":
+                    content += b'["short"]\n{not json\n'
+                target.writestr(item, content)
+    finally:
+        os.remove(path)
+
+    corrupted.seek(0)
+    report = service.validate_snapshot(corrupted)
+    assert report["valid"] is False
+    assert report["errors"] == [
+        "transactions: line 504 has wrong number of fields",
+        "transactions: invalid JSON at line 505",
+    ]
+    assert report["warnings"] == ["transactions: expected 503 items, found 505"]
+
+
+def test_incremental_backup_chain_restores_changes_and_tombstones(session):
+    _seed_full(session)
+    service = BackupService(lambda: session)
+    base = json.loads(json.dumps(service.export_full_backup(1)))
+    watermark = datetime.fromisoformat(base["metadata"]["watermark"])
+
+    rent, occurrence = session.query(Transaction).filter_by(user_id=1).order_by(Transaction.id).all()
+    rent.amount = 1700.0
+    occurrence.deleted_at = datetime.utcnow()
+    session.add(
+        Transaction(
+            user_id=1,
+            event_date=datetime(2025, 3, 5),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=rent.category_id,
+            amount=50.0,
+            description="Condomínio",
+        )
+    )
+    session.commit()
+    deleted_id = occurrence.id
+
+    delta = json.loads(json.dumps(service.export_full_backup(1, since=watermark)))
+    assert delta["metadata"]["backup_type"] == "incremental"
+    assert delta["metadata"]["statistics"]["categories"] == 0
+    assert [t["description"] for t in delta["data"]["transactions"]] == ["Aluguel", "Condomínio"]
+    assert delta["tombstones"] == {"transactions": [deleted_id]}
+    streamed = json.loads("".join(service.stream_json_backup(1, since=watermark)))
+    assert streamed["data"] == delta["data"]
+    assert streamed["tombstones"] == delta["tombstones"]
+
+    stats = service.restore_backup_chain(2, base, [delta])
+
+    assert stats["errors"] == []
+    assert stats["updated"] == {"transactions": 1}
+    assert stats["deleted"] == {"transactions": 1}
+    restored = service.export_full_backup(2)["data"]["transactions"]
+    assert [(t["description"], t["amount"]) for t in restored] == [("Aluguel", 1700.0), ("Condomínio", 50.0)]
+    assert service.count_backup_rows(2) == service.count_backup_rows(1)
+
+
+def test_backup_chain_rejects_gaps(session):
+    service = BackupService(lambda: session)
+    base = service.export_full_backup(1)
+    later = datetime.fromisoformat(base["metadata"]["watermark"]).replace(year=2100)
+    delta = service.export_full_backup(1, since=later)
+
+    with pytest.raises(ValueError, match="Gap in backup chain"):
+        service.restore_backup_chain(2, base, [delta])
+    with pytest.raises(ValueError, match="Only incremental"):
+        service.restore_backup_chain(2, base, [base])
@@ -0,0 +1,106 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.database import get_engine, init_engine, remove_session
+from app.models import (
+    Base,
+    Category,
+    CategoryBudget,
+    CategoryType,
+    FinancialPlan,
+    Institution,
+    Transaction,
+    TransactionType,
+)
+from app.services.cashflow_service import CashFlowForecaster, invalidate_cashflow_cache
+from app.services.planning_service import PlanningService
+from app.services.recurring_plan_engine import invalidate_planned_cache
+
+
+@pytest.fixture(scope="function")
+def session():
+    init_engine("sqlite:///:memory:")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    invalidate_cashflow_cache()
+    invalidate_planned_cache()
+    from app.database import get_session
+
+    yield get_session()
+
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+
+
+def _seed(session):
+    inst = Institution(user_id=1, name="Banco", account_type="corrente", current_balance=1000.0)
+    rent = Category(user_id=1, name="Aluguel", type=CategoryType.EXPENSE)
+    session.add_all([inst, rent])
+    session.flush()
+    session.add(
+        Transaction(
+            user_id=1,
+            event_date=datetime(2025, 2, 10),
+            transaction_type=TransactionType.EXPENSE,
+            category_id=rent.id,
+            institution_id=inst.id,
+            amount=200.0,
+            description="Conta pendente",
+        )
+    )
+    session.add(
+        FinancialPlan(
+            user_id=1,
+            name="Reserva",
+            goal_amount=1100.0,
+            current_balance=1000.0,
+            monthly_contribution=50.0,
+        )
+    )
+    session.commit()
+    return inst.id, rent.id
+
+
+def test_forecast_combines_sources_by_month(session):
+    inst_id, rent_id = _seed(session)
+    planning = PlanningService(lambda: session)
+    planning.create_income_projection(description="Bônus", amount=500.0, expected_date="2025-03-05")
+    planning.create_recurring_plan(category_id=rent_id, amount=100.0, start_date="2025-01-01")
+    # a meta de março substitui a recorrência naquele mês
+    planning.upsert_category_budget(category_id=rent_id, month=3, year=2025, amount=300.0)
+
+    result = CashFlowForecaster(lambda: session).forecast(months=4, start=date(2025, 1, 15))
+
+    assert [row["period"] for row in result["series"]] == ["2025-01", "2025-02", "2025-03", "2025-04"]
+    assert [row["expense"] for row in result["series"]] == [100.0, 300.0, 300.0, 100.0]
+    assert [row["income"] for row in result["series"]] == [0.0, 0.0, 500.0, 0.0]
+    # faltam 100 para a meta: dois aportes de 50
+    assert [row["contributions"] for row in result["series"]] == [50.0, 50.0, 0.0, 0.0]
+    assert [row["balance"] for row in result["series"]] == [850.0, 500.0, 700.0, 600.0]
+    assert result["lowest_balance"] == {"period": "2025-02", "balance": 500.0}
+
+    bank = next(acc for acc in result["accounts"] if acc["institution_id"] == inst_id)
+    assert bank["opening_balance"] == 1000.0
+    assert bank["closing_balance"] == 800.0
+
+
+def test_forecast_is_cached_and_invalidated_on_writes(session):
+    _, rent_id = _seed(session)
+    forecaster = CashFlowForecaster(lambda: session)
+
+    first = forecaster.forecast(months=2, granularity="day", start=date(2025, 1, 30))
+    assert first["series"][0]["period"] == "2025-01-30"
+    assert len(first["series"]) == 30
+    assert forecaster.forecast(months=2, granularity="day", start=date(2025, 1, 30)) is first
+
+    PlanningService(lambda: session).create_income_projection(
+        description="Extra", amount=300.0, expected_date="2025-02-01"
+    )
+    second = forecaster.forecast(months=2, granularity="day", start=date(2025, 1, 30))
+    assert second is not first
+    assert second["series"][2]["income"] == 300.0
+    assert second["closing_balance"] == first["closing_balance"] + 300.0
+
+    with pytest.raises(ValueError):
+        forecaster.forecast(granularity="week")
@@ -5,6 +5,7 @@ import pytest
 from app.database import get_engine, init_engine, remove_session
 from app.models import Base, ImportBatch, PendingTransaction, ReviewStatus
 from app.services.catalog_seed import CatalogSeeder
+from app.services.category_index import invalidate_category_index
 
 
 @pytest.fixture(scope="function")
@@ -18,6 +19,7 @@ def session():
 
     Base.metadata.drop_all(bind=engine)
     remove_session()
+    invalidate_category_index()
 
 
 def _create_import(session):
@@ -71,3 +73,65 @@ def test_seed_creates_categories_and_institutions(session):
     result2 = seeder.seed_from_imports()
     assert result2["institutions_created"] == 0
     assert result2["categories_created"] == 0
+
+
+def test_seed_aggregates_distinct_names_in_the_database(session):
+    from sqlalchemy import insert
+
+    from app.models import Category, CategoryType, Institution
+
+    session.add(Institution(name="Banco Teste", account_type="corrente", current_balance=0.0))
+    session.add(Category(name="mercado", type=CategoryType.EXPENSE))
+    session.commit()
+    batches = []
+    for i, (name, balance) in enumerate([(" Banco Teste ", None), ("Banco Teste", 300.0), ("Corretora", 50.0)]):
+        batch = ImportBatch(user_id=1, filename=f"{i}.ofx", institution_name=name, balance=balance)
+        session.add(batch)
+        batches.append(batch)
+    session.flush()
+
+    names = [("Mercado", None), (None, " Mercado "), ("", "Salário"), ("Transporte", "Outro"), (None, None)]
+    session.execute(insert(PendingTransaction), [
+        {
+            "import_batch_id": batches[i % 3].id,
+            "fitid": str(i),
+            "date": datetime(2025, 1, 1),
+            "description": "x",
+            "amount": 100.0 if names[i % 5][1] == "Salário" else -10.0,
+            "transaction_type": "debito",
+            "user_category": names[i % 5][0],
+            "predicted_category": names[i % 5][1],
+            "review_status": ReviewStatus.PENDING,
+        }
+        for i in range(20000)
+    ])
+    session.commit()
+
+    result = CatalogSeeder(lambda: session).seed_from_imports()
+
+    assert result == {"institutions_created": 1, "categories_created": 2}
+    categories = {(c.name, c.type) for c in session.query(Category)}
+    assert categories == {
+        ("mercado", CategoryType.EXPENSE),
+        ("Salário", CategoryType.INCOME),
+        ("Transporte", CategoryType.EXPENSE),
+    }
+    balances = dict(session.query(Institution.name, Institution.current_balance))
+    assert balances == {"Banco Teste": 300.0, "Corretora": 50.0}
+
+
+def test_seed_skips_categories_created_concurrently(session):
+    from app.models import Category, CategoryType
+    from app.services.category_index import get_category_index
+
+    _create_import(session)
+    # índice em cache desatualizado, como num seeder rodando em paralelo
+    assert len(get_category_index(lambda: session)) == 0
+    session.add(Category(name="SUPERMERCADO", type=CategoryType.EXPENSE))
+    session.commit()
+
+    result = CatalogSeeder(lambda: session).seed_from_imports()
+
+    assert result["categories_created"] == 1
+    names = sorted(name for (name,) in session.query(Category.name))
+    assert names == ["SUPERMERCADO", "Salário"]
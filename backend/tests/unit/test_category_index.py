@@ -0,0 +1,68 @@
+from sqlalchemy import event
+
+from app.database import get_engine, get_session, init_engine, remove_session
+from app.models import Base, Category, CategoryType
+from app.services.catalog_service import CatalogService
+from app.services.category_index import get_category_index, invalidate_category_index
+
+
+def setup_function():
+    init_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=get_engine())
+    invalidate_category_index()
+
+
+def teardown_function():
+    Base.metadata.drop_all(bind=get_engine())
+    remove_session()
+    invalidate_category_index()
+
+
+def _count_queries():
+    statements = []
+    event.listen(get_engine(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+
+def test_index_is_loaded_once_and_builds_the_tree():
+    session = get_session()
+    food = Category(name="Alimentação", type=CategoryType.EXPENSE)
+    session.add_all([
+        food,
+        Category(name="Supermercado", type=CategoryType.EXPENSE, parent=food),
+        Category(name="Restaurante", type=CategoryType.EXPENSE, parent=food, is_active=False),
+        Category(name="Salário", type=CategoryType.INCOME),
+        Category(name="Alimentação", type=CategoryType.EXPENSE, user_id=2),
+    ])
+    session.commit()
+    statements = _count_queries()
+
+    index = get_category_index(get_session)
+    assert get_category_index(get_session) is index
+    assert len(statements) == 1
+
+    assert len(index) == 4
+    assert index.find("  alimentação ")["id"] == food.id
+    assert index.find("salário", CategoryType.EXPENSE) is None
+    tree = index.tree()
+    assert [node["name"] for node in tree] == ["Alimentação", "Salário"]
+    assert [child["name"] for child in tree[0]["children"]] == ["Supermercado"]
+    assert len(index.tree(include_inactive=True)[0]["children"]) == 2
+    assert [c["name"] for c in index.categories(category_type="income")] == ["Salário"]
+    assert get_category_index(get_session, 2).find("Alimentação")["user_id"] == 2
+
+
+def test_catalog_writes_refresh_the_index():
+    service = CatalogService(get_session)
+    parent = service.create_category(name="Moradia", category_type="expense")
+    assert [c["name"] for c in service.list_categories()] == ["Moradia"]
+
+    child = service.create_category(name="Aluguel", category_type="expense", parent_id=parent["id"])
+    assert [c["name"] for c in service.get_category(parent["id"])["children"]] == ["Aluguel"]
+
+    service.update_category(child["id"], name="Condomínio")
+    assert service.category_tree()[0]["children"][0]["name"] == "Condomínio"
+
+    service.delete_category(child["id"])
+    assert service.get_category(parent["id"])["children"] == []
+    assert service.list_categories(user_id=2) == []
@@ -0,0 +1,165 @@
+"""
+Testes do unit of work por requisição e das métricas do pool.
+"""
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app import create_app
+from app.database import (
+    REPLICA_STICKY_COOKIE,
+    get_engine,
+    get_pool_metrics,
+    get_read_engine,
+    get_read_session,
+    get_session,
+    init_app,
+    read_only,
+    remove_session,
+)
+from app.models import Base, Category, CategoryType
+from app.services.catalog_service import CatalogService
+
+
+@pytest.fixture(scope="function")
+def app():
+    app = create_app("testing")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    remove_session()
+
+    @app.post("/_test/categories")
+    def create_categories():
+        service = CatalogService(get_session)
+        first = service.create_category(name="Mercado", category_type="expense")
+        second = service.create_category(name="Salário", category_type="income")
+        return jsonify({
+            "ids": [first["id"], second["id"]],
+            "same_session": get_session() is get_session(),
+            "checkouts": get_pool_metrics()["checkouts"],
+        })
+
+    @app.get("/_test/no-db")
+    def no_db():
+        return jsonify({"ok": True})
+
+    @app.post("/_test/read-only")
+    @read_only
+    def write_in_read_only():
+        session = get_session()
+        session.add(Category(user_id=1, name="Proibida", type=CategoryType.EXPENSE))
+        session.commit()
+        return jsonify({"ok": True})
+
+    yield app
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+
+
+def test_request_shares_one_connection_across_commits(app):
+    client = app.test_client()
+    before = get_pool_metrics()["request_checkouts"]
+
+    resp = client.post("/_test/categories")
+
+    data = resp.get_json()
+    assert resp.status_code == 200
+    assert len(data["ids"]) == 2
+    assert data["same_session"] is True
+    metrics = get_pool_metrics()
+    # dois commits de serviço, uma única conexão retirada do pool
+    assert metrics["request_checkouts"] == before + 1
+    assert metrics["checked_out"] == 0
+
+
+def test_routes_without_database_access_skip_the_pool(app):
+    client = app.test_client()
+    before = get_pool_metrics()
+
+    assert client.get("/_test/no-db").status_code == 200
+
+    after = get_pool_metrics()
+    assert after["request_checkouts"] == before["request_checkouts"]
+    assert after["checkouts"] == before["checkouts"]
+
+
+def test_read_only_route_rejects_writes(app):
+    client = app.test_client()
+    app.config["PROPAGATE_EXCEPTIONS"] = False
+
+    resp = client.post("/_test/read-only")
+
+    assert resp.status_code == 500
+    session = get_session()
+    assert session.query(Category).count() == 0
+    # a conexão volta ao pool liberada para escrita
+    session.add(Category(user_id=1, name="Permitida", type=CategoryType.EXPENSE))
+    session.commit()
+    assert session.query(Category).count() == 1
+
+
+@pytest.fixture()
+def replica_app(tmp_path):
+    """Primário e réplica em dois arquivos SQLite; a réplica não recebe as escritas."""
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+        SQLALCHEMY_DATABASE_READ_URI=f"sqlite:///{tmp_path / 'replica.db'}",
+        REPLICA_STICKY_SECONDS=30,
+    )
+    init_app(app)
+    for engine in (get_engine(), get_read_engine()):
+        Base.metadata.create_all(bind=engine)
+    with Session(get_read_engine()) as replica:
+        replica.add(Category(user_id=1, name="Replicada", type=CategoryType.EXPENSE))
+        replica.commit()
+
+    @app.get("/_test/categories")
+    @read_only
+    def list_names():
+        return jsonify(sorted(c.name for c in get_read_session().query(Category)))
+
+    @app.post("/_test/categories")
+    def create():
+        session = get_session()
+        session.add(Category(user_id=1, name="Nova", type=CategoryType.EXPENSE))
+        session.commit()
+        return jsonify({"ok": True}), 201
+
+    @app.post("/_test/categories/rename")
+    def rename():
+        session = get_session()
+        session.execute(update(Category).values(name="Renomeada"))
+        session.commit()
+        return jsonify({"ok": True})
+
+    yield app
+    remove_session()
+
+
+def test_read_only_routes_use_replica_until_client_writes(replica_app):
+    client = replica_app.test_client()
+
+    assert client.get("/_test/categories").get_json() == ["Replicada"]
+
+    resp = client.post("/_test/categories")
+    assert resp.status_code == 201
+    assert REPLICA_STICKY_COOKIE in resp.headers.get("Set-Cookie", "")
+
+    # read-your-writes: o mesmo cliente passa a ler do primário
+    assert client.get("/_test/categories").get_json() == ["Nova"]
+    # outro cliente continua na réplica
+    assert replica_app.test_client().get("/_test/categories").get_json() == ["Replicada"]
+
+
+def test_bulk_write_sends_next_read_to_primary(replica_app):
+    client = replica_app.test_client()
+    with Session(get_engine()) as primary:
+        primary.add(Category(user_id=1, name="Primária", type=CategoryType.EXPENSE))
+        primary.commit()
+
+    # update em lote (sem flush) também conta como escrita
+    resp = client.post("/_test/categories/rename")
+    assert REPLICA_STICKY_COOKIE in resp.headers.get("Set-Cookie", "")
+    assert client.get("/_test/categories").get_json() == ["Renomeada"]
@@ -0,0 +1,102 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.database import get_engine, init_engine, remove_session
+from app.models import (
+    Base,
+    Category,
+    CategoryType,
+    FinancialPlan,
+    Transaction,
+    TransactionStatus,
+    TransactionType,
+)
+from app.services.goal_simulator import GoalSimulator, _simulate_plan
+
+
+@pytest.fixture(scope="function")
+def session():
+    init_engine("sqlite:///:memory:")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    from app.database import get_session
+
+    yield get_session()
+
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+
+
+def _plan(session, **kwargs):
+    plan = FinancialPlan(user_id=1, name="Viagem", **kwargs)
+    session.add(plan)
+    session.commit()
+    return plan.id
+
+
+def test_without_history_contribution_is_deterministic(session):
+    _plan(session, goal_amount=1000.0, current_balance=500.0, monthly_contribution=100.0, target_date=date(2025, 7, 1))
+    _plan(session, goal_amount=1000.0, current_balance=500.0, monthly_contribution=100.0, target_date=date(2025, 4, 1))
+
+    on_time, late = GoalSimulator(lambda: session).simulate(paths=200, today=date(2025, 1, 10))
+
+    assert on_time["history_months"] == 0
+    assert on_time["months_remaining"] == 6
+    assert on_time["probability"] == 1.0
+    assert on_time["median_months_to_goal"] == 5
+    assert late["probability"] == 0.0
+    assert late["final_balance"]["p50"] == 800.0
+
+
+def test_history_drives_probability_and_results_are_reproducible(session):
+    category = Category(user_id=1, name="Salário", type=CategoryType.INCOME)
+    session.add(category)
+    session.flush()
+    # sobra mensal alterna entre 300 e 0 nos últimos meses
+    for month, amount in enumerate([300.0, 0.0, 300.0, 0.0, 300.0, 0.0], start=7):
+        if amount:
+            session.add(
+                Transaction(
+                    user_id=1,
+                    event_date=datetime(2024, month, 5),
+                    transaction_type=TransactionType.INCOME,
+                    status=TransactionStatus.COMPLETED,
+                    category_id=category.id,
+                    amount=amount,
+                    description="Sobra",
+                )
+            )
+    session.commit()
+    plan_id = _plan(
+        session, goal_amount=1000.0, current_balance=0.0, monthly_contribution=200.0, target_date=date(2025, 7, 1)
+    )
+
+    simulator = GoalSimulator(lambda: session)
+    first = simulator.simulate(plan_id=plan_id, paths=2000, seed=42, today=date(2025, 1, 10))[0]
+    again = simulator.simulate(plan_id=plan_id, paths=2000, seed=42, today=date(2025, 1, 10))[0]
+
+    assert first["history_months"] == 6
+    # 6 meses, metade com aporte de 200: precisa de 5 meses bons
+    assert 0.05 < first["probability"] < 0.2
+    assert again == first
+
+    args = (0.0, 1000.0, 200.0, 6, (300.0, 0.0), 2000, [42, plan_id])
+    assert _simulate_plan(args) == _simulate_plan(args)
+
+
+def test_many_plans_run_in_process(session, monkeypatch):
+    import multiprocessing
+
+    for i in range(10):
+        _plan(session, goal_amount=1700.0 + 20 * i, current_balance=0.0, monthly_contribution=150.0, target_date=date(2026, 1, 1))
+
+    def no_fork(*args, **kwargs):
+        raise AssertionError("a simulação não deve criar processos")
+
+    monkeypatch.setattr(multiprocessing.process.BaseProcess, "start", no_fork)
+    items = GoalSimulator(lambda: session).simulate(paths=500, seed=1, today=date(2025, 1, 10))
+
+    assert len(items) == 10
+    # sem histórico: 12 aportes de 150 chegam a 1800
+    assert [item["probability"] for item in items] == [1.0] * 6 + [0.0] * 4
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+from app.database import get_engine, get_session, init_engine, remove_session
+from app.models import Base, ImportBatch, PendingTransaction, ReviewStatus
+from app.services.import_service import ImportService
+from app.services.insight_context import InsightContextBuilder, invalidate_insight_context
+
+
+def setup_function():
+    init_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=get_engine())
+    invalidate_insight_context()
+
+
+def teardown_function():
+    Base.metadata.drop_all(bind=get_engine())
+    remove_session()
+    invalidate_insight_context()
+
+
+def _batch(session, user_id, rows):
+    batch = ImportBatch(user_id=user_id, filename=f"user{user_id}.ofx")
+    session.add(batch)
+    session.flush()
+    for i, (day, description, amount, category, status) in enumerate(rows):
+        session.add(PendingTransaction(
+            import_batch_id=batch.id,
+            fitid=f"{user_id}-{i}",
+            date=day,
+            description=description,
+            amount=amount,
+            transaction_type="credito" if amount > 0 else "debito",
+            predicted_category=category,
+            review_status=status,
+        ))
+    session.commit()
+    return batch.id
+
+
+def test_context_is_aggregated_per_user():
+    session = get_session()
+    approved = ReviewStatus.APPROVED
+    _batch(session, 1, [
+        (datetime(2025, 9, 5), "Salário", 5000.0, "Salário", approved),
+        (datetime(2025, 9, 10), "Mercado Bom", -300.0, "Alimentação", approved),
+        (datetime(2025, 10, 5), "Salário", 5000.0, "Salário", approved),
+        (datetime(2025, 10, 8), "Mercado Bom", -450.0, "Alimentação", approved),
+        (datetime(2025, 10, 9), "Mercado Bom", -50.0, "Alimentação", ReviewStatus.MODIFIED),
+        (datetime(2025, 10, 12), "Posto", -200.0, "Transporte", approved),
+        (datetime(2025, 10, 20), "Pendente", -999.0, "Alimentação", ReviewStatus.PENDING),
+    ])
+    _batch(session, 2, [
+        (datetime(2025, 10, 1), "Outro usuário", -1234.0, "Lazer", approved),
+    ])
+
+    builder = InsightContextBuilder(get_session)
+    context = builder.build(1)
+
+    assert context["transactions"] == 6
+    assert context["months"] == 2
+    assert context["totals"] == {"total_income": 10000.0, "total_expense": 1000.0, "balance": 9000.0}
+    assert [c["name"] for c in context["categories"]] == ["Salário", "Alimentação", "Transporte"]
+    assert context["categories"][1] == {"name": "Alimentação", "count": 3, "total": -800.0}
+    assert context["top_merchants"][0] == {"name": "Mercado Bom", "count": 3, "total": 800.0}
+    food = next(item for item in context["month_over_month"] if item["name"] == "Alimentação")
+    assert (food["month"], food["previous"], food["current"], food["delta"]) == ("2025-10", -300.0, -500.0, -200.0)
+    assert len(context["recent_transactions"]) == 6
+    assert "Lazer" not in {c["name"] for c in context["categories"]}
+
+    assert builder.analysis_summary(1)["top_categories"] == [
+        {"name": "Alimentação", "total": 800.0},
+        {"name": "Transporte", "total": 200.0},
+    ]
+    assert builder.chat_context(1)["monthly_expense"] == 500.0
+    assert builder.build(2)["totals"]["total_expense"] == 1234.0
+
+
+def test_review_refreshes_cached_context(tmp_path):
+    session = get_session()
+    batch_id = _batch(session, 1, [
+        (datetime(2025, 10, 8), "Mercado", -100.0, "Alimentação", ReviewStatus.PENDING),
+    ])
+    transaction_id = session.query(PendingTransaction.id).scalar()
+    builder = InsightContextBuilder(get_session)
+    assert builder.build(1)["transactions"] == 0
+
+    ImportService(get_session, predictor=None, upload_folder=str(tmp_path)).review_transaction(
+        batch_id, transaction_id, "Supermercado", status=ReviewStatus.MODIFIED
+    )
+
+    context = builder.build(1)
+    assert context["transactions"] == 1
+    assert context["categories"][0]["name"] == "Supermercado"
@@ -0,0 +1,124 @@
+from datetime import date, datetime
+
+import pytest
+
+from app.database import get_engine, get_session, init_engine, remove_session
+from app.models import Base, Investment, InvestmentEvent
+from app.services.investment_service import InvestmentService
+from app.services.portfolio_analytics import invalidate_portfolio_cache
+
+
+def setup_function():
+    init_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=get_engine())
+    invalidate_portfolio_cache()
+
+
+def teardown_function():
+    Base.metadata.drop_all(bind=get_engine())
+    remove_session()
+    invalidate_portfolio_cache()
+
+
+def test_writes_append_events():
+    service = InvestmentService(get_session)
+    item = service.create_investment(
+        name="CDB", amount_invested=1000.0, current_value=1010.0, applied_at="2025-01-10",
+    )
+    service.add_dividend(investment_id=item["id"], amount=20.0, received_at="2025-02-15")
+    service.record_valuation(investment_id=item["id"], value=1050.0, valued_at="2025-03-31")
+    service.record_valuation(investment_id=item["id"], value=1030.0, valued_at="2025-03-01")
+    service.redeem(investment_id=item["id"], amount=300.0)
+
+    events = service.list_events(item["id"])
+
+    assert [e["event_type"] for e in events[:5]] == [
+        "contribution", "valuation", "dividend", "valuation", "valuation",
+    ]
+    assert events[-1]["event_type"] == "redemption" and events[-1]["amount"] == 300.0
+    # marcação retroativa não sobrescreve o valor atual
+    assert service.get_investment(item["id"])["current_value"] == 750.0
+    assert service.list_events(999) is None
+    with pytest.raises(ValueError):
+        service.record_valuation(investment_id=item["id"], value=-1.0)
+
+
+def test_monthly_history_follows_events():
+    service = InvestmentService(get_session)
+    cdb = service.create_investment(name="CDB", amount_invested=1000.0, applied_at="2025-01-10")
+    service.record_valuation(investment_id=cdb["id"], value=1100.0, valued_at="2025-02-20")
+    fii = service.create_investment(name="FII", amount_invested=500.0, applied_at="2025-03-05")
+    service.add_dividend(investment_id=fii["id"], amount=10.0, received_at="2025-03-15")
+    service.create_investment(name="Outro usuário", amount_invested=999.0, applied_at="2025-01-01", user_id=2)
+
+    history = service.value_history(start="2025-01-01", end="2025-03-20")
+
+    assert history["positions"] == 2
+    assert [p["date"] for p in history["points"]] == ["2025-01-31", "2025-02-28", "2025-03-20"]
+    assert [p["value"] for p in history["points"]] == [1000.0, 1100.0, 1600.0]
+    assert [p["invested"] for p in history["points"]] == [1000.0, 1000.0, 1500.0]
+    assert [p["dividends"] for p in history["points"]] == [0.0, 0.0, 10.0]
+
+    # aporte após a marcação soma ao valor marcado
+    service.update_investment(cdb["id"], amount_invested=1200.0)
+    daily = service.value_history(granularity="day", start="2025-01-09", end="2025-01-10")
+    assert [p["value"] for p in daily["points"]] == [0.0, 1000.0]
+    assert service.value_history(end="2025-03-20")["points"][-1]["value"] == 1600.0
+    assert service.value_history()["points"][-1]["value"] == 1800.0
+
+    with pytest.raises(ValueError):
+        service.value_history(granularity="week")
+
+
+def test_positions_without_events_are_synthesized():
+    session = get_session()
+    session.add(Investment(
+        user_id=1,
+        name="Legado",
+        amount_invested=1000.0,
+        current_value=1200.0,
+        applied_at=date(2024, 6, 1),
+        updated_at=datetime(2024, 12, 31, 12),
+    ))
+    session.commit()
+    assert session.query(InvestmentEvent).count() == 0
+
+    history = InvestmentService(get_session).value_history(start="2024-06-01", end="2025-01-15")
+
+    points = {p["date"]: p for p in history["points"]}
+    assert points["2024-06-30"]["value"] == 1000.0
+    assert points["2024-12-31"]["value"] == 1200.0
+    assert points["2025-01-15"]["invested"] == 1000.0
+
+
+def test_first_event_keeps_the_base_of_legacy_positions():
+    session = get_session()
+    legacy = Investment(
+        user_id=1,
+        name="Legado",
+        amount_invested=10000.0,
+        current_value=12000.0,
+        applied_at=date(2024, 1, 2),
+        updated_at=datetime(2024, 12, 31, 12),
+    )
+    session.add(legacy)
+    session.commit()
+    legacy_id = legacy.id
+    service = InvestmentService(get_session)
+
+    service.redeem(investment_id=legacy_id, amount=1000.0)
+    service.update_investment(legacy_id, amount_invested=10500.0, current_value=11600.0)
+
+    events = service.list_events(legacy_id)
+    assert [(e["event_type"], e["amount"], e["value"]) for e in events[:3]] == [
+        ("contribution", 10000.0, None),
+        ("valuation", 0.0, 12000.0),
+        ("redemption", 1000.0, None),
+    ]
+    assert len(events) == 5  # a abertura é gravada uma única vez
+
+    history = service.value_history(start="2024-12-01", end="2024-12-31")
+    assert history["points"][-1]["value"] == 12000.0
+    assert history["points"][-1]["invested"] == 10000.0
+    latest = service.value_history()["points"][-1]
+    assert (latest["value"], latest["invested"]) == (11600.0, 9500.0)
@@ -4,6 +4,7 @@ import pytest
 
 from app.database import get_engine, init_engine, remove_session
 from app.models import Base, Institution
+from app.services.category_index import invalidate_category_index
 from app.services.planning_service import PlanningService
 
 
@@ -18,6 +19,7 @@ def session():
 
     Base.metadata.drop_all(bind=engine)
     remove_session()
+    invalidate_category_index()
 
 
 def _seed_institution(session):
@@ -77,3 +79,78 @@ def test_income_projection_crud(session):
 
     assert service.delete_income_projection(item["id"]) is True
     assert service.list_income_projections() == []
+
+
+def test_recurring_plan_planned_values_are_cached_and_invalidated(session):
+    from app.models import Category, CategoryType
+    from app.services.recurring_plan_engine import RecurringPlanEngine
+
+    cat = Category(user_id=1, name="Aluguel", type=CategoryType.EXPENSE)
+    session.add(cat)
+    session.commit()
+    cat_id = cat.id
+
+    service = PlanningService(lambda: session)
+    engine = RecurringPlanEngine(lambda: session)
+    months = [(2024, 11), (2024, 12), (2025, 1), (2025, 2)]
+
+    service.create_recurring_plan(
+        category_id=cat_id, amount=1000.0, start_date="2024-12-15", end_date="2025-01-10"
+    )
+    assert engine.monthly_planned(months) == {cat_id: {"2024-12": 1000.0, "2025-01": 1000.0}}
+
+    # recorrência aberta vale para todos os meses a partir do início
+    created = service.create_recurring_plan(category_id=cat_id, amount=200.0, start_date="2025-01-01")
+    assert engine.monthly_planned(months) == {
+        cat_id: {"2024-12": 1000.0, "2025-01": 1200.0, "2025-02": 200.0}
+    }
+
+    assert service.delete_recurring_plan(created["id"]) is True
+    assert engine.monthly_planned(months)[cat_id] == {"2024-12": 1000.0, "2025-01": 1000.0}
+
+
+def test_budget_compliance_compares_each_month_with_its_own_actuals(session):
+    from datetime import datetime
+
+    from app.models import Category, CategoryType, PendingTransaction, ReviewStatus
+
+    cat = Category(user_id=1, name="Mercado", type=CategoryType.EXPENSE)
+    session.add(cat)
+    session.commit()
+    cat_id = cat.id
+
+    for day, amount, status in [
+        (datetime(2025, 1, 10), -300.0, ReviewStatus.APPROVED),
+        (datetime(2025, 1, 31, 18, 0), -100.0, ReviewStatus.APPROVED),
+        (datetime(2025, 2, 5), -700.0, ReviewStatus.MODIFIED),
+        (datetime(2025, 2, 6), -50.0, ReviewStatus.PENDING),
+    ]:
+        session.add(
+            PendingTransaction(
+                import_batch_id=1,
+                fitid=f"{day.isoformat()}",
+                date=day,
+                description="Compra",
+                amount=amount,
+                transaction_type="debito",
+                predicted_category=" Mercado ",
+                review_status=status,
+            )
+        )
+    session.commit()
+
+    service = PlanningService(lambda: session)
+    service.upsert_category_budget(category_id=cat_id, month=1, year=2025, amount=500.0)
+    service.upsert_category_budget(category_id=cat_id, month=2, year=2025, amount=500.0)
+    service.upsert_category_budget(category_id=cat_id, month=3, year=2025, amount=500.0)
+
+    items = service.budget_compliance(start_date="2025-01-01", end_date="2025-02-28")
+    assert [(i["month"], i["actual"], i["status"]) for i in items] == [
+        (1, 400.0, "ok"),
+        (2, 700.0, "alerta"),
+    ]
+
+    with_pending = service.budget_compliance(
+        start_date="2025-01-01", end_date="2025-02-28", include_pending=True
+    )
+    assert with_pending[1]["actual"] == 750.0
@@ -0,0 +1,117 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.database import get_engine, get_session, init_engine, remove_session
+from app.models import Base, Dividend, Investment
+from app.services.investment_service import InvestmentService
+from app.services.portfolio_analytics import PortfolioAnalytics, invalidate_portfolio_cache, xirr
+
+
+def setup_function():
+    init_engine("sqlite:///:memory:")
+    Base.metadata.create_all(bind=get_engine())
+    invalidate_portfolio_cache()
+
+
+def teardown_function():
+    Base.metadata.drop_all(bind=get_engine())
+    remove_session()
+    invalidate_portfolio_cache()
+
+
+def test_xirr_solves_all_series_at_once():
+    days = np.array([
+        [0, 365, 0],
+        [0, 182, 365],
+        [0, 365, 0],   # sem retorno: indefinido
+        [0, 0, 0],     # período vazio
+    ], dtype=float)
+    amounts = np.array([
+        [-1000.0, 1100.0, 0.0],
+        [-1000.0, 50.0, 1050.0],
+        [-1000.0, -10.0, 0.0],
+        [-1000.0, 1000.0, 0.0],
+    ])
+
+    rates = xirr(days, amounts)
+
+    assert rates[0] == pytest.approx(0.10, abs=1e-6)
+    assert 0.10 < rates[1] < 0.11
+    assert np.isnan(rates[2]) and np.isnan(rates[3])
+
+
+def test_portfolio_is_scoped_and_includes_dividends():
+    service = InvestmentService(get_session)
+    cdb = service.create_investment(
+        name="CDB", amount_invested=1000.0, current_value=1050.0,
+        classification="renda_fixa", applied_at="2024-01-01",
+    )
+    fii = service.create_investment(
+        name="FII", amount_invested=2000.0, current_value=1900.0,
+        classification="Renda_Variavel", applied_at="2024-01-01",
+    )
+    service.add_dividend(investment_id=fii["id"], amount=100.0, received_at="2024-07-01")
+    closed = service.create_investment(name="Antigo", amount_invested=500.0, applied_at="2023-01-01")
+    service.redeem(investment_id=closed["id"], close_position=True)
+    service.create_investment(name="Outro usuário", amount_invested=999.0, user_id=2)
+
+    as_of = date(2025, 1, 1)
+    summary = PortfolioAnalytics(get_session).analyze(1, as_of=as_of)["summary"]
+
+    assert summary["count"] == 2
+    assert summary["total_invested"] == 3000.0
+    assert summary["total_current"] == 2950.0
+    assert summary["total_dividends"] == 100.0
+    assert summary["total_return"] == 50.0
+    assert summary["dividend_yield"] == round(100 / 2950 * 100, 2)
+    assert set(summary["by_classification"]) == {"renda_fixa", "renda_variavel"}
+    assert summary["by_classification"]["renda_fixa"]["xirr"] == pytest.approx(5.0, abs=0.05)
+    assert 0 < summary["xirr"] < summary["by_classification"]["renda_fixa"]["xirr"]
+
+    # o provento não altera o valor atual da posição
+    assert service.get_investment(fii["id"])["current_value"] == 1900.0
+    assert service.portfolio_summary(include_inactive=True)["count"] == 3
+
+
+def test_dividends_already_in_current_value_count_once():
+    # posição gravada como antes: o provento foi somado ao current_value
+    session = get_session()
+    legacy = Investment(
+        user_id=1, name="FII antigo", amount_invested=1000.0, current_value=1100.0, applied_at=date(2024, 1, 1),
+    )
+    session.add(legacy)
+    session.flush()
+    session.add(Dividend(
+        investment_id=legacy.id, user_id=1, amount=50.0, received_at=date(2024, 7, 1), counted_in_value=True,
+    ))
+    session.commit()
+    legacy_id = legacy.id
+    dividend_id = legacy.dividends[0].id
+    service = InvestmentService(get_session)
+
+    position = PortfolioAnalytics(get_session).analyze(1, as_of=date(2025, 1, 1))["positions"][0]
+    assert position["dividends"] == 50.0
+    assert position["total_return"] == 100.0
+    assert position["total_return_pct"] == 10.0
+    assert position["xirr"] == pytest.approx(10.0, abs=0.05)
+
+    # excluir o provento antigo também o retira do valor atual
+    assert service.delete_dividend(dividend_id)
+    assert service.get_investment(legacy_id)["current_value"] == 1050.0
+    summary = service.portfolio_summary()
+    assert (summary["total_dividends"], summary["total_return"]) == (0.0, 50.0)
+
+
+def test_writes_invalidate_cached_analysis():
+    service = InvestmentService(get_session)
+    item = service.create_investment(name="CDB", amount_invested=1000.0, applied_at="2024-01-01")
+    assert service.portfolio_summary()["total_dividends"] == 0.0
+
+    service.add_dividend(investment_id=item["id"], amount=25.0)
+
+    positions = service.performance()
+    assert positions[0]["dividends"] == 25.0
+    assert positions[0]["total_return"] == 25.0
+    assert service.portfolio_summary()["total_dividends"] == 25.0
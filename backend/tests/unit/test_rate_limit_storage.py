@@ -0,0 +1,61 @@
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, SlidingWindowCounterRateLimiter
+
+from app.utils.rate_limit_storage import DatabaseStorage
+
+
+def _uri(tmp_path):
+    return f"db+sqlite:///{tmp_path / 'limits.db'}"
+
+
+def test_counters_are_shared_between_workers(tmp_path):
+    # duas instâncias no mesmo banco simulam dois workers do gunicorn
+    first = storage_from_string(_uri(tmp_path))
+    second = storage_from_string(_uri(tmp_path))
+    assert isinstance(first, DatabaseStorage)
+
+    limit = parse("3 per minute")
+    first_limiter = FixedWindowRateLimiter(first)
+    second_limiter = FixedWindowRateLimiter(second)
+
+    assert first_limiter.hit(limit, "1.2.3.4")
+    assert second_limiter.hit(limit, "1.2.3.4")
+    assert first_limiter.hit(limit, "1.2.3.4")
+    assert not second_limiter.hit(limit, "1.2.3.4")
+    assert first_limiter.hit(limit, "5.6.7.8")
+
+    first.clear(limit.key_for("1.2.3.4"))
+    assert second_limiter.hit(limit, "1.2.3.4")
+    assert first.check() is True
+
+
+def test_sliding_window_counter(tmp_path):
+    storage = DatabaseStorage(_uri(tmp_path))
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    limit = parse("2 per hour")
+
+    assert limiter.hit(limit, "ip")
+    assert limiter.hit(limit, "ip")
+    assert not limiter.hit(limit, "ip")
+    assert limiter.get_window_stats(limit, "ip").remaining == 0
+
+
+def test_batched_writes_are_flushed_in_one_upsert(tmp_path):
+    storage = DatabaseStorage(_uri(tmp_path), flush_interval=3600)
+    other = DatabaseStorage(_uri(tmp_path))
+
+    for _ in range(5):
+        storage.incr("a", 60)
+    storage.incr("b", 60, amount=2)
+
+    # o próprio worker enxerga os incrementos locais; os demais só após o flush
+    assert storage.get("a") == 5
+    assert other.get("b") == 0
+
+    storage.flush()
+
+    assert other.get("a") == 5
+    assert other.get("b") == 2
+    assert storage.get("a") == 5
+    assert other.reset() == 2
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database import get_engine, init_engine, remove_session
+from app.models import Base, Category, CategoryType, Transaction, TransactionType
+from app.services.recurrence_service import MAX_BATCH_OCCURRENCES, RecurrenceRule, RecurrenceService
+from app.services.transaction_service import TransactionService
+
+
+@pytest.fixture(scope="function")
+def session():
+    init_engine("sqlite:///:memory:")
+    engine = get_engine()
+    Base.metadata.create_all(bind=engine)
+    from app.database import get_session
+
+    yield get_session()
+
+    Base.metadata.drop_all(bind=engine)
+    remove_session()
+
+
+def _seed_parent(session, event_date):
+    category = Category(user_id=1, name="Aluguel", type=CategoryType.EXPENSE)
+    session.add(category)
+    session.flush()
+    parent = Transaction(
+        user_id=1,
+        event_date=event_date,
+        effective_date=event_date,
+        transaction_type=TransactionType.EXPENSE,
+        category_id=category.id,
+        amount=1500.0,
+        description="Aluguel",
+    )
+    session.add(parent)
+    session.commit()
+    return parent.id
+
+
+def _children(session, parent_id):
+    return (
+        session.query(Transaction)
+        .filter(Transaction.recurrence_parent_id == parent_id)
+        .order_by(Transaction.event_date)
+        .all()
+    )
+
+
+def test_rule_parse_and_monthly_clamp():
+    rule = RecurrenceRule.parse("RRULE:FREQ=MONTHLY;COUNT=4")
+    assert rule.to_string() == "FREQ=MONTHLY;INTERVAL=1;COUNT=4"
+
+    dates = rule.occurrences(datetime(2025, 1, 31), datetime(2030, 1, 1))
+    assert dates == [datetime(2025, 2, 28), datetime(2025, 3, 31), datetime(2025, 4, 30)]
+
+    with pytest.raises(ValueError):
+        RecurrenceRule.parse("FREQ=HOURLY")
+
+
+def test_occurrences_resume_after_a_date():
+    start = datetime(2025, 1, 31, 9)
+    monthly = RecurrenceRule.parse("FREQ=MONTHLY")
+    assert monthly.occurrences(start, datetime(2025, 6, 1), after=datetime(2025, 3, 31, 9)) == [
+        datetime(2025, 4, 30, 9), datetime(2025, 5, 31, 9),
+    ]
+
+    daily = RecurrenceRule.parse("FREQ=DAILY;INTERVAL=2")
+    batch = daily.occurrences(start, datetime(2040, 1, 1), after=datetime(2030, 1, 1), limit=3)
+    assert batch == [datetime(2030, 1, 1, 9), datetime(2030, 1, 3, 9), datetime(2030, 1, 5, 9)]
+
+
+def test_set_rule_materializes_once(session):
+    start = datetime.utcnow().replace(microsecond=0)
+    parent_id = _seed_parent(session, start)
+    service = RecurrenceService(lambda: session)
+
+    result = service.set_rule(parent_id, 1, "FREQ=MONTHLY;COUNT=12")
+    assert result["created"] == 11
+    assert result["transaction"]["recurrence_rule"] == "FREQ=MONTHLY;INTERVAL=1;COUNT=12"
+
+    # Re-running never duplicates already materialized dates
+    assert service.materialize(parent_id, 1) == 0
+    assert len(_children(session, parent_id)) == 11
+
+
+def test_deleted_occurrence_is_not_recreated(session):
+    start = datetime.utcnow().replace(microsecond=0)
+    parent_id = _seed_parent(session, start)
+    service = RecurrenceService(lambda: session)
+    service.set_rule(parent_id, 1, "FREQ=WEEKLY;COUNT=5")
+
+    first = _children(session, parent_id)[0]
+    first.deleted_at = datetime.utcnow()
+    session.commit()
+    first_id, first_date = first.id, first.event_date
+
+    assert service.materialize(parent_id, 1) == 0
+    assert len(_children(session, parent_id)) == 4
+
+    with pytest.raises(ValueError):
+        TransactionService(lambda: session).duplicate_transaction(parent_id, 1, first_date.isoformat())
+    assert session.get(Transaction, first_id).deleted_at is not None
+    assert len(_children(session, parent_id)) == 4
+
+
+def test_list_extends_horizon_lazily(session):
+    start = datetime.utcnow().replace(microsecond=0)
+    parent_id = _seed_parent(session, start)
+    service = RecurrenceService(lambda: session)
+    horizon = (start + timedelta(days=95)).isoformat()
+    service.set_rule(parent_id, 1, "FREQ=MONTHLY", horizon=horizon)
+    assert len(_children(session, parent_id)) == 3
+
+    listed = TransactionService(lambda: session).list_transactions(
+        1,
+        end_date=(start + timedelta(days=370)).isoformat(),
+    )
+    assert len(_children(session, parent_id)) == 12
+    assert listed["total"] == 13
+
+
+def test_open_ended_daily_rule_materializes_in_batches(session):
+    start = datetime.utcnow().replace(microsecond=0)
+    parent_id = _seed_parent(session, start)
+    service = RecurrenceService(lambda: session)
+    service.set_rule(parent_id, 1, "FREQ=DAILY", horizon=(start + timedelta(days=30)).isoformat())
+    assert len(_children(session, parent_id)) == 30
+
+    # além de MAX_BATCH_OCCURRENCES a partir do início da série
+    far = start + timedelta(days=MAX_BATCH_OCCURRENCES + 500)
+    created = service.materialize(parent_id, 1, horizon=far.isoformat())
+
+    children = _children(session, parent_id)
+    assert created == MAX_BATCH_OCCURRENCES + 470
+    assert len(children) == MAX_BATCH_OCCURRENCES + 500
+    assert children[-1].event_date == far
+    assert service.materialize(parent_id, 1, horizon=far.isoformat()) == 0
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from app.ml.lazy_predictor import LazyTransactionPredictor
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+# folgado em relação ao medido (~0.7s) para não oscilar em CI; antes eram ~2.8s
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+HEAVY_MODULES = ("pandas", "sklearn", "openai", "ofxparse", "openpyxl")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app("testing")
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "loaded": [m for m in sys.argv[1:] if m in sys.modules],
+    "predictor_loaded": getattr(app.extensions["predictor"], "is_loaded", None),
+}))
+"""
+
+
+def test_create_app_stays_within_startup_budget():
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE, *HEAVY_MODULES],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    probe = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert probe["loaded"] == []
+    assert probe["predictor_loaded"] in (False, None)
+    assert probe["seconds"] < STARTUP_BUDGET_SECONDS
+
+
+def test_predictor_is_loaded_on_first_use():
+    model_path = BACKEND_DIR / "app" / "ml" / "models" / "category_classifier.pkl"
+    predictor = LazyTransactionPredictor(str(model_path))
+    assert not predictor.is_loaded
+
+    info = predictor.get_model_info()
+
+    assert predictor.is_loaded
+    assert info["n_categories"] > 0